@@ -1,14 +1,17 @@
 
 import os
+import re
 import shutil
 import logging
 import time
 import uuid
-from typing import Optional, List
+import json
+import asyncio
+from typing import Any, Dict, Optional, List
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -22,6 +25,20 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "src"))
 from src.processors.summarizer import SummarizerProcessor
 from src.processors.quiz_generator import QuizProcessor
 from src.ingestors.search import SearchIngestor
+from src.processors.model_registry import model_registry
+from src.processors.mode_queries import mode_query_table
+from src.processors.embedding_backends import ClipTextBackend, get_text_backend, default_index_key
+from src.utils.embedding_cache import embedding_cache_stats
+from src.utils.index_store import index_store
+from src.utils.response_cache import response_cache
+from src.utils.session_store import SessionStore, DocumentSession, CollectionSession
+from src.utils.concurrency import run_in_stage, iter_in_background, shutdown_executors
+from src.utils.jobs import Job, JobManager, JobQueueFull
+from src.utils.ocr_pool import ocr_pool
+from src.utils.ocr_cache import ocr_cache
+from src.processors.image_analyzer import image_analyzer
+from src.utils.metrics import metrics_manager
+from config.config import Config
 import src.utils as utils # For list_available_models
 
 # Setup Logging
@@ -42,6 +59,13 @@ app.add_middleware(
 # Global instances
 summarizer = None
 quiz_generator = None
+sessions = SessionStore(max_sessions=Config.MAX_DOCUMENT_SESSIONS)
+collections = SessionStore(max_sessions=Config.MAX_COLLECTIONS)
+jobs = JobManager(
+    max_queue=Config.JOB_QUEUE_SIZE,
+    workers=Config.JOB_WORKERS,
+    retention_sec=Config.JOB_RETENTION_MINUTES * 60
+)
 
 # -----------------
 # DATA MODELS
@@ -59,6 +83,56 @@ class ProcessRequest(BaseModel):
     # Quiz specific
     num_questions: Optional[int] = 5
     difficulty: Optional[str] = "Medium"
+    # False forces a fresh LLM call instead of reusing a cached response
+    use_cache: Optional[bool] = True
+    # Retrieve with every facet of the mode query and fuse the results (default: server config)
+    multi_query: Optional[bool] = None
+    # "dense" (CLIP) or "hybrid" (CLIP fused with BM25); default: server config
+    retrieval: Optional[str] = None
+
+class DocumentRequest(BaseModel):
+    source_path: str
+    model_name: Optional[str] = "gemini-2.5-flash"
+
+class SummarizeRequest(BaseModel):
+    summary_type: Optional[str] = "concise"
+    model_name: Optional[str] = None
+    # False forces a fresh LLM call instead of reusing a cached response
+    use_cache: Optional[bool] = True
+    # Retrieve with every facet of the mode query and fuse the results (default: server config)
+    multi_query: Optional[bool] = None
+    # "dense" (CLIP) or "hybrid" (CLIP fused with BM25); default: server config
+    retrieval: Optional[str] = None
+    # Collections only: restrict the context to these source ids (default: every source)
+    source_ids: Optional[List[str]] = None
+
+class QuizRequest(BaseModel):
+    num_questions: Optional[int] = 5
+    difficulty: Optional[str] = "Medium"
+    model_name: Optional[str] = None
+    # False forces a fresh LLM call instead of reusing a cached response
+    use_cache: Optional[bool] = True
+    # Retrieve with every facet of the mode query and fuse the results (default: server config)
+    multi_query: Optional[bool] = None
+    # "dense" (CLIP) or "hybrid" (CLIP fused with BM25); default: server config
+    retrieval: Optional[str] = None
+    # Collections only: restrict the context to these source ids (default: every source)
+    source_ids: Optional[List[str]] = None
+
+class QueryRequest(BaseModel):
+    question: str
+    k: Optional[int] = 5
+    # "dense" (CLIP) or "hybrid" (CLIP fused with BM25); default: server config
+    retrieval: Optional[str] = None
+    # Collections only: restrict the context to these source ids (default: every source)
+    source_ids: Optional[List[str]] = None
+
+class CollectionRequest(BaseModel):
+    name: Optional[str] = None
+    model_name: Optional[str] = "gemini-2.5-flash"
+
+class SourceRequest(BaseModel):
+    source_path: str
 
 # -----------------
 # UTILS
@@ -66,6 +140,49 @@ class ProcessRequest(BaseModel):
 TEMP_DIR = os.path.join(os.getcwd(), "temp")
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+def _save_upload(fileobj, file_location: str):
+    with open(file_location, "wb") as buffer:
+        shutil.copyfileobj(fileobj, buffer)
+
+# -----------------
+# STARTUP
+# -----------------
+
+@app.on_event("startup")
+async def start_job_workers():
+    await jobs.start(_run_job)
+
+@app.on_event("startup")
+async def warmup_models():
+    """Load the shared CLIP model(s) and mode query embeddings once per worker before the first request."""
+    try:
+        report = await run_in_stage("embed", model_registry.warmup)
+        logger.info(f"Model warmup complete: {report}")
+        # Summary/quiz retrieval queries are fixed: embed them now (or load them from disk)
+        backends = [await run_in_stage("embed", ClipTextBackend, clip_model_id) for clip_model_id in Config.WARMUP_CLIP_MODELS]
+        if Config.TEXT_EMBED_BACKEND != "clip":
+            backends.append(await run_in_stage("embed", get_text_backend))
+        for backend in backends:
+            size = await run_in_stage("embed", mode_query_table.warmup, backend.key, backend.embed_texts)
+            logger.info(f"Mode query embeddings ready for {backend.key}: {size} queries")
+    except Exception as e:
+        # Not fatal: the registry retries the load on the first request
+        logger.error(f"Model warmup failed: {e}")
+
+@app.on_event("startup")
+async def start_ocr_workers():
+    if Config.OCR_PREWARM:
+        try:
+            ocr_pool.start()
+        except Exception as e:
+            logger.error(f"OCR pool failed to start: {e}")
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await jobs.stop()
+    shutdown_executors()
+    ocr_pool.close()
+
 # -----------------
 # API ENDPOINTS
 # -----------------
@@ -77,6 +194,20 @@ async def check_status():
         return {"configured": True}
     return {"configured": False}
 
+@app.get("/api/stats")
+async def get_stats():
+    """Report shared model load stats and embedding cache hit/miss counters."""
+    return {
+        "models": model_registry.report(),
+        "embedding_cache": embedding_cache_stats(),
+        "index_store": index_store.stats(),
+        "response_cache": response_cache.stats(),
+        "jobs": jobs.stats(),
+        "ocr": ocr_pool.stats(),
+        "ocr_cache": ocr_cache.stats(),
+        "image_analysis": image_analyzer.stats(),
+    }
+
 @app.post("/api/init")
 async def init_session(request: InitRequest):
     """
@@ -95,10 +226,10 @@ async def init_session(request: InitRequest):
         quiz_generator = QuizProcessor(model_name=request.model_name)
         
         try:
-            available_models = utils.list_available_models(api_key_to_use)
+            available_models = await run_in_stage("ingest", utils.list_available_models, api_key_to_use)
         except AttributeError:
              from src.utils import list_available_models
-             available_models = list_available_models(api_key_to_use)
+             available_models = await run_in_stage("ingest", list_available_models, api_key_to_use)
         
         return {
             "status": "success", 
@@ -123,8 +254,7 @@ async def upload_file(file: UploadFile = File(...)):
             raise HTTPException(status_code=413, detail=f"File exceeds maximum size of {MAX_SIZE_MB}MB")
 
         file_location = os.path.join(TEMP_DIR, file.filename)
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        await run_in_stage("ingest", _save_upload, file.file, file_location)
         
         logger.info(f"File saved to {file_location} (Size: {file_size/1024/1024:.2f} MB)")
         return {"file_path": file_location, "filename": file.filename}
@@ -134,6 +264,142 @@ async def upload_file(file: UploadFile = File(...)):
         logger.error(f"Upload failed: {e}")
         raise HTTPException(status_code=500, detail="File upload failed")
 
+def _select_ingestor(source_path: str, model_name: str):
+    """Pick the ingestor for a local file, a URL or a search query."""
+    from src.ingestors.file import FileIngestor
+
+    ext = os.path.splitext(source_path)[1].lower()
+    
+    if os.path.exists(source_path):
+        # It is a local file
+        if ext in ['.jpg', '.jpeg', '.png', '.bmp']:
+            from src.ingestors.image import ImageIngestor
+            return ImageIngestor(model_name=model_name) 
+        return FileIngestor()
+    
+    elif source_path.startswith("http"):
+        # It is a URL
+        if "youtube.com" in source_path or "youtu.be" in source_path:
+            from src.ingestors.youtube import YouTubeIngestor
+            return YouTubeIngestor()
+        return SearchIngestor()
+    
+    # It is a search query or raw text
+    return SearchIngestor()
+
+async def _ingest_source(source_path: str, model_name: str, job: Optional[Job] = None):
+    """
+    Returns (rag_processor, fingerprint) for source_path.
+    A stored index for the same source is restored instead of re-ingesting.
+    Every blocking step runs on its stage pool so the event loop stays free.
+    If a background job is given, per-stage progress is reported to it.
+    """
+    from src.processors.multimodal_rag import MultiModalRAGProcessor
+
+    # Construction may load CLIP on a cold worker
+    rag_processor = await run_in_stage("embed", MultiModalRAGProcessor, model_name=model_name)
+    fingerprint = await run_in_stage("ingest", index_store.fingerprint, source_path, rag_processor.index_key)
+
+    # 1. Reuse a stored index for this exact source if we have one
+    if Config.INDEX_STORE_ENABLED and await run_in_stage("ingest", index_store.load, fingerprint, rag_processor):
+        if job:
+            job.update("index", reused=True)
+        return rag_processor, fingerprint
+
+    # 2. Ingest Data (Text + Images)
+    ingestor = _select_ingestor(source_path, model_name)
+    if job:
+        ingestor.progress_callback = job.reporter("ingest")
+
+    # Parsing feeds the embedder batch by batch; the ingest stage runs the loop and
+    # each batch takes an embed slot only while it is encoded (see _index_chunks)
+    items = iter_in_background(ingestor.iter_multimodal(source_path), max_buffered=Config.INGEST_BUFFER_ITEMS)
+    ingest_status = await run_in_stage(
+        "ingest", rag_processor.ingest_stream, items,
+        progress_callback=job.reporter("embed") if job else None
+    )
+    logger.info(f"RAG Ingestion Status: {ingest_status}")
+
+    if not rag_processor.has_index:
+         raise HTTPException(status_code=400, detail="Could not extract content from source")
+
+    if job:
+        job.update("index", reused=False)
+    if Config.INDEX_STORE_ENABLED:
+        await run_in_stage("ingest", index_store.save, fingerprint, rag_processor, source=source_path)
+    return rag_processor, fingerprint
+
+def _get_session(document_id: str) -> DocumentSession:
+    session = sessions.get(document_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown document id. Ingest it again via /api/documents.")
+    return session
+
+PROCESS_MODES = ("summarize", "quiz")
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+def _check_retrieval(retrieval: Optional[str]):
+    if retrieval is not None and retrieval not in RETRIEVAL_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid retrieval mode, expected one of {list(RETRIEVAL_MODES)}")
+
+def _check_sources(session, source_ids: Optional[List[str]]):
+    if source_ids is not None:
+        unknown = set(source_ids) - set(session.rag_processor.sources())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown source ids: {sorted(unknown)}")
+
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _sse_response(event_stream) -> StreamingResponse:
+    # X-Accel-Buffering stops reverse proxies from holding events back
+    return StreamingResponse(event_stream, media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _stream_tokens(chunks, trace_id: str) -> StreamingResponse:
+    """SSE: a 'token' event per generated text chunk, then 'done' with the trace metrics."""
+    async def event_stream():
+        try:
+            async for text in chunks:
+                yield _sse_event("token", {"text": text})
+            yield _sse_event("done", {"metrics": metrics_manager.get_trace(trace_id)})
+        except Exception as e:
+            logger.error(f"Streaming error: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+
+    return _sse_response(event_stream())
+
+def _response(result, processor) -> Dict[str, Any]:
+    """Result plus metadata about the prompt that produced it (context budget usage, cache hit)."""
+    return {"result": result, "metadata": {"context": processor.last_context_usage, "cached": processor.last_cache_hit}}
+
+async def _generate(request: ProcessRequest, rag_processor) -> Dict[str, Any]:
+    """Runs the summarizer or quiz generator selected by request.mode."""
+    if request.mode == "summarize":
+        current_summarizer = SummarizerProcessor(model_name=request.model_name)
+        result = await current_summarizer.asummarize(
+            rag_processor=rag_processor,
+            summary_type=request.summary_type,
+            use_cache=request.use_cache,
+            multi_query=request.multi_query,
+            retrieval=request.retrieval
+        )
+        return _response(result, current_summarizer)
+    
+    elif request.mode == "quiz":
+        current_quiz_generator = QuizProcessor(model_name=request.model_name)
+        result = await current_quiz_generator.agenerate_quiz(
+            rag_processor=rag_processor,
+            num_questions=request.num_questions,
+            difficulty=request.difficulty,
+            use_cache=request.use_cache,
+            multi_query=request.multi_query,
+            retrieval=request.retrieval
+        )
+        return _response(result, current_quiz_generator)
+    
+    raise HTTPException(status_code=400, detail="Invalid mode")
+
 @app.post("/api/process")
 async def process_content(request: ProcessRequest):
     """
@@ -141,70 +407,364 @@ async def process_content(request: ProcessRequest):
     Uses MultiModalRAGProcessor for context-aware processing.
     """
     try:
-        from src.ingestors.file import FileIngestor
-        from src.processors.multimodal_rag import MultiModalRAGProcessor
-        
-        source_path = request.source_path
-        
-        # 1. Ingest Data (Text + Images)
-        ingestor = None
-        ext = os.path.splitext(source_path)[1].lower()
-        
-        if os.path.exists(source_path):
-            # It is a local file
-            if ext in ['.jpg', '.jpeg', '.png', '.bmp']:
-                from src.ingestors.image import ImageIngestor
-                ingestor = ImageIngestor(model_name=request.model_name) 
-            else:
-                ingestor = FileIngestor()
-        
-        elif source_path.startswith("http"):
-            # It is a URL
-            if "youtube.com" in source_path or "youtu.be" in source_path:
-                from src.ingestors.youtube import YouTubeIngestor
-                ingestor = YouTubeIngestor()
-            else:
-                ingestor = SearchIngestor()
-        
-        else:
-            # It is a search query or raw text
-            ingestor = SearchIngestor()
-            
-        data = ingestor.load_multimodal(source_path)
-        
-        if not data or (not data.get("text_pages") and not data.get("images")):
-             raise HTTPException(status_code=400, detail="Could not extract content from source")
+        if request.mode not in PROCESS_MODES:
+            raise HTTPException(status_code=400, detail="Invalid mode")
+        _check_retrieval(request.retrieval)
 
-        # 2. Initialize RAG Processor with selected model
-        rag_processor = MultiModalRAGProcessor(model_name=request.model_name)
-        ingest_status = rag_processor.ingest_data(data)
-        logger.info(f"RAG Ingestion Status: {ingest_status}")
+        rag_processor, _ = await _ingest_source(request.source_path, request.model_name)
 
         # 3. Route to Processor
-        if request.mode == "summarize":
-            current_summarizer = SummarizerProcessor(model_name=request.model_name)
-            result = current_summarizer.summarize(
-                rag_processor=rag_processor,
-                summary_type=request.summary_type
-            )
-            return {"result": result}
-        
-        elif request.mode == "quiz":
-            current_quiz_generator = QuizProcessor(model_name=request.model_name)
-            questions = current_quiz_generator.generate_quiz(
-                rag_processor=rag_processor,
-                num_questions=request.num_questions,
-                difficulty=request.difficulty
-            )
-            return {"result": questions}
-        
-        else:
-            raise HTTPException(status_code=400, detail="Invalid mode")
+        return await _generate(request, rag_processor)
+
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Processing error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/process/stream")
+async def process_content_stream(request: ProcessRequest):
+    """Like /api/process for summaries, but streams tokens over Server-Sent Events."""
+    if request.mode != "summarize":
+        raise HTTPException(status_code=400, detail="Only summarize mode can be streamed")
+    _check_retrieval(request.retrieval)
+    try:
+        rag_processor, _ = await _ingest_source(request.source_path, request.model_name)
+    except HTTPException as he:
+        raise he
     except Exception as e:
         logger.error(f"Processing error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+    trace_id = uuid.uuid4().hex
+    current_summarizer = SummarizerProcessor(model_name=request.model_name)
+    return _stream_tokens(
+        current_summarizer.astream_summary(rag_processor, summary_type=request.summary_type, trace_id=trace_id,
+                                          use_cache=request.use_cache, multi_query=request.multi_query,
+                                          retrieval=request.retrieval),
+        trace_id
+    )
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Latency, TTFT and throughput of the most recent LLM calls."""
+    return {"history": metrics_manager.get_history()}
+
+# -----------------
+# BACKGROUND JOBS (submit, then poll or stream progress)
+# -----------------
+
+async def _run_job(job: Job):
+    """ingest -> embed -> index -> generate for one queued ProcessRequest."""
+    request = ProcessRequest(**job.request)
+    rag_processor, document_id = await _ingest_source(request.source_path, request.model_name, job=job)
+
+    # Keep the ingested document warm so follow-up calls can use /api/documents/{id}/...
+    sessions.put(DocumentSession(document_id, request.source_path, request.model_name, rag_processor))
+
+    job.update("generate", mode=request.mode)
+    return {"document_id": document_id, **await _generate(request, rag_processor)}
+
+def _get_job(job_id: str) -> Job:
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(request: ProcessRequest):
+    """Queue a /api/process request and return immediately with a job id."""
+    if request.mode not in PROCESS_MODES:
+        raise HTTPException(status_code=400, detail="Invalid mode")
+    _check_retrieval(request.retrieval)
+    try:
+        job = jobs.submit(request.model_dump())
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return {"job_id": job.job_id, "status": job.status}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _get_job(job_id).snapshot()
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """Server-Sent Events: one 'progress' event per change, then a final 'done' event."""
+    job = _get_job(job_id)
+
+    async def event_stream():
+        last_version = -1
+        while True:
+            snapshot = job.snapshot()
+            if snapshot["version"] != last_version:
+                last_version = snapshot["version"]
+                yield _sse_event("done" if job.done else "progress", snapshot)
+            if job.done:
+                break
+            await asyncio.sleep(Config.JOB_EVENT_INTERVAL_SEC)
+
+    return _sse_response(event_stream())
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    _get_job(job_id)
+    return jobs.cancel(job_id).snapshot()
+
+# -----------------
+# DOCUMENT SESSIONS (ingest once, query many)
+# -----------------
+
+@app.post("/api/documents")
+async def create_document(request: DocumentRequest):
+    """Ingest a source once and return a document id for the endpoints below."""
+    try:
+        index_key = await run_in_stage("embed", default_index_key)
+        document_id = await run_in_stage("ingest", index_store.fingerprint, request.source_path, index_key)
+        session = sessions.get(document_id)
+        if session is None or session.model_name != request.model_name:
+            rag_processor, document_id = await _ingest_source(request.source_path, request.model_name)
+            session = DocumentSession(document_id, request.source_path, request.model_name, rag_processor)
+            sessions.put(session)
+        return session.describe()
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Document ingestion error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/documents")
+async def list_documents():
+    return {"documents": sessions.list()}
+
+@app.delete("/api/documents/{document_id}")
+async def delete_document(document_id: str):
+    if not sessions.remove(document_id):
+        raise HTTPException(status_code=404, detail="Unknown document id")
+    return {"status": "deleted"}
+
+async def _summarize(session, request: SummarizeRequest):
+    _check_retrieval(request.retrieval)
+    _check_sources(session, request.source_ids)
+    try:
+        current_summarizer = SummarizerProcessor(model_name=request.model_name or session.model_name)
+        result = await current_summarizer.asummarize(
+            rag_processor=session.rag_processor,
+            summary_type=request.summary_type,
+            use_cache=request.use_cache,
+            multi_query=request.multi_query,
+            retrieval=request.retrieval,
+            sources=request.source_ids
+        )
+        return _response(result, current_summarizer)
+    except Exception as e:
+        logger.error(f"Summarization error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _summarize_stream(session, request: SummarizeRequest):
+    _check_retrieval(request.retrieval)
+    _check_sources(session, request.source_ids)
+    trace_id = uuid.uuid4().hex
+    current_summarizer = SummarizerProcessor(model_name=request.model_name or session.model_name)
+    return _stream_tokens(
+        current_summarizer.astream_summary(session.rag_processor, summary_type=request.summary_type, trace_id=trace_id,
+                                          use_cache=request.use_cache, multi_query=request.multi_query,
+                                          retrieval=request.retrieval, sources=request.source_ids),
+        trace_id
+    )
+
+async def _quiz(session, request: QuizRequest):
+    _check_retrieval(request.retrieval)
+    _check_sources(session, request.source_ids)
+    try:
+        current_quiz_generator = QuizProcessor(model_name=request.model_name or session.model_name)
+        questions = await current_quiz_generator.agenerate_quiz(
+            rag_processor=session.rag_processor,
+            num_questions=request.num_questions,
+            difficulty=request.difficulty,
+            use_cache=request.use_cache,
+            multi_query=request.multi_query,
+            retrieval=request.retrieval,
+            sources=request.source_ids
+        )
+        return _response(questions, current_quiz_generator)
+    except Exception as e:
+        logger.error(f"Quiz generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def _query(session, request: QueryRequest):
+    _check_retrieval(request.retrieval)
+    _check_sources(session, request.source_ids)
+    try:
+        answer, cached = await session.rag_processor.aquery_with_cache_status(
+            request.question, k=request.k, retrieval=request.retrieval, sources=request.source_ids)
+        return {"result": answer, "metadata": {"cached": cached}}
+    except Exception as e:
+        logger.error(f"Query error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _query_stream(session, request: QueryRequest):
+    _check_retrieval(request.retrieval)
+    _check_sources(session, request.source_ids)
+    trace_id = uuid.uuid4().hex
+    return _stream_tokens(
+        session.rag_processor.astream_query(request.question, k=request.k, trace_id=trace_id, retrieval=request.retrieval,
+                                            sources=request.source_ids),
+        trace_id
+    )
+
+@app.post("/api/documents/{document_id}/summarize")
+async def summarize_document(document_id: str, request: SummarizeRequest):
+    return await _summarize(_get_session(document_id), request)
+
+@app.post("/api/documents/{document_id}/summarize/stream")
+async def summarize_document_stream(document_id: str, request: SummarizeRequest):
+    return _summarize_stream(_get_session(document_id), request)
+
+@app.post("/api/documents/{document_id}/quiz")
+async def quiz_document(document_id: str, request: QuizRequest):
+    return await _quiz(_get_session(document_id), request)
+
+@app.post("/api/documents/{document_id}/query")
+async def query_document(document_id: str, request: QueryRequest):
+    return await _query(_get_session(document_id), request)
+
+@app.post("/api/documents/{document_id}/query/stream")
+async def query_document_stream(document_id: str, request: QueryRequest):
+    return _query_stream(_get_session(document_id), request)
+
+# -----------------
+# COLLECTIONS (several sources in one index, add/remove without re-ingesting the rest)
+# -----------------
+
+_COLLECTION_ID_RE = re.compile(r"[0-9a-f]{32}")
+# Only one request restores a saved collection into memory at a time
+_collection_load_lock = asyncio.Lock()
+
+async def _get_collection(collection_id: str) -> CollectionSession:
+    """The in-memory collection, restored from COLLECTIONS_DIR if it was evicted or the server restarted."""
+    if not _COLLECTION_ID_RE.fullmatch(collection_id):
+        raise HTTPException(status_code=404, detail="Unknown collection id")
+    session = collections.get(collection_id)
+    if session is not None:
+        return session
+
+    async with _collection_load_lock:
+        session = collections.get(collection_id)
+        if session is None:
+            meta = await run_in_stage("ingest", CollectionSession.read_meta, Config.COLLECTIONS_DIR, collection_id)
+            if meta is None:
+                raise HTTPException(status_code=404, detail="Unknown collection id")
+            from src.processors.multimodal_rag import MultiModalRAGProcessor
+            rag_processor = await run_in_stage("embed", MultiModalRAGProcessor, model_name=meta["model_name"])
+            session = await run_in_stage("ingest", CollectionSession.load, Config.COLLECTIONS_DIR, collection_id, meta, rag_processor)
+            collections.put(session)
+    return session
+
+@app.post("/api/collections")
+async def create_collection(request: CollectionRequest):
+    """Create an empty collection; add sources to it with /api/collections/{id}/sources."""
+    from src.processors.multimodal_rag import MultiModalRAGProcessor
+
+    rag_processor = await run_in_stage("embed", MultiModalRAGProcessor, model_name=request.model_name)
+    collection_id = uuid.uuid4().hex
+    session = CollectionSession(collection_id, request.name or collection_id[:8], request.model_name, rag_processor)
+    await run_in_stage("ingest", session.save, Config.COLLECTIONS_DIR)
+    collections.put(session)
+    return session.describe()
+
+@app.get("/api/collections")
+async def list_collections():
+    """Every saved collection, whether or not it is currently loaded."""
+    def list_saved():
+        if not os.path.isdir(Config.COLLECTIONS_DIR):
+            return []
+        saved = []
+        for collection_id in sorted(os.listdir(Config.COLLECTIONS_DIR)):
+            meta = CollectionSession.read_meta(Config.COLLECTIONS_DIR, collection_id) if _COLLECTION_ID_RE.fullmatch(collection_id) else None
+            if meta is not None:
+                saved.append({"collection_id": collection_id, "name": meta["name"], "model_name": meta["model_name"],
+                              "sources": len(meta["sources"]), "loaded": collections.get(collection_id) is not None})
+        return saved
+
+    return {"collections": await run_in_stage("ingest", list_saved)}
+
+@app.get("/api/collections/{collection_id}")
+async def get_collection(collection_id: str):
+    return (await _get_collection(collection_id)).describe()
+
+@app.delete("/api/collections/{collection_id}")
+async def delete_collection(collection_id: str):
+    # Not restored into memory first: deleting only needs the directory gone
+    if not _COLLECTION_ID_RE.fullmatch(collection_id):
+        raise HTTPException(status_code=404, detail="Unknown collection id")
+    entry_dir = os.path.join(Config.COLLECTIONS_DIR, collection_id)
+    loaded = collections.remove(collection_id)
+    if not loaded and not await run_in_stage("ingest", os.path.isdir, entry_dir):
+        raise HTTPException(status_code=404, detail="Unknown collection id")
+    await run_in_stage("ingest", shutil.rmtree, entry_dir, True)
+    return {"status": "deleted"}
+
+@app.post("/api/collections/{collection_id}/sources")
+async def add_collection_source(collection_id: str, request: SourceRequest):
+    """
+    Ingest one source into the collection's existing indexes. The source id is
+    derived from the source, so adding the same file or URL again replaces it.
+    """
+    session = await _get_collection(collection_id)
+    rag_processor = session.rag_processor
+    try:
+        fingerprint = await run_in_stage("ingest", index_store.fingerprint, request.source_path, rag_processor.index_key)
+        source_id = fingerprint[:16]
+        ingestor = _select_ingestor(request.source_path, session.model_name)
+        items = iter_in_background(ingestor.iter_multimodal(request.source_path), max_buffered=Config.INGEST_BUFFER_ITEMS)
+        ingest_status = await run_in_stage("ingest", rag_processor.add_stream, items, source_id)
+        logger.info(f"Collection {collection_id[:8]} source {source_id}: {ingest_status}")
+        indexed = source_id in rag_processor.sources()
+        # A failed re-add has still dropped the previous copy of the source
+        if indexed:
+            session.sources[source_id] = request.source_path
+        else:
+            session.sources.pop(source_id, None)
+        await run_in_stage("ingest", session.save, Config.COLLECTIONS_DIR)
+        if not indexed:
+            raise HTTPException(status_code=400, detail="Could not extract content from source")
+        return {"source_id": source_id, **session.describe()}
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        logger.error(f"Collection ingestion error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.delete("/api/collections/{collection_id}/sources/{source_id}")
+async def remove_collection_source(collection_id: str, source_id: str):
+    session = await _get_collection(collection_id)
+    if source_id not in session.sources:
+        raise HTTPException(status_code=404, detail="Unknown source id")
+    await run_in_stage("embed", session.rag_processor.remove_source, source_id)
+    session.sources.pop(source_id, None)
+    await run_in_stage("ingest", session.save, Config.COLLECTIONS_DIR)
+    return session.describe()
+
+@app.post("/api/collections/{collection_id}/summarize")
+async def summarize_collection(collection_id: str, request: SummarizeRequest):
+    return await _summarize(await _get_collection(collection_id), request)
+
+@app.post("/api/collections/{collection_id}/summarize/stream")
+async def summarize_collection_stream(collection_id: str, request: SummarizeRequest):
+    return _summarize_stream(await _get_collection(collection_id), request)
+
+@app.post("/api/collections/{collection_id}/quiz")
+async def quiz_collection(collection_id: str, request: QuizRequest):
+    return await _quiz(await _get_collection(collection_id), request)
+
+@app.post("/api/collections/{collection_id}/query")
+async def query_collection(collection_id: str, request: QueryRequest):
+    return await _query(await _get_collection(collection_id), request)
+
+@app.post("/api/collections/{collection_id}/query/stream")
+async def query_collection_stream(collection_id: str, request: QueryRequest):
+    return _query_stream(await _get_collection(collection_id), request)
+
 
 app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
 
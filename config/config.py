@@ -14,6 +14,184 @@ class Config:
     PDFS_DIR = os.path.join(DATA_DIR, "pdfs")
     QUESTIONS_FILE = os.path.join(DATA_DIR, "questions.json")
 
+    # Models
+    CLIP_MODEL_ID = os.getenv("CLIP_MODEL_ID", "openai/clip-vit-base-patch32")
+    # Comma separated list of CLIP models to load when the API starts
+    WARMUP_CLIP_MODELS = [m.strip() for m in os.getenv("WARMUP_CLIP_MODELS", CLIP_MODEL_ID).split(",") if m.strip()]
+
+    # CLIP inference runtime on CPU: "torch" (fp32), "int8" (dynamic quantization) or
+    # "onnx" (ONNX Runtime; optional, `pip install onnxruntime`). Accelerated runtimes whose outputs fall below
+    # CLIP_MIN_COSINE similarity to fp32 on a probe batch fall back to fp32
+    CLIP_RUNTIME = os.getenv("CLIP_RUNTIME", "torch")
+    CLIP_MIN_COSINE = float(os.getenv("CLIP_MIN_COSINE", "0.98"))
+
+    # Text chunk embeddings: "clip" (CLIP text tower, shares the image vector space) or
+    # "sentence" (small local sentence model; runtime "torch", "int8" or "onnx")
+    TEXT_EMBED_BACKEND = os.getenv("TEXT_EMBED_BACKEND", "clip")
+    TEXT_EMBED_MODEL_ID = os.getenv("TEXT_EMBED_MODEL_ID", "sentence-transformers/all-MiniLM-L6-v2")
+    TEXT_EMBED_RUNTIME = os.getenv("TEXT_EMBED_RUNTIME", "int8")
+    TEXT_EMBED_MAX_TOKENS = int(os.getenv("TEXT_EMBED_MAX_TOKENS", "256"))
+    ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", os.path.join(DATA_DIR, "onnx"))
+
+    # Embedding
+    EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # 0 keeps torch's default (one thread per physical core)
+    TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))
+
+    # Embeddings of the fixed summary/quiz retrieval queries, per CLIP model
+    QUERY_EMBED_DIR = os.getenv("QUERY_EMBED_DIR", os.path.join(DATA_DIR, "query_embeddings"))
+    # Summaries and quizzes search with each facet of their mode query and fuse the results
+    MULTI_QUERY_RETRIEVAL = os.getenv("MULTI_QUERY_RETRIEVAL", "0") == "1"
+    # Default retrieval: "dense" (vectors only) or "hybrid" (text vectors fused with BM25 over text chunks)
+    RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")
+    # Text and image hits are merged on cosine. Image hits below RETRIEVAL_IMAGE_MIN_SCORE
+    # are dropped; with a text backend outside CLIP's space, image cosines are shifted by
+    # RETRIEVAL_IMAGE_SCORE_OFFSET onto that backend's scale (a fixed calibration)
+    RETRIEVAL_IMAGE_MIN_SCORE = float(os.getenv("RETRIEVAL_IMAGE_MIN_SCORE", "0.2"))
+    RETRIEVAL_IMAGE_SCORE_OFFSET = float(os.getenv("RETRIEVAL_IMAGE_SCORE_OFFSET", "0.35"))
+
+    # FAISS index type: "auto" (by vector count: flat below FAISS_FLAT_MAX_VECTORS, then
+    # hnsw, ivf_flat and ivf_pq), or one of "flat", "hnsw", "ivf_flat", "ivf_pq".
+    # All use inner product over the L2-normalised embeddings
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+    FAISS_FLAT_MAX_VECTORS = int(os.getenv("FAISS_FLAT_MAX_VECTORS", "20000"))
+    FAISS_HNSW_MAX_VECTORS = int(os.getenv("FAISS_HNSW_MAX_VECTORS", "200000"))
+    FAISS_IVF_FLAT_MAX_VECTORS = int(os.getenv("FAISS_IVF_FLAT_MAX_VECTORS", "1000000"))
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+    FAISS_IVF_NPROBE = int(os.getenv("FAISS_IVF_NPROBE", "16"))
+
+    # Embedding cache (content hash -> vector, persisted across restarts)
+    EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") == "1"
+    EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", os.path.join(DATA_DIR, "embedding_cache"))
+    EMBED_CACHE_MAX_MB = int(os.getenv("EMBED_CACHE_MAX_MB", "512"))
+
+    # Ingested document indexes, reused across requests for the same source
+    INDEX_STORE_ENABLED = os.getenv("INDEX_STORE_ENABLED", "1") == "1"
+    INDEX_STORE_DIR = os.getenv("INDEX_STORE_DIR", os.path.join(DATA_DIR, "indexes"))
+    INDEX_STORE_TTL_HOURS = float(os.getenv("INDEX_STORE_TTL_HOURS", "24"))
+    INDEX_STORE_MAX_MB = int(os.getenv("INDEX_STORE_MAX_MB", "1024"))
+
+    # Extracted images: original bytes kept in memory up to IMAGE_STORE_MEMORY_MB per
+    # document (then spilled to a temp file); prompts get a downscaled JPEG copy
+    IMAGE_STORE_MEMORY_MB = int(os.getenv("IMAGE_STORE_MEMORY_MB", "64"))
+    IMAGE_URL_CACHE_SIZE = int(os.getenv("IMAGE_URL_CACHE_SIZE", "16"))
+    PROMPT_IMAGE_MAX_DIM = int(os.getenv("PROMPT_IMAGE_MAX_DIM", "1024"))
+    PROMPT_IMAGE_QUALITY = int(os.getenv("PROMPT_IMAGE_QUALITY", "85"))
+
+    # Prompt context budgets (estimated tokens / request bytes) for retrieved chunks
+    # and images. Per summary type overrides: "concise=3000,detailed=7000"
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+    CONTEXT_MAX_BYTES = int(os.getenv("CONTEXT_MAX_BYTES", str(4 * 1024 * 1024)))
+    SUMMARY_TOKEN_BUDGETS = {
+        "concise": 3000,
+        "executive": 3000,
+        "bullet_points": 4500,
+        "educational": 4500,
+        "exam_ready": 5000,
+        "detailed": 7000,
+        "technical_deep_dive": 8000,
+        **{k.strip(): int(v) for k, v in (
+            pair.split("=", 1) for pair in os.getenv("SUMMARY_TOKEN_BUDGETS", "").split(",") if "=" in pair
+        )}
+    }
+    QUIZ_TOKEN_BUDGET = int(os.getenv("QUIZ_TOKEN_BUDGET", "6000"))
+
+    # Exact LLM response cache: (model, temperature, prompt incl. image hashes) -> response
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+    RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", os.path.join(DATA_DIR, "response_cache.sqlite3"))
+    RESPONSE_CACHE_TTL_HOURS = float(os.getenv("RESPONSE_CACHE_TTL_HOURS", "24"))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+    RESPONSE_CACHE_MAX_MB = int(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+
+    # Per-document semantic cache for free-form questions: a question reuses an earlier
+    # answer when its embedding is within QUERY_CACHE_THRESHOLD cosine, its numbers and
+    # negations match, and retrieval returned the same chunks. Off by default: a wrong
+    # match serves another question's answer (responses report "cached")
+    QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "0") == "1"
+    QUERY_CACHE_THRESHOLD = float(os.getenv("QUERY_CACHE_THRESHOLD", "0.98"))
+    QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "256"))
+
+    # In-memory documents kept warm for /api/documents/{id}/... calls
+    MAX_DOCUMENT_SESSIONS = int(os.getenv("MAX_DOCUMENT_SESSIONS", "8"))
+
+    # Multi-source collections (/api/collections): kept warm in memory and saved to disk after every change
+    MAX_COLLECTIONS = int(os.getenv("MAX_COLLECTIONS", "4"))
+    COLLECTIONS_DIR = os.getenv("COLLECTIONS_DIR", os.path.join(DATA_DIR, "collections"))
+
+    # Per-stage concurrency limits for the API (see src/utils/concurrency.py)
+    INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+    EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "2"))
+    LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+    # Parsed pages/images buffered between the parser and the embedder
+    INGEST_BUFFER_ITEMS = int(os.getenv("INGEST_BUFFER_ITEMS", "64"))
+
+    # PDF extraction: documents with at least PDF_PARALLEL_MIN_PAGES pages are
+    # split into page ranges parsed by PDF_WORKERS processes. Smaller ones parse
+    # serially in well under a second, less than starting the worker pool costs
+    PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "64"))
+    # Pages per shard; PDF_WORKERS + 1 shards are parsed ahead of the consumer at most
+    PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "8"))
+    # Extracted PDF images: ones under PDF_IMAGE_MIN_SIDE pixels or PDF_IMAGE_MIN_ENTROPY
+    # bits (flat fills, rules) are skipped; repeats (same xref or bytes, or a perceptual
+    # hash within PDF_IMAGE_DEDUP_MAX_DISTANCE bits) are folded into the first copy
+    PDF_IMAGE_DEDUP = os.getenv("PDF_IMAGE_DEDUP", "1") == "1"
+    PDF_IMAGE_DEDUP_MAX_DISTANCE = int(os.getenv("PDF_IMAGE_DEDUP_MAX_DISTANCE", "4"))
+    PDF_IMAGE_MIN_SIDE = int(os.getenv("PDF_IMAGE_MIN_SIDE", "32"))
+    PDF_IMAGE_MIN_ENTROPY = float(os.getenv("PDF_IMAGE_MIN_ENTROPY", "1.0"))
+
+    # Web pages of search results (src/utils/web_fetch.py): fetched concurrently over
+    # pooled connections, at most WEB_FETCH_PER_HOST at a time per host. Each page is
+    # cut off at WEB_FETCH_MAX_MB and the whole batch at WEB_FETCH_DEADLINE_SEC
+    WEB_FETCH_TIMEOUT_SEC = float(os.getenv("WEB_FETCH_TIMEOUT_SEC", "10"))
+    WEB_FETCH_DEADLINE_SEC = float(os.getenv("WEB_FETCH_DEADLINE_SEC", "20"))
+    WEB_FETCH_PER_HOST = int(os.getenv("WEB_FETCH_PER_HOST", "2"))
+    WEB_FETCH_MAX_CONNECTIONS = int(os.getenv("WEB_FETCH_MAX_CONNECTIONS", "16"))
+    WEB_FETCH_MAX_MB = float(os.getenv("WEB_FETCH_MAX_MB", "5"))
+    WEB_PARSE_WORKERS = int(os.getenv("WEB_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+    # PaddleOCR worker processes (see src/utils/ocr_pool.py), each keeping one model
+    # loaded. A worker busy on one image for longer than OCR_TIMEOUT_SEC is restarted.
+    # OCR_THREADS_PER_WORKER 0 splits the cores evenly between workers
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(min(2, os.cpu_count() or 1))))
+    OCR_TIMEOUT_SEC = float(os.getenv("OCR_TIMEOUT_SEC", "60"))
+    OCR_LANG = os.getenv("OCR_LANG", "en")
+    OCR_THREADS_PER_WORKER = int(os.getenv("OCR_THREADS_PER_WORKER", "0"))
+    # Start the OCR workers with the API instead of on the first image
+    OCR_PREWARM = os.getenv("OCR_PREWARM", "0") == "1"
+    # Scanned PDF pages (under PDF_OCR_MIN_CHARS of text layer and at least
+    # PDF_OCR_MIN_IMAGE_COVERAGE of the page covered by images) are rasterized at
+    # PDF_OCR_DPI and OCRed on the pool above; born-digital pages are never rasterized
+    PDF_OCR_ENABLED = os.getenv("PDF_OCR_ENABLED", "1") == "1"
+    PDF_OCR_DPI = int(os.getenv("PDF_OCR_DPI", "200"))
+    PDF_OCR_MIN_CHARS = int(os.getenv("PDF_OCR_MIN_CHARS", "20"))
+    PDF_OCR_MIN_IMAGE_COVERAGE = float(os.getenv("PDF_OCR_MIN_IMAGE_COVERAGE", "0.3"))
+    # OCR text per (file hash, page, DPI)
+    OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", os.path.join(DATA_DIR, "ocr_cache.sqlite3"))
+    OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "20000"))
+
+    # Image understanding (src/processors/image_analyzer.py): each image is resolved by
+    # the cheapest tier that can - description cache (same pixels, or a perceptual hash
+    # within IMAGE_HASH_MAX_DISTANCE bits and a matching CLIP vector), blank check, CLIP zero-shot class plus OCR. Only
+    # IMAGE_ESCALATE_CLASSES, and text-heavy images with under IMAGE_MIN_OCR_CHARS of
+    # OCR text, go to the vision LLM, IMAGE_VISION_CONCURRENCY at a time
+    IMAGE_ESCALATE_CLASSES = [c.strip() for c in os.getenv("IMAGE_ESCALATE_CLASSES", "chart,diagram").split(",") if c.strip()]
+    IMAGE_MIN_OCR_CHARS = int(os.getenv("IMAGE_MIN_OCR_CHARS", "50"))
+    IMAGE_BLANK_STDDEV = float(os.getenv("IMAGE_BLANK_STDDEV", "4"))
+    IMAGE_VISION_CONCURRENCY = int(os.getenv("IMAGE_VISION_CONCURRENCY", "4"))
+    IMAGE_HASH_MAX_DISTANCE = int(os.getenv("IMAGE_HASH_MAX_DISTANCE", "4"))
+    # A near-hash cache match must also have a CLIP cosine of at least this to the cached image
+    IMAGE_CACHE_MIN_COSINE = float(os.getenv("IMAGE_CACHE_MIN_COSINE", "0.95"))
+    IMAGE_DESCRIPTION_CACHE_PATH = os.getenv("IMAGE_DESCRIPTION_CACHE_PATH", os.path.join(DATA_DIR, "image_descriptions.sqlite3"))
+    IMAGE_DESCRIPTION_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_DESCRIPTION_CACHE_MAX_ENTRIES", "5000"))
+
+    # Background jobs (/api/jobs)
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "16"))
+    JOB_RETENTION_MINUTES = float(os.getenv("JOB_RETENTION_MINUTES", "60"))
+    JOB_EVENT_INTERVAL_SEC = float(os.getenv("JOB_EVENT_INTERVAL_SEC", "0.25"))
+
     @staticmethod
     def validate():
         if not Config.GOOGLE_API_KEY:
@@ -406,7 +406,8 @@ document.addEventListener('DOMContentLoaded', () => {
             outputConsole.innerHTML = "<div class='blink'>_ AGENT ANALYZING & GENERATING...</div>";
 
             try {
-                const response = await fetch(`${API_BASE_URL}/api/process`, {
+                // Stream tokens over Server-Sent Events as the model generates them
+                const response = await fetch(`${API_BASE_URL}/api/process/stream`, {
                     method: 'POST',
                     headers: { 'Content-Type': 'application/json' },
                     body: JSON.stringify({
@@ -417,24 +418,39 @@ document.addEventListener('DOMContentLoaded', () => {
                     })
                 });
 
-                if (!response.ok) throw new Error("Processing failed");
-
-                const result = await response.json();
-
-                // Render Result
-                outputConsole.innerHTML = "";
-                const text = result.result;
-
-                // Simple typewriter
-                let i = 0;
-                function typeWriter() {
-                    if (i < text.length) {
-                        outputConsole.innerHTML += text.charAt(i);
-                        i++;
-                        setTimeout(typeWriter, 2);
+                if (!response.ok || !response.body) throw new Error("Processing failed");
+
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = "";
+                let started = false;
+
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += decoder.decode(value, { stream: true });
+
+                    // SSE events are separated by a blank line
+                    const events = buffer.split("\n\n");
+                    buffer = events.pop();
+                    for (const raw of events) {
+                        const eventLine = raw.split("\n").find(l => l.startsWith("event: "));
+                        const dataLine = raw.split("\n").find(l => l.startsWith("data: "));
+                        if (!eventLine || !dataLine) continue;
+                        const event = eventLine.slice(7);
+                        const data = JSON.parse(dataLine.slice(6));
+
+                        if (event === "token") {
+                            if (!started) {
+                                outputConsole.innerHTML = "";
+                                started = true;
+                            }
+                            outputConsole.textContent += data.text;
+                        } else if (event === "error") {
+                            throw new Error(data.detail);
+                        }
                     }
                 }
-                typeWriter();
 
             } catch (e) {
                 outputConsole.innerHTML = `<span style="color:red">ERROR: ${e.message}</span>`;
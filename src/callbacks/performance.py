@@ -4,7 +4,9 @@ from langchain_core.callbacks import BaseCallbackHandler
 from src.utils.metrics import metrics_manager
 
 class PerformanceCallback(BaseCallbackHandler):
-    def __init__(self):
+    def __init__(self, trace_id: str = None):
+        # Which MetricsManager trace to report to (None = the current trace)
+        self.trace_id = trace_id
         self.start_time = None
         self.first_token_time = None
         self.end_time = None
@@ -37,9 +39,20 @@ class PerformanceCallback(BaseCallbackHandler):
                 gen_time = self.end_time - self.start_time
             else:
                 gen_time = 0
+
+            # Streamed chunks usually carry several tokens; prefer the provider's count when reported
+            tokens = self._reported_output_tokens(response) or self.token_count
                 
             metrics_manager.log_llm_metrics(
                 ttft_sec=ttft,
                 gen_sec=gen_time,
-                tokens=self.token_count
+                tokens=tokens,
+                trace_id=self.trace_id
             )
+
+    def _reported_output_tokens(self, response) -> int:
+        try:
+            message = response.generations[0][0].message
+            return (message.usage_metadata or {}).get("output_tokens", 0)
+        except (AttributeError, IndexError):
+            return 0
@@ -1,5 +1,25 @@
 from abc import ABC, abstractmethod
 class BaseIngestor():
+    # Optional callable(**counters) set by callers that want progress (e.g. background jobs)
+    progress_callback = None
+
     @abstractmethod
     def load(self,source:str)->any:
-        pass
\ No newline at end of file
+        pass
+
+    def iter_multimodal(self, source: str):
+        """
+        Yields {'type': 'text', 'text', 'page'} and {'type': 'image', 'image', 'bytes', 'page', 'id'}
+        items, and {'type': 'image_pages', 'id', 'pages'} when an image already
+        yielded turns out to appear on more pages. Ingestors that can produce content incrementally override this; the
+        default wraps load_multimodal.
+        """
+        data = self.load_multimodal(source) or {}
+        for page in data.get("text_pages", []):
+            yield {"type": "text", **page}
+        for image in data.get("images", []):
+            yield {"type": "image", **image}
+
+    def _report_progress(self, **counters):
+        if self.progress_callback:
+            self.progress_callback(**counters)
@@ -1,11 +1,25 @@
 import logging
 import os
+import time
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
 
+from config.config import Config
+from src.utils.image_hash import hamming_many
+from src.utils.ocr_cache import file_digest, ocr_cache
+from src.utils.ocr_pool import OCRError, ocr_pool
 from .base import BaseIngestor
+from .pdf_worker import extract_page_range, extract_pages
 
 logger = logging.getLogger(__name__)
 
 class FileIngestor(BaseIngestor):
+    last_stats = None
+
     def load(self, source: str) -> str:
         """
         Extracts text from a document file.
@@ -54,7 +68,8 @@ class FileIngestor(BaseIngestor):
     def load_multimodal(self, source: str) -> dict:
         """
         Extracts both text and images from a document.
-        Returns: {'text_pages': [{'text': str, 'page': int}], 'images': [{'image': PIL.Image, 'page': int, 'id': str}]}
+        Returns: {'text_pages': [{'text': str, 'page': int}], 'images': [{'image': PIL.Image, 'bytes': bytes, 'page': int, 'pages': [int], 'id': str}]}
+        ('pages' lists every page a deduplicated PDF image appears on)
         """
         if not os.path.exists(source):
             return {"text_pages": [], "images": []}
@@ -70,36 +85,292 @@ class FileIngestor(BaseIngestor):
                 "images": []
             }
 
+    def iter_multimodal(self, source: str):
+        """
+        Yields text pages and images as they are extracted, so callers can start
+        embedding before the whole document has been parsed.
+        """
+        if os.path.exists(source) and os.path.splitext(source)[1].lower() == ".pdf":
+            yield from self._iter_pdf(source)
+        else:
+            yield from super().iter_multimodal(source)
+
     def _read_pdf_multimodal(self, path: str) -> dict:
-        import fitz
-        from PIL import Image
-        import io
-        
-        doc = fitz.open(path)
         result = {"text_pages": [], "images": []}
-        
-        for i, page in enumerate(doc):
-            # Extract Text
-            text = page.get_text()
-            if text.strip():
-                result["text_pages"].append({"text": text, "page": i})
-            
-            # Extract Images
-            for img_index, img in enumerate(page.get_images(full=True)):
-                try:
-                    xref = img[0]
-                    base_image = doc.extract_image(xref)
-                    image_bytes = base_image["image"]
-                    pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-                    image_id = f"page{i}_img{img_index}"
-                    
-                    result["images"].append({
-                        "image": pil_image,
-                        "page": i,
-                        "id": image_id
-                    })
-                except Exception as e:
-                    logger.warning(f"Error extracting image {img_index} on page {i}: {e}")
-        
-        doc.close()
+        images_by_id = {}
+        for item in self._iter_pdf(path):
+            if item["type"] == "text":
+                result["text_pages"].append({"text": item["text"], "page": item["page"]})
+            elif item["type"] == "image_pages":
+                images_by_id[item["id"]]["pages"] = item["pages"]
+            else:
+                image = {"image": item["image"], "bytes": item["bytes"], "page": item["page"],
+                         "pages": item.get("pages", [item["page"]]), "id": item["id"]}
+                images_by_id[item["id"]] = image
+                result["images"].append(image)
+        result["stats"] = self.last_stats
         return result
+
+    def _iter_pdf(self, path: str):
+        """
+        Extracts text and images in page order. Large PDFs are split into shards of
+        PDF_SHARD_PAGES pages parsed in parallel worker processes (each opens its own
+        fitz document). At most PDF_WORKERS + 1 shards are outstanding, and the next
+        one is only submitted once the consumer has taken a shard, so memory is
+        bounded by the window rather than the document.
+        Scanned pages are OCRed on the OCR pool while parsing continues, so their
+        text may arrive after later pages. Repeated images are yielded once, on
+        the first page they appear on, followed later by image_pages items
+        listing the pages they repeat on (see _ImageDedup).
+        Timings end up in self.last_stats once the iterator is exhausted.
+        """
+        import fitz
+        
+        start = time.perf_counter()
+        with fitz.open(path) as doc:
+            total_pages = len(doc)
+        scans = _ScanOCR(path)
+        images = _ImageDedup()
+
+        shards = _plan_shards(total_pages)
+        shard_stats = []
+        self._report_progress(pages_parsed=0, pages_total=total_pages)
+
+        next_shard = 0
+        if len(shards) > 1:
+            try:
+                executor = _get_pdf_executor()
+                in_flight = deque()
+                submitted = 0
+                while next_shard < len(shards):
+                    # Runs again only after the previous shard's items were consumed; by then
+                    # skip_pages knows the cached scans of the document
+                    while submitted < len(shards) and len(in_flight) < Config.PDF_WORKERS + 1:
+                        in_flight.append(executor.submit(extract_page_range, path, *shards[submitted], scans.skip_pages))
+                        submitted += 1
+                    # Collect in submission order so pages stay ordered
+                    shard = in_flight.popleft().result()
+                    next_shard += 1
+                    shard_stats.append({"pages": [shard["first_page"], shard["last_page"]], "ms": shard["ms"]})
+                    self._report_progress(pages_parsed=shard["last_page"], pages_total=total_pages)
+                    yield from scans.feed(images.feed(shard["items"]))
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF worker pool failed, parsing the rest serially: {e}")
+                _reset_pdf_executor()
+
+        if next_shard < len(shards):
+            # Serial path: small documents, single worker, or what is left after a pool failure
+            first = shards[next_shard][0]
+            shard_start = time.perf_counter()
+            seen_xrefs = set()
+            with fitz.open(path) as doc:
+                for i in range(first, total_pages):
+                    yield from scans.feed(images.feed(extract_pages(doc, i, i + 1, scans.skip_pages, seen_xrefs)))
+                    self._report_progress(pages_parsed=i + 1, pages_total=total_pages)
+            shard_stats.append({"pages": [first, total_pages], "ms": round((time.perf_counter() - shard_start) * 1000, 2)})
+        yield from scans.drain()
+
+        self.last_stats = {
+            "pages": total_pages,
+            "parse_ms": round((time.perf_counter() - start) * 1000, 2),
+            "shards": shard_stats,
+            "ocr": scans.stats,
+            "images": images.stats,
+        }
+        logger.info(f"Parsed {total_pages} pages in {len(shard_stats)} shard(s): {self.last_stats['parse_ms']} ms, "
+                    f"images: {images.stats}")
+
+class _ScanOCR:
+    """
+    OCR stage for the scanned pages of one PDF. Page rasters are submitted to the
+    OCR pool as the parser emits them, with a few per OCR worker in flight, and
+    the text is yielded as it completes. Results are cached per (file hash, page,
+    DPI). The file is only hashed and the cache only read once the first scanned
+    page turns up, so born-digital PDFs pay for neither; pages parsed after that
+    are not rasterized at all when cached (skip_pages).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.dpi = Config.PDF_OCR_DPI
+        self.cached = {}
+        self.in_flight = deque()
+        self.stats = {"scanned_pages": 0, "cached": 0, "ocr": 0, "failed": 0, "ocr_wait_ms": 0.0}
+        self.file_hash = None
+        self._cache_loaded = False
+
+    @property
+    def skip_pages(self) -> frozenset:
+        return frozenset(self.cached)
+
+    def _load_cache(self):
+        if self._cache_loaded:
+            return
+        self._cache_loaded = True
+        try:
+            self.file_hash = file_digest(self.path)
+            self.cached = ocr_cache.get_pages(self.file_hash, self.dpi)
+        except Exception as e:
+            logger.warning(f"OCR cache unavailable: {e}")
+
+    def feed(self, items):
+        """Passes text and image items through; scan items become text items once OCRed."""
+        for item in items:
+            if item["type"] != "scan":
+                yield item
+            else:
+                yield from self._start(item)
+            # Hand over whatever has finished without waiting
+            while self.in_flight and self.in_flight[0][1].done():
+                yield from self._collect()
+
+    def drain(self):
+        while self.in_flight:
+            yield from self._collect()
+
+    def _start(self, item: dict):
+        page = item["page"]
+        self.stats["scanned_pages"] += 1
+        self._load_cache()
+        if page in self.cached:
+            self.stats["cached"] += 1
+            ocr_cache.record(hits=1, misses=0)
+            yield from _ocr_text_item(self.cached[page], page)
+            return
+        ocr_cache.record(hits=0, misses=1)
+        try:
+            self.in_flight.append((page, ocr_pool.submit(item["png"])))
+        except OCRError as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Skipping OCR of page {page}: {e}")
+            return
+        while len(self.in_flight) > ocr_pool.num_workers * 2:
+            yield from self._collect()
+
+    def _collect(self):
+        page, future = self.in_flight.popleft()
+        wait_start = time.perf_counter()
+        try:
+            text = future.result()
+        except OCRError as e:
+            self.stats["failed"] += 1
+            logger.warning(f"OCR failed on page {page}: {e}")
+            return
+        finally:
+            self.stats["ocr_wait_ms"] = round(self.stats["ocr_wait_ms"] + (time.perf_counter() - wait_start) * 1000, 2)
+        self.stats["ocr"] += 1
+        if self.file_hash is not None:
+            try:
+                ocr_cache.put(self.file_hash, page, self.dpi, text)
+            except Exception as e:
+                logger.warning(f"Could not cache OCR text of page {page}: {e}")
+        yield from _ocr_text_item(text, page)
+
+class _ImageDedup:
+    """
+    Drops repeated PDF images (logos, banners, slide templates) before they are
+    embedded. Exact repeats are matched by xref or byte digest, near-duplicates
+    by perceptual hash. The first copy is kept; items already yielded are never
+    changed afterwards. When a repeat adds a page to it, an
+    {"type": "image_pages", "id", "pages"} item follows with the full page list.
+    """
+
+    def __init__(self):
+        self.enabled = Config.PDF_IMAGE_DEDUP
+        self.by_xref = {}
+        self.by_digest = {}
+        self.skipped_xrefs = {}
+        self.canonical = []
+        self.pages = {}
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.stats = {"images": 0, "unique": 0, "exact_duplicates": 0, "near_duplicates": 0,
+                      "skipped_small": 0, "skipped_low_entropy": 0}
+
+    def feed(self, items):
+        for item in items:
+            kind = item["type"]
+            if kind not in ("image", "image_ref", "image_skip"):
+                yield item
+                continue
+            self.stats["images"] += 1
+            xref = item["xref"]
+            if kind == "image_skip":
+                self.skipped_xrefs[xref] = item["reason"]
+                self.stats[f"skipped_{item['reason']}"] += 1
+            elif xref in self.skipped_xrefs:
+                self.stats[f"skipped_{self.skipped_xrefs[xref]}"] += 1
+            elif xref in self.by_xref:
+                yield from self._add_page(self.by_xref[xref], item["page"], "exact_duplicates")
+            elif kind == "image":
+                canonical, counter = self._match(item)
+                if canonical is None:
+                    item["pages"] = [item["page"]]
+                    self._register(item)
+                    self.stats["unique"] += 1
+                    yield item
+                else:
+                    self.by_xref[xref] = canonical
+                    yield from self._add_page(canonical, item["page"], counter)
+
+    def _match(self, item: dict):
+        """(kept copy item duplicates, kind of match), or (None, None)."""
+        if not self.enabled:
+            return None, None
+        canonical = self.by_digest.get(item["digest"])
+        if canonical is not None:
+            return canonical, "exact_duplicates"
+        if len(self.hashes):
+            distances = hamming_many(self.hashes, item["phash"])
+            nearest = int(np.argmin(distances))
+            if distances[nearest] <= Config.PDF_IMAGE_DEDUP_MAX_DISTANCE:
+                return self.canonical[nearest], "near_duplicates"
+        return None, None
+
+    def _register(self, item: dict):
+        if self.enabled:
+            self.by_xref[item["xref"]] = item
+            self.by_digest[item["digest"]] = item
+            self.canonical.append(item)
+            self.pages[item["id"]] = [item["page"]]
+            self.hashes = np.append(self.hashes, np.uint64(item["phash"]))
+
+    def _add_page(self, canonical: dict, page: int, counter: str):
+        self.stats[counter] += 1
+        pages = self.pages[canonical["id"]]
+        if page not in pages:
+            pages.append(page)
+            yield {"type": "image_pages", "id": canonical["id"], "pages": list(pages)}
+
+def _ocr_text_item(text: str, page: int):
+    if text.strip():
+        yield {"type": "text", "text": text, "page": page, "ocr": True}
+
+def _plan_shards(total_pages: int):
+    """Page ranges [first, last) to parse in parallel; a single range for small documents."""
+    if Config.PDF_WORKERS <= 1 or total_pages < Config.PDF_PARALLEL_MIN_PAGES:
+        return [(0, total_pages)]
+    # Fixed-size shards: what a finished shard holds doesn't grow with the document
+    shard_size = max(1, Config.PDF_SHARD_PAGES)
+    return [(first, min(first + shard_size, total_pages)) for first in range(0, total_pages, shard_size)]
+
+_pdf_executor = None
+_pdf_executor_lock = threading.Lock()
+
+def _get_pdf_executor() -> ProcessPoolExecutor:
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is None:
+            # spawn, not fork: the parent process has torch and thread pools running.
+            # Workers only import pdf_worker (plus the launching script, as spawn always does)
+            _pdf_executor = ProcessPoolExecutor(
+                max_workers=Config.PDF_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pdf_executor
+
+def _reset_pdf_executor():
+    global _pdf_executor
+    with _pdf_executor_lock:
+        if _pdf_executor is not None:
+            _pdf_executor.shutdown(wait=False, cancel_futures=True)
+        _pdf_executor = None
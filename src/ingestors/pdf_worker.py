@@ -0,0 +1,107 @@
+"""
+Page extraction for PDFs, run in the parser's worker processes as well as in
+process for small documents. Spawned workers import this module fresh, so it
+must stay light: fitz, PIL, numpy and config only - nothing that pulls in the
+model, OCR or LangChain stack.
+"""
+import io
+import time
+import hashlib
+import logging
+
+from config.config import Config
+from src.utils.image_hash import image_entropy, phash
+
+logger = logging.getLogger(__name__)
+
+def needs_ocr(page, text: str) -> bool:
+    """
+    A page is treated as scanned when it has (almost) no text layer and images
+    cover a good part of it. Born-digital pages have a text layer and are never
+    rasterized; empty pages and pages of vector drawings are left alone too.
+    """
+    import fitz
+
+    if len(text.strip()) >= Config.PDF_OCR_MIN_CHARS:
+        return False
+    page_area = abs(page.rect)
+    if not page_area:
+        return False
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return covered / page_area >= Config.PDF_OCR_MIN_IMAGE_COVERAGE
+
+def extract_page_range(path: str, first: int, last: int, skip_pages=frozenset()) -> dict:
+    """Worker entry point: extracts text, decoded images and scan rasters for pages [first, last)."""
+    import fitz
+
+    start = time.perf_counter()
+    with fitz.open(path) as doc:
+        items = list(extract_pages(doc, first, last, skip_pages, set()))
+
+    return {
+        "items": items,
+        "first_page": first,
+        "last_page": last,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+def extract_pages(doc, first: int, last: int, skip_pages=frozenset(), seen_xrefs=None):
+    """
+    Yields text and image items for pages [first, last) of an open fitz document,
+    plus a scan item (grayscale PNG at PDF_OCR_DPI) for each page that needs OCR.
+    Pages in skip_pages already have cached OCR text; their scan item has no PNG.
+
+    Images below the size or entropy thresholds become image_skip items; with
+    dedup on, an xref already in seen_xrefs becomes an image_ref item instead of
+    being decoded again.
+    """
+    from PIL import Image
+    import fitz
+
+    for i in range(first, last):
+        page = doc[i]
+
+        # Extract Text
+        text = page.get_text()
+        if text.strip():
+            yield {"type": "text", "text": text, "page": i}
+
+        if Config.PDF_OCR_ENABLED and needs_ocr(page, text):
+            png = None
+            if i not in skip_pages:
+                png = page.get_pixmap(dpi=Config.PDF_OCR_DPI, colorspace=fitz.csGRAY).tobytes("png")
+            yield {"type": "scan", "page": i, "png": png}
+
+        # Extract Images
+        for img_index, img in enumerate(page.get_images(full=True)):
+            try:
+                xref, width, height = img[0], img[2], img[3]
+                if Config.PDF_IMAGE_DEDUP and seen_xrefs is not None:
+                    if xref in seen_xrefs:
+                        yield {"type": "image_ref", "xref": xref, "page": i}
+                        continue
+                    seen_xrefs.add(xref)
+                # Checked on the declared size, before decoding anything
+                if min(width, height) < Config.PDF_IMAGE_MIN_SIDE:
+                    yield {"type": "image_skip", "reason": "small", "xref": xref, "page": i}
+                    continue
+                base_image = doc.extract_image(xref)
+                image_bytes = base_image["image"]
+                pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+                if image_entropy(pil_image) < Config.PDF_IMAGE_MIN_ENTROPY:
+                    yield {"type": "image_skip", "reason": "low_entropy", "xref": xref, "page": i}
+                    continue
+                image_id = f"page{i}_img{img_index}"
+
+                yield {
+                    "type": "image",
+                    "image": pil_image,
+                    "bytes": image_bytes,
+                    "page": i,
+                    "id": image_id,
+                    "xref": xref,
+                    "digest": hashlib.sha256(image_bytes).hexdigest(),
+                    "phash": phash(pil_image),
+                }
+            except Exception as e:
+                logger.warning(f"Error extracting image {img_index} on page {i}: {e}")
@@ -0,0 +1,166 @@
+import os
+import re
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List
+import numpy as np
+from PIL import Image
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# "torch": fp32 weights; "int8": dynamically quantized Linear layers; "onnx": ONNX Runtime on CPU
+CLIP_RUNTIMES = ("torch", "int8", "onnx")
+
+def clip_key(clip_model_id: str, runtime: str) -> str:
+    """Embedding cache / query table key: fp32 keeps the bare model id so existing caches stay valid."""
+    return clip_model_id if runtime == "torch" else f"{clip_model_id}@{runtime}"
+
+def feature_tensor(output):
+    # Newer transformers return a ModelOutput from get_*_features instead of a tensor
+    import torch
+    if isinstance(output, torch.Tensor):
+        return output
+    return output.pooler_output
+
+def onnx_export_path(model_id: str, model: Any, suffix: str) -> str:
+    """
+    Cache path for an ONNX export. It includes a digest of a sample of the weights,
+    so a different checkpoint under the same id is exported again instead of reused.
+    """
+    digest = hashlib.sha1()
+    for name, param in model.state_dict().items():
+        if hasattr(param, "flatten"):
+            digest.update(name.encode("utf-8"))
+            digest.update(param.detach().flatten()[:64].float().numpy().tobytes())
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", model_id)
+    return os.path.join(Config.ONNX_CACHE_DIR, f"{name}-{digest.hexdigest()[:12]}.{suffix}.onnx")
+
+def _normalize(features: np.ndarray) -> np.ndarray:
+    features = np.asarray(features, dtype=np.float32)
+    return features / np.clip(np.linalg.norm(features, axis=-1, keepdims=True), 1e-12, None)
+
+class ClipEncoders(ABC):
+    """
+    CLIP image and text projections for one runtime. Inputs are what CLIPProcessor
+    returns; outputs are L2-normalised float32 arrays.
+    """
+    runtime = None
+
+    @abstractmethod
+    def image_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        """Image projections for CLIPProcessor image inputs."""
+
+    @abstractmethod
+    def text_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        """Text projections for CLIPProcessor text inputs."""
+
+class TorchClipEncoders(ClipEncoders):
+    """fp32 or int8 (dynamically quantized) torch CLIPModel."""
+
+    def __init__(self, model: Any, runtime: str):
+        self.model = model
+        self.runtime = runtime
+
+    def image_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        import torch
+        with torch.no_grad():
+            return _normalize(feature_tensor(self.model.get_image_features(**inputs)).numpy())
+
+    def text_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        import torch
+        with torch.no_grad():
+            return _normalize(feature_tensor(self.model.get_text_features(**inputs)).numpy())
+
+class OnnxClipEncoders(ClipEncoders):
+    """Exported image and text towers, each run in an ONNX Runtime CPU session."""
+    runtime = "onnx"
+
+    def __init__(self, image_session: Any, text_session: Any, paths: List[str]):
+        self.image_session = image_session
+        self.text_session = text_session
+        self.paths = paths
+
+    @staticmethod
+    def _run(session: Any, inputs: Dict[str, Any]) -> np.ndarray:
+        feeds = {}
+        for spec in session.get_inputs():
+            value = inputs[spec.name]
+            value = value.numpy() if hasattr(value, "numpy") else np.asarray(value)
+            feeds[spec.name] = value.astype(np.float32 if spec.type == "tensor(float)" else np.int64)
+        return _normalize(session.run(None, feeds)[0])
+
+    def image_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        return self._run(self.image_session, inputs)
+
+    def text_features(self, inputs: Dict[str, Any]) -> np.ndarray:
+        return self._run(self.text_session, inputs)
+
+def quantize_clip(model: Any) -> TorchClipEncoders:
+    """int8 dynamic quantization of every Linear layer, on a copy (the fp32 model stays shared)."""
+    import torch
+    quantized = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return TorchClipEncoders(quantized, "int8")
+
+def export_clip_onnx(clip_model_id: str, model: Any, processor: Any) -> OnnxClipEncoders:
+    """Exports both towers to ONNX once (cached under ONNX_CACHE_DIR) and opens CPU sessions."""
+    import onnxruntime
+    import torch
+
+    class _Tower(torch.nn.Module):
+        def __init__(self, method):
+            super().__init__()
+            self.model = model
+            self.method = method
+
+        def forward(self, *inputs):
+            if self.method == "image":
+                return feature_tensor(self.model.get_image_features(pixel_values=inputs[0]))
+            return feature_tensor(self.model.get_text_features(input_ids=inputs[0], attention_mask=inputs[1]))
+
+    image_path, text_path = onnx_export_path(clip_model_id, model, "image"), onnx_export_path(clip_model_id, model, "text")
+    if not (os.path.exists(image_path) and os.path.exists(text_path)):
+        os.makedirs(Config.ONNX_CACHE_DIR, exist_ok=True)
+        logger.info(f"Exporting CLIP {clip_model_id} to ONNX...")
+        pixels = processor(images=[Image.new("RGB", (224, 224))], return_tensors="pt")["pixel_values"]
+        text = processor(text=["an export sample"], return_tensors="pt", padding=True)
+        exports = [
+            (image_path, _Tower("image"), (pixels,), ["pixel_values"], {"pixel_values": {0: "batch"}}),
+            (text_path, _Tower("text"), (text["input_ids"], text["attention_mask"]), ["input_ids", "attention_mask"],
+             {"input_ids": {0: "batch", 1: "tokens"}, "attention_mask": {0: "batch", 1: "tokens"}}),
+        ]
+        for path, tower, args, input_names, axes in exports:
+            tmp_path = path + ".tmp"
+            torch.onnx.export(tower, args, tmp_path, input_names=input_names, output_names=["features"],
+                              dynamic_axes={**axes, "features": {0: "batch"}}, dynamo=False)
+            os.replace(tmp_path, path)
+
+    options = onnxruntime.SessionOptions()
+    if Config.TORCH_NUM_THREADS > 0:
+        options.intra_op_num_threads = Config.TORCH_NUM_THREADS
+    sessions = [onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+                for path in (image_path, text_path)]
+    return OnnxClipEncoders(*sessions, paths=[image_path, text_path])
+
+def probe_inputs(processor: Any) -> Dict[str, Dict[str, Any]]:
+    """Small fixed image and text batch for accuracy checks."""
+    rng = np.random.default_rng(0)
+    images = [Image.new("RGB", (224, 224), color) for color in ((255, 255, 255), (30, 60, 200))]
+    images += [Image.fromarray(rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)) for _ in range(2)]
+    images.append(Image.fromarray(np.tile(np.linspace(0, 255, 224, dtype=np.uint8), (224, 1))).convert("RGB"))
+    texts = ["a bar chart of quarterly revenue", "a diagram of the water cycle",
+             "photosynthesis converts light energy into chemical energy", "a photo of a cat"]
+    return {
+        "images": processor(images=images, return_tensors="pt"),
+        "texts": processor(text=texts, return_tensors="pt", padding=True, truncation=True, max_length=77),
+    }
+
+def cosine_agreement(reference: ClipEncoders, candidate: ClipEncoders, inputs: Dict[str, Dict[str, Any]]) -> Dict[str, float]:
+    """Min / mean cosine similarity between candidate and reference (fp32) features."""
+    report = {}
+    for name, method in (("image", "image_features"), ("text", "text_features")):
+        cosines = (getattr(reference, method)(inputs[f"{name}s"]) * getattr(candidate, method)(inputs[f"{name}s"])).sum(axis=1)
+        report[f"{name}_min_cosine"] = round(float(cosines.min()), 5)
+        report[f"{name}_mean_cosine"] = round(float(cosines.mean()), 5)
+    return report
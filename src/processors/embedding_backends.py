@@ -0,0 +1,127 @@
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+import numpy as np
+from config.config import Config
+from .model_registry import model_registry
+from .clip_runtime import clip_key
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBackend(ABC):
+    """
+    Text embedding model for the chunk index. Vectors are L2-normalised float32.
+    key identifies the model (and runtime) for the embedding cache, the mode
+    query table and the index store.
+    """
+    name = None
+
+    def __init__(self, key: str, dim: int):
+        self.key = key
+        self.dim = dim
+
+    @property
+    def shares_clip_space(self) -> bool:
+        """True if text vectors are comparable with CLIP image vectors."""
+        return False
+
+    @abstractmethod
+    def embed_texts(self, texts: List[str], batch_size: int = Config.EMBED_BATCH_SIZE) -> np.ndarray:
+        """(len(texts), dim) L2-normalised float32 vectors."""
+
+class ClipTextBackend(EmbeddingBackend):
+    """
+    CLIP's text tower (in the configured CLIP runtime): chunks truncated to 77
+    tokens, same space as the image vectors.
+    """
+    name = "clip"
+
+    def __init__(self, clip_model_id: str = Config.CLIP_MODEL_ID, clip_runtime: str = Config.CLIP_RUNTIME):
+        self.clip_model_id = clip_model_id
+        self.clip_model, self.clip_processor = model_registry.get_clip(clip_model_id)
+        self.encoders = model_registry.get_clip_encoders(clip_model_id, clip_runtime)
+        super().__init__(clip_key(clip_model_id, self.encoders.runtime), self.clip_model.config.projection_dim)
+
+    @property
+    def shares_clip_space(self) -> bool:
+        return True
+
+    def embed_texts(self, texts: List[str], batch_size: int = Config.EMBED_BATCH_SIZE) -> np.ndarray:
+        batch_size = max(1, batch_size)
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.clip_processor(text=list(texts[start:start + batch_size]),
+                                         return_tensors="pt",
+                                         padding=True,
+                                         truncation=True,
+                                         max_length=77)
+            vectors.append(self.encoders.text_features(inputs))
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate(vectors, axis=0)
+
+class SentenceBackend(EmbeddingBackend):
+    """
+    Small local sentence-embedding model (mean pooled, e.g. all-MiniLM-L6-v2) run
+    as fp32 torch, int8 dynamically quantized torch, or ONNX Runtime on CPU.
+    Much cheaper per chunk than CLIP and reads up to TEXT_EMBED_MAX_TOKENS tokens.
+    """
+    name = "sentence"
+
+    def __init__(self, model_id: str = Config.TEXT_EMBED_MODEL_ID, runtime: str = Config.TEXT_EMBED_RUNTIME):
+        self.model_id = model_id
+        self.tokenizer, self.encoder, self.runtime = model_registry.get_text_encoder(model_id, runtime)
+        super().__init__(f"{model_id}@{self.runtime}", self._hidden_size())
+
+    def _hidden_size(self) -> int:
+        if self.runtime == "onnx":
+            return int(self.encoder.get_outputs()[0].shape[-1])
+        return self.encoder.config.hidden_size
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(list(texts), padding=True, truncation=True,
+                                max_length=Config.TEXT_EMBED_MAX_TOKENS, return_tensors="np")
+        mask = inputs["attention_mask"].astype(np.float32)
+        if self.runtime == "onnx":
+            feeds = {i.name: inputs[i.name].astype(np.int64) for i in self.encoder.get_inputs()}
+            hidden = self.encoder.run(None, feeds)[0]
+        else:
+            import torch
+            with torch.no_grad():
+                hidden = self.encoder(**{name: torch.from_numpy(value) for name, value in inputs.items()}).last_hidden_state.numpy()
+        # Mean pooling over real tokens
+        pooled = (hidden * mask[..., None]).sum(axis=1) / np.clip(mask.sum(axis=1, keepdims=True), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_texts(self, texts: List[str], batch_size: int = Config.EMBED_BATCH_SIZE) -> np.ndarray:
+        batch_size = max(1, batch_size)
+        vectors = [self._encode(texts[start:start + batch_size]) for start in range(0, len(texts), batch_size)]
+        if not vectors:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.concatenate(vectors, axis=0).astype(np.float32)
+
+TEXT_BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    ClipTextBackend.name: ClipTextBackend,
+    SentenceBackend.name: SentenceBackend,
+}
+
+def get_text_backend(name: str = None, clip_model_id: str = Config.CLIP_MODEL_ID, clip_runtime: str = Config.CLIP_RUNTIME) -> EmbeddingBackend:
+    """Builds the configured text backend; the models behind it are shared through the registry."""
+    name = name or Config.TEXT_EMBED_BACKEND
+    if name not in TEXT_BACKENDS:
+        raise ValueError(f"Unknown text embedding backend: {name}")
+    if name == ClipTextBackend.name:
+        return ClipTextBackend(clip_model_id, clip_runtime)
+    return TEXT_BACKENDS[name]()
+
+def index_model_key(clip_model_key: str, text_backend_key: str) -> str:
+    """Models an ingested index depends on: the CLIP model (and runtime) plus the text backend if it differs."""
+    if text_backend_key == clip_model_key:
+        return clip_model_key
+    return f"{clip_model_key}+{text_backend_key}"
+
+def default_index_key() -> str:
+    """index_model_key of a processor built with the configured models."""
+    encoders = model_registry.get_clip_encoders(Config.CLIP_MODEL_ID, Config.CLIP_RUNTIME)
+    return index_model_key(clip_key(Config.CLIP_MODEL_ID, encoders.runtime), get_text_backend().key)
@@ -0,0 +1,249 @@
+import io
+import base64
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Union
+import numpy as np
+from PIL import Image
+from langchain_core.messages import HumanMessage
+from config.config import Config
+from src.utils.description_cache import description_cache
+from src.utils.embedding_cache import get_embedding_cache
+from src.utils.image_hash import phash
+from src.utils.ocr_pool import OCRError, ocr_pool
+from .clip_runtime import clip_key
+from .model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Zero-shot classes, each scored against the mean of its prompts' CLIP text vectors
+IMAGE_CLASS_PROMPTS = {
+    "chart": ["a bar chart", "a line graph of data", "a pie chart", "a scatter plot with axes"],
+    "diagram": ["a diagram", "a flowchart", "a labeled scientific diagram", "a schematic drawing"],
+    "photo": ["a photo", "a photograph of a real object", "a photo of people", "a microscope photo"],
+    "blank": ["a blank white image", "an empty page", "a plain solid color background"],
+    "text-heavy": ["a page of text", "a screenshot of a document", "a slide with bullet points of text"],
+}
+IMAGE_CLASSES = tuple(IMAGE_CLASS_PROMPTS)
+
+# Tiers in order of cost; stats count how many images each one resolved
+TIERS = ("cache", "blank", "ocr", "local", "vision", "vision_failed")
+
+VISION_PROMPT = ("This image contains a diagram, chart, or visual content. Please analyze it in detail, extracting "
+                 "any labels, data points, and explaining the visual concepts presented. The goal is to generate "
+                 "quiz questions based on this information.")
+
+class _Image:
+    """One image moving through the tiers."""
+
+    def __init__(self, source: Union[str, Image.Image]):
+        self.source = source
+        self.image = Image.open(source).convert("RGB") if isinstance(source, str) else source.convert("RGB")
+        # Same key as MultiModalRAGProcessor._image_key, so indexing reuses the CLIP vector
+        self.digest = hashlib.sha256(f"{self.image.mode}{self.image.size}".encode() + self.image.tobytes()).hexdigest()
+        self.hash = phash(self.image)
+        self.vector: Optional[np.ndarray] = None
+        self.label: Optional[str] = None
+        self.text: Optional[str] = None
+        self.ocr_text = ""
+
+class ImageAnalyzer:
+    """
+    Turns images into text for indexing, escalating to the vision LLM only when
+    the cheap local tiers can't:
+
+        cache  - description of the same pixels seen before, or of a near copy
+                 (close perceptual hash, confirmed by CLIP cosine)
+        blank  - near-uniform pixels; nothing to describe
+        ocr    - a class that isn't escalated, and OCR found enough text
+        local  - the same without much text (e.g. photos): class label and OCR text
+        vision - escalated classes (charts, diagrams) and text OCR couldn't read
+
+    CLIP is the shared model from the registry, and image vectors go through the
+    embedding cache, so the later index build gets them for free.
+    """
+
+    def __init__(self, clip_model_id: str = Config.CLIP_MODEL_ID, clip_runtime: str = Config.CLIP_RUNTIME,
+                 escalate_classes: List[str] = None, min_ocr_chars: int = Config.IMAGE_MIN_OCR_CHARS,
+                 vision_concurrency: int = Config.IMAGE_VISION_CONCURRENCY):
+        self.clip_model_id = clip_model_id
+        self.clip_runtime = clip_runtime
+        self.escalate_classes = set(Config.IMAGE_ESCALATE_CLASSES if escalate_classes is None else escalate_classes)
+        self.min_ocr_chars = min_ocr_chars
+        self.vision_concurrency = max(1, vision_concurrency)
+        self._class_vectors = None
+        self._lock = threading.Lock()
+        self._tiers = {tier: 0 for tier in TIERS}
+        self._classes = {label: 0 for label in IMAGE_CLASSES}
+
+    def describe(self, image: Union[str, Image.Image], llm: Any) -> str:
+        return self.describe_batch([image], llm)[0]
+
+    def describe_batch(self, images: List[Union[str, Image.Image]], llm: Any) -> List[str]:
+        """
+        Text for each image (file path or PIL image), "" for blank or unreadable
+        ones. Local tiers run for the whole batch first; the images left over go
+        to the vision LLM together, vision_concurrency at a time.
+        """
+        items = []
+        for source in images:
+            try:
+                items.append(_Image(source))
+            except Exception as e:
+                logger.warning(f"Could not open image for analysis: {e}")
+                items.append(None)
+        pending = [item for item in items if item is not None]
+
+        pending = [item for item in pending if not self._from_cache(item, exact=True)]
+        for item in pending:
+            if float(np.asarray(item.image.convert("L"), dtype=np.float32).std()) < Config.IMAGE_BLANK_STDDEV:
+                self._resolve(item, "blank", "blank", "")
+        pending = [item for item in pending if item.text is None]
+
+        # Near copies are only trusted once CLIP agrees, so this lookup waits for the vectors
+        self._classify(pending)
+        pending = [item for item in pending if not self._from_cache(item, exact=False)]
+        for item in pending:
+            if item.label == "blank":
+                self._resolve(item, "blank", "blank", "")
+        pending = [item for item in pending if item.text is None]
+
+        self._ocr([item for item in pending if item.label not in self.escalate_classes])
+        escalate = []
+        for item in pending:
+            if item.label in self.escalate_classes:
+                escalate.append(item)
+            elif len(item.ocr_text) >= self.min_ocr_chars:
+                self._resolve(item, "ocr", item.label, item.ocr_text)
+            elif item.label in ("text-heavy", None):
+                # Text OCR couldn't read (or CLIP couldn't classify): the vision model's job
+                escalate.append(item)
+            else:
+                self._resolve(item, "local", item.label, f"{item.label.capitalize()}. {item.ocr_text}".strip())
+
+        self._vision(escalate, llm)
+        return [item.text if item is not None else "" for item in items]
+
+    def _from_cache(self, item: _Image, exact: bool) -> bool:
+        try:
+            cached = description_cache.get_exact(item.digest) if exact else description_cache.get_near(item.hash, item.vector)
+        except Exception as e:
+            logger.warning(f"Image description cache unavailable: {e}")
+            return False
+        if cached is None:
+            return False
+        item.label, item.text = cached
+        self._count("cache", item.label)
+        return True
+
+    def _resolve(self, item: _Image, tier: str, label: Optional[str], text: str, cache: bool = True):
+        item.label, item.text = label, text
+        self._count(tier, label)
+        if cache and tier != "blank":
+            try:
+                description_cache.put(item.digest, item.hash, item.vector, label or "", text)
+            except Exception as e:
+                logger.warning(f"Could not cache image description: {e}")
+
+    def _count(self, tier: str, label: Optional[str]):
+        with self._lock:
+            self._tiers[tier] += 1
+            if label in self._classes:
+                self._classes[label] += 1
+
+    def _classify(self, items: List[_Image]):
+        """Sets each item's CLIP vector and best zero-shot class (both None if CLIP fails)."""
+        if not items:
+            return
+        try:
+            model, processor = model_registry.get_clip(self.clip_model_id)
+            encoders = model_registry.get_clip_encoders(self.clip_model_id, self.clip_runtime)
+            class_vectors = self._get_class_vectors(processor, encoders)
+            cache = get_embedding_cache(clip_key(self.clip_model_id, encoders.runtime), model.config.projection_dim)
+            keys = [item.digest for item in items] if cache else None
+            vectors = cache.get_many(keys) if cache else [None] * len(items)
+            missing = [i for i, vector in enumerate(vectors) if vector is None]
+            for start in range(0, len(missing), Config.EMBED_BATCH_SIZE):
+                batch = missing[start:start + Config.EMBED_BATCH_SIZE]
+                embedded = encoders.image_features(processor(images=[items[i].image for i in batch], return_tensors="pt"))
+                for i, vector in zip(batch, embedded):
+                    vectors[i] = vector
+                if cache:
+                    cache.put_many([keys[i] for i in batch], list(embedded))
+        except Exception as e:
+            logger.warning(f"CLIP image classification failed: {e}")
+            return
+        scores = np.stack(vectors) @ class_vectors.T
+        for item, vector, best in zip(items, vectors, scores.argmax(axis=1)):
+            item.vector = np.asarray(vector, dtype=np.float32)
+            item.label = IMAGE_CLASSES[int(best)]
+
+    def _get_class_vectors(self, processor: Any, encoders: Any) -> np.ndarray:
+        if self._class_vectors is None:
+            vectors = []
+            for label in IMAGE_CLASSES:
+                inputs = processor(text=IMAGE_CLASS_PROMPTS[label], return_tensors="pt", padding=True)
+                mean = encoders.text_features(inputs).mean(axis=0)
+                vectors.append(mean / np.linalg.norm(mean))
+            self._class_vectors = np.stack(vectors).astype(np.float32)
+        return self._class_vectors
+
+    @staticmethod
+    def _ocr(items: List[_Image]):
+        """OCR on the shared pool, all images in parallel."""
+        futures = []
+        for item in items:
+            try:
+                futures.append((item, ocr_pool.submit(item.source if isinstance(item.source, str) else item.image)))
+            except OCRError as e:
+                logger.warning(f"OCR unavailable: {e}")
+                return
+        for item, future in futures:
+            try:
+                item.ocr_text = future.result().strip()
+            except OCRError as e:
+                logger.warning(f"OCR failed: {e}")
+
+    def _vision(self, items: List[_Image], llm: Any):
+        if not items:
+            return
+        logger.info(f"Describing {len(items)} image(s) with the vision model")
+        messages = [[HumanMessage(content=[
+            {"type": "text", "text": VISION_PROMPT},
+            {"type": "image_url", "image_url": {"url": _data_url(item)}},
+        ])] for item in items]
+        responses = llm.batch(messages, config={"max_concurrency": self.vision_concurrency}, return_exceptions=True)
+        for item, response in zip(items, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Failed to analyze image with LLM: {response}")
+                # Keep whatever OCR found; don't cache, so the next attempt retries the LLM
+                self._resolve(item, "vision_failed", item.label, item.ocr_text, cache=False)
+            else:
+                self._resolve(item, "vision", item.label, response.content)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._tiers.values())
+            return {
+                "images": total,
+                "tiers": dict(self._tiers),
+                "tier_share": {tier: round(count / total, 3) if total else 0.0 for tier, count in self._tiers.items()},
+                "classes": dict(self._classes),
+                "description_cache": description_cache.stats(),
+            }
+
+def _data_url(item: _Image) -> str:
+    """The original file bytes when there are any, else a PNG of the image."""
+    if isinstance(item.source, str):
+        with open(item.source, "rb") as f:
+            data = f.read()
+        mime = Image.MIME.get(Image.open(io.BytesIO(data)).format, "image/jpeg")
+    else:
+        buffered = io.BytesIO()
+        item.image.save(buffered, format="PNG")
+        data, mime = buffered.getvalue(), "image/png"
+    return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+
+# Global Instance
+image_analyzer = ImageAnalyzer()
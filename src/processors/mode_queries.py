@@ -0,0 +1,100 @@
+import os
+import re
+import threading
+import logging
+from typing import Callable, Dict, List
+import numpy as np
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Retrieval queries tailored to what matters for each summary type (Level 2 Optimization)
+SUMMARY_QUERIES = {
+    "concise": "overview of the main content and core message",
+    "executive": "key outcomes, risks, benefits, and strategic implications",
+    "bullet_points": "list of key takeaways, main topics, and important facts",
+    "educational": "definitions, step-by-step explanations, and fundamental concepts",
+    "detailed": "comprehensive details, nuance, examples, and specifics",
+    "technical_deep_dive": "technical specifications, implementation details, methodologies, and data",
+    "exam_ready": "definitions, formulas, dates, and testable facts"
+}
+DEFAULT_SUMMARY_QUERY = "comprehensive overview of the main content, key topics, and visual details"
+
+QUIZ_QUERY = "important facts, key concepts, definitions, and details for examination"
+
+def query_facets(query: str) -> List[str]:
+    """
+    The query followed by its comma / "and" separated facets, for multi-query
+    retrieval: "risks, benefits, and implications" also searches for "risks",
+    "benefits" and "implications" on their own.
+    """
+    facets = [part.strip() for part in re.split(r",|\band\b", query) if part.strip()]
+    return [query] + [facet for facet in facets if facet != query]
+
+def all_mode_queries() -> List[str]:
+    """Every fixed retrieval query (and facet) the summary and quiz modes can issue."""
+    queries = []
+    for query in list(SUMMARY_QUERIES.values()) + [DEFAULT_SUMMARY_QUERY, QUIZ_QUERY]:
+        for text in query_facets(query):
+            if text not in queries:
+                queries.append(text)
+    return queries
+
+class ModeQueryTable:
+    """
+    Embeddings of the fixed summary/quiz retrieval queries, per embedding model
+    (CLIP model id or text backend key). They never change for a given model, so
+    they are computed once (at startup or on first use) and kept in an .npz file
+    per model under root_dir.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self._tables: Dict[str, Dict[str, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, clip_model_id: str) -> str:
+        return os.path.join(self.root_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", clip_model_id) + ".npz")
+
+    def _table(self, clip_model_id: str) -> Dict[str, np.ndarray]:
+        table = self._tables.get(clip_model_id)
+        if table is None:
+            table = {}
+            path = self._path(clip_model_id)
+            if os.path.exists(path):
+                try:
+                    with np.load(path) as data:
+                        table = dict(zip(data["queries"].tolist(), data["vectors"]))
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable query embedding table {path}: {e}")
+            self._tables[clip_model_id] = table
+        return table
+
+    def _save(self, clip_model_id: str, table: Dict[str, np.ndarray]):
+        os.makedirs(self.root_dir, exist_ok=True)
+        path = self._path(clip_model_id)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, queries=np.array(list(table)), vectors=np.stack(list(table.values())))
+        os.replace(tmp_path, path)
+
+    def get(self, clip_model_id: str, queries: List[str], embed_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """
+        (len(queries), dim) embeddings. Queries not in the table yet are embedded
+        with a single embed_fn call and persisted.
+        """
+        with self._lock:
+            table = self._table(clip_model_id)
+            missing = [query for query in dict.fromkeys(queries) if query not in table]
+            if missing:
+                for query, vector in zip(missing, embed_fn(missing)):
+                    table[query] = np.asarray(vector, dtype=np.float32)
+                self._save(clip_model_id, table)
+            return np.stack([table[query] for query in queries])
+
+    def warmup(self, clip_model_id: str, embed_fn: Callable[[List[str]], np.ndarray]) -> int:
+        """Loads or builds the table for every known mode query; returns its size."""
+        self.get(clip_model_id, all_mode_queries(), embed_fn)
+        return len(self._tables[clip_model_id])
+
+# Global Instance
+mode_query_table = ModeQueryTable(Config.QUERY_EMBED_DIR)
@@ -0,0 +1,265 @@
+import os
+import time
+import threading
+import logging
+from typing import Dict, Any, Tuple
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class ModelRegistry:
+    """
+    Process-wide cache of heavy local models (CLIP and the optional sentence
+    text encoder). Each model is loaded once per worker and shared read-only by
+    every MultiModalRAGProcessor (and through it the Summarizer / Quiz processors).
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(ModelRegistry, cls).__new__(cls)
+            cls._instance._init()
+        return cls._instance
+
+    def _init(self):
+        self._lock = threading.Lock()
+        self._clip: Dict[str, Tuple[Any, Any]] = {}
+        self._clip_encoders: Dict[str, Any] = {}
+        self._text_encoders: Dict[str, Tuple[Any, Any, str]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def get_clip(self, clip_model_id: str = Config.CLIP_MODEL_ID):
+        """
+        Returns the shared (CLIPModel, CLIPProcessor) pair for clip_model_id,
+        loading it on first use.
+        """
+        entry = self._clip.get(clip_model_id)
+        if entry is not None:
+            return entry
+
+        # Serialize loads so concurrent first requests don't load the same weights twice
+        with self._lock:
+            entry = self._clip.get(clip_model_id)
+            if entry is None:
+                entry = self._load_clip(clip_model_id)
+                self._clip[clip_model_id] = entry
+        return entry
+
+    @staticmethod
+    def _set_torch_threads():
+        import torch
+        if Config.TORCH_NUM_THREADS > 0 and torch.get_num_threads() != Config.TORCH_NUM_THREADS:
+            # Process-wide setting: applies to every shared model in this worker
+            torch.set_num_threads(Config.TORCH_NUM_THREADS)
+
+    def _load_clip(self, clip_model_id: str):
+        import torch
+        from transformers import CLIPProcessor, CLIPModel
+
+        self._set_torch_threads()
+
+        logger.info(f"Loading CLIP model {clip_model_id}...")
+        start = time.perf_counter()
+        try:
+            model = CLIPModel.from_pretrained(clip_model_id, use_safetensors=True)
+            processor = CLIPProcessor.from_pretrained(clip_model_id)
+        except Exception as e:
+            logger.error(f"Failed to load CLIP model: {e}")
+            raise e
+
+        # Inference only: shared instances must never be put back into train mode
+        model.eval()
+        for param in model.parameters():
+            param.requires_grad_(False)
+
+        load_sec = time.perf_counter() - start
+        size_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+        size_bytes += sum(b.numel() * b.element_size() for b in model.buffers())
+
+        self._stats[clip_model_id] = {
+            "load_ms": round(load_sec * 1000, 2),
+            "resident_mb": round(size_bytes / (1024 * 1024), 2),
+            "torch_threads": torch.get_num_threads(),
+        }
+        logger.info(f"CLIP model {clip_model_id} loaded in {load_sec:.2f}s ({self._stats[clip_model_id]['resident_mb']} MB)")
+        return model, processor
+
+    def get_clip_encoders(self, clip_model_id: str = Config.CLIP_MODEL_ID, runtime: str = Config.CLIP_RUNTIME):
+        """
+        Returns the shared ClipEncoders for clip_model_id in the given runtime
+        ("torch", "int8" or "onnx", see clip_runtime.py). Accelerated runtimes are
+        checked against fp32 on a probe batch and fall back to fp32 when their
+        cosine similarity drops below CLIP_MIN_COSINE (or onnxruntime is missing).
+        """
+        key = f"{clip_model_id}@{runtime}"
+        entry = self._clip_encoders.get(key)
+        if entry is not None:
+            return entry
+
+        model, processor = self.get_clip(clip_model_id)
+        with self._lock:
+            entry = self._clip_encoders.get(key)
+            if entry is None:
+                entry = self._load_clip_encoders(clip_model_id, runtime, model, processor)
+                self._clip_encoders[key] = entry
+        return entry
+
+    def _load_clip_encoders(self, clip_model_id: str, runtime: str, model: Any, processor: Any):
+        from .clip_runtime import (CLIP_RUNTIMES, TorchClipEncoders, clip_key, cosine_agreement,
+                                   export_clip_onnx, probe_inputs, quantize_clip)
+
+        if runtime not in CLIP_RUNTIMES:
+            raise ValueError(f"Unknown CLIP runtime: {runtime}")
+        reference = TorchClipEncoders(model, "torch")
+        if runtime == "torch":
+            return reference
+
+        start = time.perf_counter()
+        try:
+            if runtime == "int8":
+                encoders = quantize_clip(model)
+                size_bytes = len(_state_dict_bytes(encoders.model))
+            else:
+                encoders = export_clip_onnx(clip_model_id, model, processor)
+                size_bytes = sum(os.path.getsize(path) for path in encoders.paths)
+            load_sec = time.perf_counter() - start
+            agreement = cosine_agreement(reference, encoders, probe_inputs(processor))
+        except ImportError as e:
+            logger.warning(f"CLIP runtime {runtime} unavailable ({e}), using fp32")
+            return reference
+        except Exception as e:
+            # A failed quantization or ONNX export/session must not take CLIP down with it
+            logger.warning(f"CLIP runtime {runtime} failed to load ({type(e).__name__}: {e}), using fp32")
+            return reference
+        self._stats[clip_key(clip_model_id, runtime)] = {
+            "load_ms": round(load_sec * 1000, 2),
+            "resident_mb": round(size_bytes / (1024 * 1024), 2),
+            **agreement,
+        }
+        if min(agreement["image_min_cosine"], agreement["text_min_cosine"]) < Config.CLIP_MIN_COSINE:
+            logger.warning(f"CLIP {runtime} diverges from fp32 ({agreement}), using fp32")
+            return reference
+        logger.info(f"CLIP {clip_model_id} {runtime} ready in {load_sec:.2f}s ({agreement})")
+        return encoders
+
+    def get_text_encoder(self, model_id: str = Config.TEXT_EMBED_MODEL_ID, runtime: str = Config.TEXT_EMBED_RUNTIME):
+        """
+        Returns the shared (tokenizer, encoder, runtime) for a sentence-embedding
+        model. runtime is "torch" (fp32), "int8" (dynamically quantized Linear
+        layers) or "onnx" (ONNX Runtime session on CPU); "onnx" falls back to
+        "int8" when onnxruntime is not installed.
+        """
+        key = f"{model_id}@{runtime}"
+        entry = self._text_encoders.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            entry = self._text_encoders.get(key)
+            if entry is None:
+                entry = self._load_text_encoder(model_id, runtime)
+                self._text_encoders[key] = entry
+        return entry
+
+    def _load_text_encoder(self, model_id: str, runtime: str):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        if runtime not in ("torch", "int8", "onnx"):
+            raise ValueError(f"Unknown text encoder runtime: {runtime}")
+        self._set_torch_threads()
+
+        logger.info(f"Loading text encoder {model_id} ({runtime})...")
+        start = time.perf_counter()
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        model = AutoModel.from_pretrained(model_id)
+        model.eval()
+        for param in model.parameters():
+            param.requires_grad_(False)
+
+        encoder = None
+        onnx_path = None
+        if runtime == "onnx":
+            try:
+                encoder, onnx_path = self._onnx_session(model_id, model, tokenizer)
+            except ImportError:
+                logger.warning("onnxruntime is not installed, using the int8 torch text encoder")
+                runtime = "int8"
+        if runtime == "int8":
+            encoder = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        elif runtime == "torch":
+            encoder = model
+
+        load_sec = time.perf_counter() - start
+        if onnx_path:
+            size_bytes = os.path.getsize(onnx_path)
+        else:
+            # Quantized Linear weights are packed and not listed in parameters()
+            size_bytes = len(_state_dict_bytes(encoder))
+        key = f"{model_id}@{runtime}"
+        self._stats[key] = {
+            "load_ms": round(load_sec * 1000, 2),
+            "resident_mb": round(size_bytes / (1024 * 1024), 2),
+            "torch_threads": torch.get_num_threads(),
+        }
+        logger.info(f"Text encoder {key} loaded in {load_sec:.2f}s ({self._stats[key]['resident_mb']} MB)")
+        return tokenizer, encoder, runtime
+
+    def _onnx_session(self, model_id: str, model: Any, tokenizer: Any):
+        """Exports model to ONNX once (cached under ONNX_CACHE_DIR) and opens a CPU session."""
+        import onnxruntime
+        import torch
+
+        class _HiddenStates(torch.nn.Module):
+            # Positional inputs in tokenizer order; forward() orders its keywords differently
+            def __init__(self, model, input_names):
+                super().__init__()
+                self.model = model
+                self.input_names = input_names
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(self.input_names, inputs))).last_hidden_state
+
+        from .clip_runtime import onnx_export_path
+
+        onnx_path = onnx_export_path(model_id, model, "text")
+        if not os.path.exists(onnx_path):
+            os.makedirs(Config.ONNX_CACHE_DIR, exist_ok=True)
+            sample = tokenizer(["export sample"], return_tensors="pt")
+            input_names = list(sample.keys())
+            axes = {name: {0: "batch", 1: "tokens"} for name in input_names}
+            tmp_path = onnx_path + ".tmp"
+            torch.onnx.export(_HiddenStates(model, input_names), tuple(sample[name] for name in input_names), tmp_path,
+                              input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes={**axes, "last_hidden_state": {0: "batch", 1: "tokens"}},
+                              dynamo=False)
+            os.replace(tmp_path, onnx_path)
+
+        options = onnxruntime.SessionOptions()
+        if Config.TORCH_NUM_THREADS > 0:
+            options.intra_op_num_threads = Config.TORCH_NUM_THREADS
+        session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        return session, onnx_path
+
+    def warmup(self, clip_model_ids=None):
+        """Loads the given models ahead of the first request (used at API startup)."""
+        for clip_model_id in clip_model_ids or Config.WARMUP_CLIP_MODELS:
+            self.get_clip(clip_model_id)
+            self.get_clip_encoders(clip_model_id)
+        if Config.TEXT_EMBED_BACKEND == "sentence":
+            self.get_text_encoder()
+        return self.report()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Load time and resident weight size for every loaded model."""
+        return {model_id: dict(stats) for model_id, stats in self._stats.items()}
+
+def _state_dict_bytes(model: Any) -> bytes:
+    import io
+    import torch
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getvalue()
+
+# Global Instance
+model_registry = ModelRegistry()
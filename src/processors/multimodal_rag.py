@@ -1,132 +1,723 @@
 import os
-import base64
+import time
+import uuid
+import pickle
+import threading
 import numpy as np
 import logging
 from PIL import Image
-from typing import List, Dict, Any, Union
-import torch
-from transformers import CLIPProcessor, CLIPModel
+from typing import List, Dict, Any, Tuple, Union
+import faiss
 from langchain_core.documents import Document
 from langchain_core.messages import HumanMessage
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_google_genai import ChatGoogleGenerativeAI
+from config.config import Config
+from src.utils.embedding_cache import get_embedding_cache
+from src.utils.image_store import ImageStore
+from src.utils.semantic_cache import SemanticQueryCache
+from src.utils.bm25 import BM25Index
+from src.utils.vector_index import (INDEX_TYPES, build_index, choose_index_type, configure_search, describe_index,
+    index_contents, index_type_of, new_flat_index, remove_ids, search_params, writable_index)
+from src.utils.concurrency import call_in_stage, run_in_stage, stage_limit
+from src.utils.metrics import metrics_manager
+from src.callbacks.performance import PerformanceCallback
+from .model_registry import model_registry
+from .embedding_backends import ClipTextBackend,get_text_backend,index_model_key
+from .clip_runtime import clip_key
+from .mode_queries import mode_query_table
 
 logger=logging.getLogger(__name__)
 
+# Reciprocal rank fusion constant (as in the original RRF paper)
+RRF_K=60
+# dense: vectors only; hybrid: text vectors fused with BM25 over the text chunks
+RETRIEVAL_MODES=("dense","hybrid")
+# Source id of documents ingested without one (single-document processors)
+DEFAULT_SOURCE_ID="default"
+
+def _rrf(rankings:List[List[int]],k:int)->List[Tuple[int,float]]:
+    """Reciprocal rank fusion of several ranked lists of vector ids; (id, fused score) pairs."""
+    fused={}
+    for ranking in rankings:
+        for rank,idx in enumerate(ranking):
+            fused[idx]=fused.get(idx,0.0)+1.0/(RRF_K+rank+1)
+    return sorted(fused.items(),key=lambda item:item[1],reverse=True)[:k]
+
+def _best_scores(scores:np.ndarray,ids:np.ndarray)->Dict[int,float]:
+    """Best cosine per vector id over the rows of a FAISS search."""
+    best={}
+    for row_scores,row_ids in zip(scores,ids):
+        for score,idx in zip(row_scores,row_ids):
+            if idx>=0:
+                best[int(idx)]=max(best.get(int(idx),-1.0),float(score))
+    return best
+
 class MultiModalRAGProcessor:
-    def __init__(self,model_name="gemini-2.5-flash",clip_model_id="openai/clip-vit-base-patch32"):
+    def __init__(self,model_name="gemini-2.5-flash",clip_model_id=Config.CLIP_MODEL_ID,embed_batch_size=Config.EMBED_BATCH_SIZE,text_backend=None,clip_runtime=Config.CLIP_RUNTIME,index_type=Config.FAISS_INDEX_TYPE):
         self.llm=ChatGoogleGenerativeAI(model=model_name,temperature=0.3)
-        try:
-            self.clip_model=CLIPModel.from_pretrained(clip_model_id,use_safetensors=True)
-            self.clip_processor=CLIPProcessor.from_pretrained(clip_model_id)
-            logger.info("CLIP model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load CLIP model: {e}")
-            raise e
+        # Shared per-process instances: loaded once, never mutated here
+        self.clip_model_id=clip_model_id
+        self.clip_model,self.clip_processor=model_registry.get_clip(clip_model_id)
+        # fp32, int8 or ONNX image/text towers (see clip_runtime.py)
+        self.clip_encoders=model_registry.get_clip_encoders(clip_model_id,clip_runtime)
+        self.clip_key=clip_key(clip_model_id,self.clip_encoders.runtime)
+        self.embed_batch_size=max(1,int(embed_batch_size))
+        self.embedding_cache=get_embedding_cache(self.clip_key,self.clip_model.config.projection_dim)
+        # Text chunks are embedded by a pluggable backend (CLIP's text tower by default);
+        # image search always uses CLIP text vectors for the query
+        self.text_backend=get_text_backend(text_backend,clip_model_id,clip_runtime)
+        if self.text_backend.shares_clip_space:
+            self.clip_text_backend=self.text_backend
+            self.text_embedding_cache=self.embedding_cache
+        else:
+            self.clip_text_backend=ClipTextBackend(clip_model_id,clip_runtime)
+            self.text_embedding_cache=get_embedding_cache(self.text_backend.key,self.text_backend.dim)
         
         self.text_splitter=RecursiveCharacterTextSplitter(
             chunk_size=300, chunk_overlap=50)
-        self.vector_store=None
-        self.image_data_store=None
-        self.all_docs=[]
-        self.embeddings=[]
+        # Text chunks and images live in separate FAISS indexes (inner product over
+        # normalised vectors); they are built flat and converted once ingested (see vector_index.py)
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown FAISS index type: {index_type}")
+        self.index_type=index_type
+        # Answers to earlier questions on this document (see SemanticQueryCache)
+        self.query_cache=SemanticQueryCache(
+            self.text_backend.dim,Config.QUERY_CACHE_THRESHOLD,Config.QUERY_CACHE_MAX_ENTRIES
+        ) if Config.QUERY_CACHE_ENABLED else None
+        # Guards index mutation and search; sources are ingested one at a time
+        self._lock=threading.RLock()
+        self._ingest_lock=threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drops every indexed source."""
+        with self._lock:
+            self.vector_store=None
+            self.image_vector_store=None
+            self.image_data_store=ImageStore()
+            self.all_docs=[]
+            # BM25 over the text chunks, for hybrid retrieval
+            self.lexical_index=BM25Index()
+            # Vector ids are unique across both indexes; source id -> {"text": ids, "image": ids}
+            self.source_vectors={}
+            self._next_id=0
+            # Loaded indexes are memory-mapped read-only until first modified
+            self._mapped=False
+            if self.query_cache:
+                self.query_cache.clear()
+
+    @property
+    def has_index(self)->bool:
+        return bool(self.vector_store or self.image_vector_store)
+
+    @property
+    def index_key(self)->str:
+        """Identifies the models this processor's indexes are built with (see DocumentIndexStore)."""
+        return index_model_key(self.clip_key,self.text_backend.key)
 
     def embed_image(self,image_data):
-        if isinstance(image_data,str):
-            image=Image.open(image_data).convert("RGB")
-        else:
-            image=image_data
-        
-        inputs=self.clip_processor(images=image,return_tensors="pt")
-        with torch.no_grad():
-            features=self.clip_model.get_image_features(**inputs)
-            features=features/features.norm(p=2,dim=-1,keepdim=True)
-            return features.squeeze().numpy()
-        
+        return self.embed_images([image_data])[0]
+
     def embed_text(self,text):
-        inputs=self.clip_processor(text=text,
-        return_tensors="pt",
-        padding=True,
-        truncation=True,
-        max_length=77)
-        with torch.no_grad():
-            features=self.clip_model.get_text_features(**inputs)
-            features=features/features.norm(dim=-1,keepdim=True)
-            return features.squeeze().numpy()
+        return self.embed_texts([text])[0]
+
+    def embed_images(self,images:List[Union[str,Image.Image]],batch_size:int=None)->np.ndarray:
+        """
+        Embeds images (file paths or PIL images) with batched CLIP forward passes.
+        Returns an (n, dim) float32 array of L2-normalised vectors.
+        """
+        batch_size=batch_size or self.embed_batch_size
+        vectors=[]
+        for start in range(0,len(images),batch_size):
+            batch=[Image.open(img).convert("RGB") if isinstance(img,str) else img
+                   for img in images[start:start+batch_size]]
+            inputs=self.clip_processor(images=batch,return_tensors="pt")
+            vectors.append(self.clip_encoders.image_features(inputs))
+        return self._stack(vectors)
+
+    def embed_texts(self,texts:List[str],batch_size:int=None)->np.ndarray:
+        """
+        Embeds texts for the text index with the configured text backend.
+        Returns an (n, dim) float32 array of L2-normalised vectors.
+        """
+        return self.text_backend.embed_texts(texts,batch_size or self.embed_batch_size)
+
+    def embed_image_queries(self,texts:List[str],batch_size:int=None)->np.ndarray:
+        """Embeds texts with CLIP's text tower, for searching the image index."""
+        return self.clip_text_backend.embed_texts(texts,batch_size or self.embed_batch_size)
+
+    def _embed_image_batches(self,images:List[Image.Image])->List[Any]:
+        """Batched image embedding; returns None in place of images that fail to embed."""
+        vectors=[]
+        for start in range(0,len(images),self.embed_batch_size):
+            batch=images[start:start+self.embed_batch_size]
+            try:
+                vectors.extend(self.embed_images(batch))
+            except Exception as e:
+                # A single corrupt image shouldn't drop the whole batch
+                logger.warning(f"Batched image embedding failed, retrying one by one: {e}")
+                for img in batch:
+                    try:
+                        vectors.append(self.embed_image(img))
+                    except Exception as img_e:
+                        logger.warning(f"Failed to embed image: {img_e}")
+                        vectors.append(None)
+        return vectors
+
+    def _embed_with_cache(self,cache,keys,items,embed_fn)->List[Any]:
+        """Looks items up in the embedding cache and runs embed_fn on the misses only."""
+        if keys is None:
+            return list(embed_fn(items))
+
+        vectors=cache.get_many(keys)
+        missing=[i for i,vec in enumerate(vectors) if vec is None]
+        if missing:
+            new_vectors=embed_fn([items[i] for i in missing])
+            for i,vec in zip(missing,new_vectors):
+                vectors[i]=vec
+            embedded=[i for i in missing if vectors[i] is not None]
+            cache.put_many([keys[i] for i in embedded],[vectors[i] for i in embedded])
+        return vectors
+
+    def _image_key(self,image:Image.Image)->str:
+        # Hash the decoded pixels so re-encoded copies of the same image still hit
+        return self.embedding_cache.bytes_key(f"{image.mode}{image.size}".encode()+image.tobytes())
+
+    def _stack(self,vectors:List[np.ndarray])->np.ndarray:
+        if not vectors:
+            return np.zeros((0,self.clip_model.config.projection_dim),dtype=np.float32)
+        return np.concatenate(vectors,axis=0)
     
-    def ingest_data(self,data:dict):
+    def ingest_data(self,data:dict,progress_callback=None):
+        """
+        Embeds and indexes the text pages and images of an ingestor result.
+        progress_callback(**counters), if given, receives chunks/images embedded so far.
+        """
         if not data or (not data.get("text_pages") and not data.get('images')):
             return 'Error : No data to ingest'
-        logger.info("Ingesting the given data")
-
-        self.all_docs=[]
-        self.embeddings=[]
-        self.image_data_store={}
-
-        #processing the text image
-        for item in data.get("text_pages",[]):
-            text=item.get("text","")
-            page_num=item.get("page",0)
-
-            if text.strip():
-                temp_doc=Document(
-                    page_content=text,
-                    metadata={"type":"text","page":page_num}
-                )
-
-                chunks=self.text_splitter.split_documents([temp_doc])
-                for chunk in chunks:
-                    emb=self.embed_text(chunk.page_content)
-                    self.all_docs.append(chunk)
-                    self.embeddings.append(emb)
-                    
-        #processing for images
-        for img_item in data.get("images",[]):
-            try:
-                pil_image=img_item.get("image")
-                image_id=img_item.get("id","unknown")
-                page_num=img_item.get("page",0)
-
-                import io
-                buffered=io.BytesIO()
-                pil_image.save(buffered,format="PNG")
-                img_base64=base64.b64encode(buffered.getvalue()).decode()
-                self.image_data_store[image_id]=img_base64
-
-                emb=self.embed_image(pil_image)
-                self.embeddings.append(emb)
-
-                image_doc=Document(
-                    page_content=f"[Image: {image_id}]",
-                    metadata={"page": page_num, "type": "image", "image_id": image_id}
-                )
-                self.all_docs.append(image_doc)
-            except Exception as e:
-                logger.warning(f"Failed to process image{image_id}:{e}")
-                continue
-        if not self.embeddings:
+        self.reset()
+        return self.add_data(data,DEFAULT_SOURCE_ID,progress_callback=progress_callback)
+
+    def add_data(self,data:dict,source_id:str,progress_callback=None):
+        """Like ingest_data, but adds the result to the existing indexes under source_id (see add_stream)."""
+        if not data or (not data.get("text_pages") and not data.get('images')):
+            return 'Error : No data to ingest'
+
+        items=[{"type":"text",**page} for page in data.get("text_pages",[])]
+        items+=[{"type":"image",**image} for image in data.get("images",[])]
+        return self.add_stream(items,source_id,progress_callback=progress_callback)
+
+    def ingest_stream(self,items,progress_callback=None):
+        """Replaces everything indexed so far with one source (see add_stream)."""
+        self.reset()
+        return self.add_stream(items,DEFAULT_SOURCE_ID,progress_callback=progress_callback)
+
+    def add_stream(self,items,source_id:str=DEFAULT_SOURCE_ID,progress_callback=None):
+        """
+        Consumes an ingestor's iter_multimodal() stream in bounded batches: text is
+        chunked, embedded and added to the FAISS index as it arrives, and decoded
+        images are released once embedded. Peak memory is bounded by the batch size
+        rather than the document size.
+
+        Documents are added to the existing indexes under source_id, so several
+        sources can share one processor; re-adding a source replaces it.
+        """
+        with self._ingest_lock:
+            return self._add_stream(items,source_id,progress_callback)
+
+    def _add_stream(self,items,source_id:str,progress_callback=None):
+        logger.info(f"Ingesting the given data as source {source_id}")
+        self.remove_source(source_id)
+        with self._lock:
+            self._ensure_writable()
+            if self.query_cache:
+                self.query_cache.clear()
+        self._ingest_counts={"chunks_embedded":0,"images_embedded":0}
+
+        pending_chunks=[]
+        pending_images=[]
+        # A deduplicated PDF image lists every page it appears on; later pages arrive as image_pages items
+        image_pages={}
+        indexed_images={}
+        for item in items:
+            if item.get("type")=="image_pages":
+                image_id=self._image_id(source_id,item["id"])
+                doc=indexed_images.get(image_id)
+                if doc is None:
+                    image_pages[image_id]=item["pages"]
+                else:
+                    with self._lock:
+                        doc.metadata["pages"]=list(item["pages"])
+            elif item.get("type")=="image":
+                image_id=self._image_id(source_id,item.get("id","unknown"))
+                try:
+                    pil_image=item.get("image")
+                    page_num=item.get("page",0)
+
+                    # Keep the original compressed bytes; prompt-sized copies are made on demand
+                    if item.get("bytes"):
+                        self.image_data_store.add(image_id,item["bytes"])
+                    else:
+                        self.image_data_store.add_pil(image_id,pil_image)
+                    pending_images.append((pil_image,image_id,page_num,item.get("pages")))
+                except Exception as e:
+                    logger.warning(f"Failed to process image{image_id}:{e}")
+                    continue
+                if len(pending_images)>=self.embed_batch_size:
+                    indexed_images.update(self._index_images(pending_images,source_id,progress_callback,image_pages))
+                    pending_images=[]
+            else:
+                #processing the text
+                text=item.get("text","")
+                page_num=item.get("page",0)
+
+                if text.strip():
+                    temp_doc=Document(
+                        page_content=text,
+                        metadata={"type":"text","page":page_num,"source_id":source_id}
+                    )
+                    pending_chunks.extend(self.text_splitter.split_documents([temp_doc]))
+                # One forward pass per batch instead of one per chunk
+                if len(pending_chunks)>=self.embed_batch_size:
+                    self._index_chunks(pending_chunks,source_id,progress_callback)
+                    pending_chunks=[]
+
+        if pending_chunks:
+            self._index_chunks(pending_chunks,source_id,progress_callback)
+        if pending_images:
+            self._index_images(pending_images,source_id,progress_callback,image_pages)
+
+        if self.embedding_cache:
+            self.embedding_cache.flush()
+        if self.text_embedding_cache and self.text_embedding_cache is not self.embedding_cache:
+            self.text_embedding_cache.flush()
+
+        if source_id not in self.source_vectors:
             return "No content to Index"
 
-        embeddings_array=np.array(self.embeddings)
-        self.vector_store=FAISS.from_embeddings(
-            text_embeddings=[(doc.page_content, emb) for doc, emb in zip(self.all_docs, embeddings_array)],
-            embedding=None,
-            metadatas=[doc.metadata for doc in self.all_docs]
+        with self._lock:
+            self._optimize_indexes()
+        logger.info(f"Ingestion completed successfully (indexes: {self.index_stats()}, BM25 index: {self.lexical_index.stats()})")
+
+        counts=self.source_vectors[source_id]
+        return f"Successfully ingested {len(counts['text'])+len(counts['image'])} documents"
+
+    @staticmethod
+    def _image_id(source_id:str,image_id:str)->str:
+        # Ingestors number images per document, so ids are namespaced by source in a collection
+        return image_id if source_id==DEFAULT_SOURCE_ID else f"{source_id}/{image_id}"
+
+    def _index_chunks(self,chunks:List[Document],source_id:str,progress_callback=None):
+        # Only chunks not seen before go through the text encoder
+        texts=[chunk.page_content for chunk in chunks]
+        cache=self.text_embedding_cache
+        # Only the encoder call holds an embed slot, not the whole ingest loop
+        text_embs=call_in_stage("embed",self._embed_with_cache,cache,[cache.text_key(t) for t in texts] if cache else None,
+            texts,self.embed_texts)
+        # BM25 is keyed by the chunk's vector id
+        with self._lock:
+            self.vector_store,ids=self._add_to_index(self.vector_store,chunks,text_embs,source_id,"text")
+            for doc_id,chunk in zip(ids,chunks):
+                self.lexical_index.add(int(doc_id),chunk.page_content)
+        self._report_ingest(progress_callback,"chunks_embedded",len(chunks))
+
+    def _index_images(self,image_items,source_id:str,progress_callback=None,image_pages=None)->Dict[str,Document]:
+        """Embeds and indexes (image, image_id, page, pages) items; returns the new documents by image id."""
+        pil_images=[item[0] for item in image_items]
+        image_embs=call_in_stage("embed",self._embed_with_cache,self.embedding_cache,
+            [self._image_key(img) for img in pil_images] if self.embedding_cache else None,
+            pil_images,self._embed_image_batches)
+
+        docs=[]
+        vectors=[]
+        for (pil_image,image_id,page_num,pages),emb in zip(image_items,image_embs):
+            if emb is None:
+                self.image_data_store.remove(image_id)
+                continue
+            pages=(image_pages or {}).pop(image_id,pages)
+            docs.append(Document(
+                page_content=f"[Image: {image_id}]",
+                metadata={"page": page_num, "pages": pages or [page_num], "type": "image", "image_id": image_id, "source_id": source_id}
+            ))
+            vectors.append(emb)
+        with self._lock:
+            self.image_vector_store,_=self._add_to_index(self.image_vector_store,docs,vectors,source_id,"image")
+        self._report_ingest(progress_callback,"images_embedded",len(image_items))
+        return {doc.metadata["image_id"]:doc for doc in docs}
+
+    def _add_to_index(self,store,docs:List[Document],vectors:List[np.ndarray],source_id:str,kind:str):
+        """
+        Adds docs to a FAISS store (created on first use) under new vector ids.
+        Returns (store, ids); the store's index_to_docstore_id maps vector id -> docstore id.
+        """
+        if not docs:
+            return store,[]
+        vectors=np.asarray(vectors,dtype=np.float32)
+        ids=np.arange(self._next_id,self._next_id+len(docs),dtype=np.int64)
+        self._next_id+=len(docs)
+        if store is None:
+            store=FAISS(
+                embedding_function=None,
+                index=new_flat_index(vectors.shape[1]),
+                docstore=InMemoryDocstore(),
+                index_to_docstore_id={},
+                distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+            )
+        store.index.add_with_ids(vectors,ids)
+        for doc in docs:
+            doc.id=str(uuid.uuid4())
+        store.docstore.add({doc.id:doc for doc in docs})
+        store.index_to_docstore_id.update(zip(ids.tolist(),[doc.id for doc in docs]))
+        self.source_vectors.setdefault(source_id,{"text":[],"image":[]})[kind].extend(ids.tolist())
+        self.all_docs.extend(docs)
+        return store,ids
+
+    def _optimize_indexes(self):
+        """
+        Rebuilds each flat index as the configured (or, for "auto", size-appropriate)
+        type, trained on the ingested vectors. Vector ids are kept, so the docstore
+        mapping and BM25 stay valid. Indexes that are no longer flat are left as they
+        are: later sources are added to the already trained index.
+        """
+        for store in (self.vector_store,self.image_vector_store):
+            if store is None or index_type_of(store.index)!="flat":
+                continue
+            index_type=choose_index_type(store.index.ntotal) if self.index_type=="auto" else self.index_type
+            if index_type!="flat":
+                start=time.perf_counter()
+                ids,vectors=index_contents(store.index)
+                store.index=build_index(vectors,index_type,ids)
+                logger.info(f"Built {index_type} index over {store.index.ntotal} vectors in {time.perf_counter()-start:.2f}s")
+
+    def _ensure_writable(self):
+        if self._mapped:
+            for store in (self.vector_store,self.image_vector_store):
+                if store is not None:
+                    store.index=writable_index(store.index)
+            self._mapped=False
+
+    def remove_source(self,source_id:str)->bool:
+        """
+        Removes a source's chunks and images from both indexes, BM25 and the image
+        store. Returns False if the source is not indexed.
+        """
+        with self._lock:
+            entry=self.source_vectors.pop(source_id,None)
+            if entry is None:
+                return False
+            self._ensure_writable()
+            for vector_id in entry["image"]:
+                self.image_data_store.remove(self._store_doc(self.image_vector_store,vector_id).metadata.get("image_id"))
+            self.vector_store=self._remove_from_store(self.vector_store,entry["text"])
+            self.image_vector_store=self._remove_from_store(self.image_vector_store,entry["image"])
+            if entry["text"]:
+                self.lexical_index.remove(entry["text"])
+
+            self.all_docs=[doc for doc in self.all_docs if doc.metadata.get("source_id",DEFAULT_SOURCE_ID)!=source_id]
+            if self.query_cache:
+                self.query_cache.clear()
+        logger.info(f"Removed source {source_id} ({len(entry['text'])} chunks, {len(entry['image'])} images)")
+        return True
+
+    @staticmethod
+    def _remove_from_store(store,ids:List[int]):
+        """Drops ids from a store's index and docstore; returns None once the store is empty."""
+        if store is None or not ids:
+            return store
+        store.docstore.delete([store.index_to_docstore_id.pop(vector_id) for vector_id in ids])
+        if not store.index_to_docstore_id:
+            return None
+        store.index=configure_search(remove_ids(store.index,ids))
+        return store
+
+    def sources(self)->Dict[str,Dict[str,int]]:
+        """Chunk and image counts per indexed source."""
+        with self._lock:
+            return {source_id:{"chunks":len(entry["text"]),"images":len(entry["image"])}
+                    for source_id,entry in self.source_vectors.items()}
+
+    def _allowed_ids(self,sources:List[str],kind:str):
+        """Vector ids of the given sources in the text or image index, or None for no filter."""
+        if sources is None:
+            return None
+        ids=[self.source_vectors[source_id][kind] for source_id in sources if source_id in self.source_vectors]
+        return np.concatenate([np.asarray(group,dtype=np.int64) for group in ids]) if ids else np.zeros(0,dtype=np.int64)
+
+    def index_stats(self)->Dict[str,Any]:
+        """Type, size and approximate memory of the text and image indexes."""
+        with self._lock:
+            return {name:describe_index(store.index) for name,store in (("text",self.vector_store),("image",self.image_vector_store)) if store}
+
+    def _report_ingest(self,progress_callback,counter:str,count:int):
+        self._ingest_counts[counter]+=count
+        if progress_callback:
+            progress_callback(**self._ingest_counts)
+
+    def save_index(self,path:str):
+        """Writes the text and image FAISS indexes, docstores, BM25 index and image store to path."""
+        os.makedirs(path,exist_ok=True)
+        with self._lock:
+            if self.vector_store:
+                self.vector_store.save_local(path)
+            if self.image_vector_store:
+                self.image_vector_store.save_local(path,index_name="image_index")
+            self.image_data_store.save(path)
+            with open(os.path.join(path,"bm25.pkl"),"wb") as f:
+                pickle.dump(self.lexical_index,f)
+
+    @staticmethod
+    def _load_store(path:str,index_name:str):
+        """Memory-maps one FAISS index written by save_local, or returns None if absent."""
+        index_path=os.path.join(path,f"{index_name}.faiss")
+        if not os.path.exists(index_path):
+            return None
+        index=configure_search(faiss.read_index(index_path,faiss.IO_FLAG_MMAP|faiss.IO_FLAG_READ_ONLY))
+        # Only files this process wrote itself are ever unpickled here
+        with open(os.path.join(path,f"{index_name}.pkl"),"rb") as f:
+            docstore,index_to_docstore_id=pickle.load(f)
+        return FAISS(
+            embedding_function=None,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
         )
-        logger.info("Ingestion completed successfully")
 
-        return f"Successfully ingested {len(self.all_docs)} documents"
+    @staticmethod
+    def _store_items(store)->List[Tuple[int,Document]]:
+        """(vector id, doc) pairs of a store, in insertion order."""
+        if store is None:
+            return []
+        return [(vector_id,store.docstore.search(doc_id)) for vector_id,doc_id in store.index_to_docstore_id.items()]
+
+    def load_index(self,path:str):
+        """Restores state written by save_index; the FAISS indexes are memory-mapped."""
+        vector_store=self._load_store(path,"index")
+        image_vector_store=self._load_store(path,"image_index")
+        if vector_store is None and image_vector_store is None:
+            raise FileNotFoundError(f"No FAISS index in {path}")
+        image_data_store=ImageStore.load(path)
+
+        text_items=self._store_items(vector_store)
+        image_items=self._store_items(image_vector_store)
+        source_vectors={}
+        for kind,items in (("text",text_items),("image",image_items)):
+            for vector_id,doc in items:
+                source_id=doc.metadata.get("source_id",DEFAULT_SOURCE_ID)
+                source_vectors.setdefault(source_id,{"text":[],"image":[]})[kind].append(vector_id)
+
+        with self._lock:
+            self.vector_store=vector_store
+            self.image_vector_store=image_vector_store
+            self.image_data_store=image_data_store
+            self.all_docs=[doc for _,doc in text_items+image_items]
+            self.source_vectors=source_vectors
+            self._next_id=max(vector_id for vector_id,_ in text_items+image_items)+1
+            self._mapped=True
+            bm25_path=os.path.join(path,"bm25.pkl")
+            if os.path.exists(bm25_path):
+                with open(bm25_path,"rb") as f:
+                    self.lexical_index=pickle.load(f)
+            else:
+                # Saved before BM25 existed: rebuild from the stored chunks
+                self.lexical_index=BM25Index()
+                for vector_id,doc in text_items:
+                    self.lexical_index.add(vector_id,doc.page_content)
+            if self.query_cache:
+                self.query_cache.clear()
+
+    def query_vectors(self,queries:List[str],precomputed:bool=False):
+        """
+        (text index vectors, image index vectors) for queries. precomputed queries
+        (the fixed summary/quiz queries) come from the mode query table. Image
+        vectors are None when there is no image index to search.
+        """
+        def embed(key,embed_fn):
+            if precomputed:
+                return mode_query_table.get(key,queries,embed_fn)
+            return embed_fn(queries)
+
+        text_embs=embed(self.text_backend.key,self.embed_texts)
+        if not self.image_vector_store:
+            return text_embs,None
+        if self.text_backend.shares_clip_space:
+            return text_embs,text_embs
+        return text_embs,embed(self.clip_key,self.embed_image_queries)
+
+    def retrieve(self,queries:List[str],k:int,query_text:str=None,retrieval:str=None,precomputed:bool=False,sources:List[str]=None)->List[Document]:
+        """Embeds queries and returns the top-k documents (see search_by_vectors)."""
+        text_embs,image_embs=self.query_vectors(queries,precomputed)
+        return self.search_by_vectors(text_embs,k,query_text=query_text,retrieval=retrieval,image_embs=image_embs,sources=sources)
+
+    def search_by_vectors(self,query_embs:np.ndarray,k:int,query_text:str=None,retrieval:str=None,image_embs:np.ndarray=None,sources:List[str]=None)->List[Document]:
+        """
+        Top-k documents for one or more query vectors. The text index is searched
+        with query_embs and the image index with image_embs (defaulting to query_embs
+        when the text backend is CLIP), and the two are merged by cosine (see
+        _image_merge_scores for how image scores are calibrated).
+
+        Several query vectors are searched in a single FAISS call and their rankings
+        fused with reciprocal rank fusion. In hybrid mode the BM25 ranking for
+        query_text is fused in as well.
+
+        sources, if given, restricts the results to documents of those source ids.
+        """
+        retrieval=retrieval or Config.RETRIEVAL_MODE
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode: {retrieval}")
+        hybrid=retrieval=="hybrid" and query_text and self.lexical_index is not None
+        if image_embs is None and self.text_backend.shares_clip_space:
+            image_embs=query_embs
+
+        with self._lock:
+            hits=self._search_text(np.asarray(query_embs,dtype=np.float32),k,query_text if hybrid else None,
+                                   self._allowed_ids(sources,"text"))
+            if self.image_vector_store and image_embs is not None:
+                hits+=self._image_merge_scores(self._search_images(np.asarray(image_embs,dtype=np.float32),k,self._allowed_ids(sources,"image")))
+        hits.sort(key=lambda hit:hit[1],reverse=True)
+        return [doc for doc,_ in hits[:k]]
+
+    @staticmethod
+    def _store_doc(store,vector_id:int)->Document:
+        return store.docstore.search(store.index_to_docstore_id[vector_id])
 
+    @staticmethod
+    def _search_index(store,query_embs:np.ndarray,k:int,allowed:np.ndarray=None):
+        params=search_params(store.index,allowed) if allowed is not None else None
+        return store.index.search(query_embs,k,params=params)
 
-    def query(self,user_query:str,k:int=5):
-        if not self.vector_store:
-            return "Error: No data ingested yet. Please ingest a PDF first."
+    def _image_merge_scores(self,hits:List[Tuple[Document,float]])->List[Tuple[Document,float]]:
+        """
+        Image hits on the text hits' scale. In CLIP space both are plain cosines;
+        otherwise the fixed RETRIEVAL_IMAGE_SCORE_OFFSET is added. Weak image
+        matches are dropped either way, so an unrelated image never fills a slot.
+        """
+        offset=0.0 if self.text_backend.shares_clip_space else Config.RETRIEVAL_IMAGE_SCORE_OFFSET
+        return [(doc,score+offset) for doc,score in hits if score>=Config.RETRIEVAL_IMAGE_MIN_SCORE]
+
+    def _search_text(self,query_embs:np.ndarray,k:int,query_text:str=None,allowed:np.ndarray=None)->List[Tuple[Document,float]]:
+        """
+        (doc, cosine) pairs from the text index, best first. With several query
+        vectors or BM25 the order is the RRF fusion, and each hit carries its best
+        dense cosine capped by the hit above it, so merging keeps the fused order
+        (BM25-only hits take the score of the hit above).
+        """
+        if not self.vector_store or (allowed is not None and not len(allowed)):
+            return []
+        store=self.vector_store
+        if len(query_embs)==1 and not query_text:
+            scores,ids=self._search_index(store,query_embs,k,allowed)
+            return [(self._store_doc(store,int(idx)),float(score)) for score,idx in zip(scores[0],ids[0]) if idx>=0]
+
+        # Fusion works better with a deeper candidate list than the final k
+        depth=k*2 if query_text else k
+        scores,ids=self._search_index(store,query_embs,depth,allowed)
+        cosines=_best_scores(scores,ids)
+        rankings=[[int(idx) for idx in row if idx>=0] for row in ids]
+        if query_text:
+            rankings.append([doc_id for doc_id,_ in self.lexical_index.search(query_text,depth,allowed=allowed)])
+        hits=[]
+        previous=max(cosines.values(),default=1.0)
+        for doc_id,_ in _rrf(rankings,k):
+            previous=min(previous,cosines.get(doc_id,previous))
+            hits.append((self._store_doc(store,doc_id),previous))
+        return hits
+
+    def _search_images(self,query_embs:np.ndarray,k:int,allowed:np.ndarray=None)->List[Tuple[Document,float]]:
+        """(doc, best cosine over the query vectors) pairs from the image index."""
+        if allowed is not None and not len(allowed):
+            return []
+        store=self.image_vector_store
+        scores,ids=self._search_index(store,query_embs,k,allowed)
+        ranked=sorted(_best_scores(scores,ids).items(),key=lambda item:item[1],reverse=True)[:k]
+        return [(self._store_doc(store,vector_id),score) for vector_id,score in ranked]
+
+    def query(self,user_query:str,k:int=5,retrieval:str=None,sources:List[str]=None):
+        messages,cached,cache_entry=self._prepare_query(user_query,k,retrieval,sources)
+        if cached is not None:
+            return cached
+        if isinstance(messages,str):
+            return messages
+
+        #INVOKING THE LLM 
+        response=self.llm.invoke(messages)
+        self._remember_answer(cache_entry,response.content)
+        return response.content
+
+    async def aquery(self,user_query:str,k:int=5,retrieval:str=None,sources:List[str]=None):
+        """Async variant of query: retrieval on the embed pool, LLM call via ainvoke."""
+        answer,_=await self.aquery_with_cache_status(user_query,k,retrieval,sources)
+        return answer
+
+    async def aquery_with_cache_status(self,user_query:str,k:int=5,retrieval:str=None,sources:List[str]=None)->Tuple[str,bool]:
+        """Like aquery, but returns (answer, whether it came from the semantic query cache)."""
+        messages,cached,cache_entry=await run_in_stage("embed",self._prepare_query,user_query,k,retrieval,sources)
+        if cached is not None:
+            return cached,True
+        if isinstance(messages,str):
+            return messages,False
+
+        async with stage_limit("llm"):
+            response=await self.llm.ainvoke(messages)
+        self._remember_answer(cache_entry,response.content)
+        return response.content,False
+
+    async def astream_query(self,user_query:str,k:int=5,trace_id:str=None,retrieval:str=None,sources:List[str]=None):
+        """Streams the answer as text chunks; timings are recorded in MetricsManager under trace_id."""
+        trace_id=trace_id or uuid.uuid4().hex
+        metrics_manager.start_trace(trace_id,"query")
+        try:
+            start=time.perf_counter()
+            messages,cached,cache_entry=await run_in_stage("embed",self._prepare_query,user_query,k,retrieval,sources)
+            metrics_manager.log_retrieval(time.perf_counter()-start,trace_id=trace_id)
+            metrics_manager.log_cache_hit(cached is not None,trace_id=trace_id)
+            if cached is not None:
+                yield cached
+                return
+            if isinstance(messages,str):
+                yield messages
+                return
+
+            parts=[]
+            async with stage_limit("llm"):
+                async for chunk in self.llm.astream(messages,config={"callbacks":[PerformanceCallback(trace_id)]}):
+                    if chunk.text:
+                        parts.append(chunk.text)
+                        yield chunk.text
+            self._remember_answer(cache_entry,"".join(parts))
+        finally:
+            metrics_manager.end_trace(trace_id)
+
+    def _prepare_query(self,user_query:str,k:int,retrieval:str=None,sources:List[str]=None):
+        """
+        Embeds the question and retrieves context. Returns (messages, cached_answer, cache_entry):
+        cached_answer is set on a semantic cache hit, messages is an error string if nothing
+        is ingested, and cache_entry is what _remember_answer needs to store the new answer.
+        """
+        if not self.has_index:
+            return "Error: No data ingested yet. Please ingest a PDF first.",None,None
         
         #Embed the query
-        query_emb=self.embed_text(user_query)
-        results=self.vector_store.similarity_search_by_vector(query_emb,k=k)        
-        
+        text_embs,image_embs=self.query_vectors([user_query])
+        query_emb=text_embs[0]
+        results=self.search_by_vectors(text_embs,k,query_text=user_query,retrieval=retrieval,image_embs=image_embs,sources=sources)
+
+        doc_ids=[doc.id or doc.page_content for doc in results]
+        if self.query_cache:
+            cached=self.query_cache.lookup(query_emb,doc_ids,user_query)
+            if cached is not None:
+                return None,cached,None
+        return self._build_query_messages(user_query,results),None,(query_emb,doc_ids,user_query)
+
+    def _remember_answer(self,cache_entry,answer:str):
+        if self.query_cache and cache_entry and answer:
+            self.query_cache.add(*cache_entry,answer)
+
+    def _build_query_messages(self,user_query:str,results:List[Document]):
         content=[]
         content.append({"type":"text","text":f"Question :{user_query}\n\n"})
         text_docs=[doc for doc in results if doc.metadata.get("type") == "text"]
@@ -139,18 +730,14 @@ class MultiModalRAGProcessor:
         for doc in image_docs:
             image_id = doc.metadata.get("image_id")
             if image_id and image_id in self.image_data_store:
-                content.append({"type": "text", "text": f"\n[Image from page {doc.metadata['page']}]:\n"})
+                pages=", ".join(str(page) for page in doc.metadata.get("pages",[doc.metadata["page"]]))
+                content.append({"type": "text", "text": f"\n[Image from page {pages}]:\n"})
                 content.append({
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{self.image_data_store[image_id]}"}
+                    "image_url": {"url": self.image_data_store.data_url(image_id)}
                 })
         
         content.append({"type": "text", "text": "\n\nPlease answer the question based on the provided text and images."})
 
-
-
-        #INVOKING THE LLM 
-        msg=HumanMessage(content=content)
-        response=self.llm.invoke([msg])
-        return response.content
+        return [HumanMessage(content=content)]
 
@@ -4,6 +4,11 @@ from langchain_core.messages import HumanMessage
 from langchain_core.output_parsers import JsonOutputParser
 from pydantic import BaseModel, Field
 from typing import List, Any
+from src.utils.concurrency import run_in_stage, stage_limit
+from src.utils.context_budget import ContextBudgeter
+from src.utils.response_cache import response_cache
+from .mode_queries import QUIZ_QUERY, query_facets
+from config.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -18,23 +23,84 @@ class QuizOutput(BaseModel):
 
 class QuizProcessor:
     def __init__(self, model_name="gemini-2.5-flash"):
-        self.llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.3)
+        self.model_name = model_name
+        self.temperature = 0.3
+        self.llm = ChatGoogleGenerativeAI(model=model_name, temperature=self.temperature)
         self.parser = JsonOutputParser(pydantic_object=QuizOutput)
+        # Context budget usage of the last prompt built, for response metadata
+        self.last_context_usage = None
+        # Whether the last quiz came from the response cache
+        self.last_cache_hit = False
 
-    def generate_quiz(self, rag_processor: Any, num_questions: int = 5, difficulty: str = "Medium"):
+    def generate_quiz(self, rag_processor: Any, num_questions: int = 5, difficulty: str = "Medium", use_cache: bool = True, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        messages = self._build_messages(rag_processor, num_questions, difficulty, multi_query, retrieval, sources)
+        if not messages:
+            return []
+
+        cache_key, cached = self._cache_lookup(messages, use_cache)
+        if cached is not None:
+            return cached
+
+        # 3. Invoke LLM and Parse
+        try:
+            response = self.llm.invoke(messages)
+            quiz = self._parse_response(response.content)
+            self._cache_store(cache_key, quiz)
+            return quiz
+        except Exception as e:
+            logger.error(f"Quiz generation failed: {e}")
+            return []
+
+    async def agenerate_quiz(self, rag_processor: Any, num_questions: int = 5, difficulty: str = "Medium", use_cache: bool = True, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        """Async variant of generate_quiz: retrieval on the embed pool, LLM call via ainvoke."""
+        messages = await run_in_stage("embed", self._build_messages, rag_processor, num_questions, difficulty, multi_query, retrieval, sources)
+        if not messages:
+            return []
+
+        cache_key, cached = await run_in_stage("ingest", self._cache_lookup, messages, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            async with stage_limit("llm"):
+                response = await self.llm.ainvoke(messages)
+            quiz = self._parse_response(response.content)
+            await run_in_stage("ingest", self._cache_store, cache_key, quiz)
+            return quiz
+        except Exception as e:
+            logger.error(f"Quiz generation failed: {e}")
+            return []
+
+    def _cache_lookup(self, messages, use_cache: bool):
+        """Returns (cache_key, cached_quiz). The key is None when caching is off for this call."""
+        self.last_cache_hit = False
+        if not (use_cache and Config.RESPONSE_CACHE_ENABLED):
+            return None, None
+        cache_key, cached = response_cache.lookup(self.model_name, self.temperature, messages)
+        self.last_cache_hit = cached is not None
+        return cache_key, cached
+
+    def _cache_store(self, cache_key, quiz):
+        # Parsed questions are cached, so a hit skips parsing as well as the LLM call
+        if cache_key and quiz:
+            response_cache.put(cache_key, self.model_name, quiz)
+
+    def _build_messages(self, rag_processor: Any, num_questions: int, difficulty: str, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        """Retrieves context and builds the quiz prompt. Returns [] if there is nothing to quiz on."""
         logger.info(f"Generating {num_questions} {difficulty} questions using RAG...")
         
-        if not rag_processor.vector_store:
+        if not rag_processor.has_index:
             logger.error("No content ingested in RAG processor")
             return []
 
         # 1. Retrieve Context
-        query = "important facts, key concepts, definitions, and details for examination"
+        if multi_query is None:
+            multi_query = Config.MULTI_QUERY_RETRIEVAL
+        queries = query_facets(QUIZ_QUERY) if multi_query else [QUIZ_QUERY]
         
         try:
-            query_emb = rag_processor.embed_text(query)
             # Fetch context (Text + Images)
-            results = rag_processor.vector_store.similarity_search_by_vector(query_emb, k=10)
+            results = rag_processor.retrieve(queries, k=10, query_text=QUIZ_QUERY, retrieval=retrieval, precomputed=True, sources=sources)
         except Exception as e:
             logger.error(f"RAG Retrieval failed: {e}")
             return []
@@ -55,48 +121,50 @@ RULES:
 """
         content.append({"type": "text", "text": intro_prompt})
 
-        # Append Text and Images from Retrieval
+        # Append Text and Images from Retrieval, within the quiz context budget
         MAX_IMAGES = 3
-        image_count = 0
+        outro_prompt = "\n\nGenerate the quiz now."
+        budget = ContextBudgeter(max_tokens=Config.QUIZ_TOKEN_BUDGET, max_images=MAX_IMAGES)
+        budget.reserve(intro_prompt)
+        budget.reserve(outro_prompt)
         
         for doc in results:
              doc_type = doc.metadata.get("type", "text")
              page = doc.metadata.get("page", "?")
              
              if doc_type == "text":
-                 content.append({"type": "text", "text": f"\n[Text Page {page}]: {doc.page_content}\n"})
+                 text_block = f"\n[Text Page {page}]: {doc.page_content}\n"
+                 if budget.fit_text(text_block):
+                     content.append({"type": "text", "text": text_block})
              
              elif doc_type == "image":
-                 if image_count < MAX_IMAGES:
-                     img_id = doc.metadata.get("image_id")
-                     if img_id and hasattr(rag_processor, 'image_data_store') and rag_processor.image_data_store and img_id in rag_processor.image_data_store:
-                         b64_str = rag_processor.image_data_store[img_id]
-                         content.append({"type": "text", "text": f"\n[Image from Page {page}]:\n"})
+                 img_id = doc.metadata.get("image_id")
+                 if img_id and hasattr(rag_processor, 'image_data_store') and rag_processor.image_data_store and img_id in rag_processor.image_data_store:
+                     image_label = f"\n[Image from Page {page}]:\n"
+                     image_url = budget.fit_image(rag_processor.image_data_store, img_id, label=image_label)
+                     if image_url:
+                         content.append({"type": "text", "text": image_label})
                          content.append({
                              "type": "image_url", 
-                             "image_url": {"url": f"data:image/png;base64,{b64_str}"}
+                             "image_url": {"url": image_url}
                          })
-                         image_count += 1
         
-        content.append({"type": "text", "text": "\n\nGenerate the quiz now."})
+        content.append({"type": "text", "text": outro_prompt})
 
-        # 3. Invoke LLM and Parse
-        try:
-            response = self.llm.invoke([HumanMessage(content=content)])
-            
-            # Helper to clean markdown json blocks if needed
-            response_text = response.content
-            if "```json" in response_text:
-                response_text = response_text.replace("```json", "").replace("```", "")
-            
-            # Use the parser to extract JSON from the response
-            parsed_result = self.parser.parse(response_text)
-            
-            # Handle potential wrapping keys
-            if isinstance(parsed_result, dict) and 'quiz' in parsed_result:
-                return parsed_result['quiz']
-            return parsed_result
+        self.last_context_usage = budget.usage()
+        logger.info(f"Quiz context budget: {self.last_context_usage}")
+
+        return [HumanMessage(content=content)]
+
+    def _parse_response(self, response_text: str):
+        # Helper to clean markdown json blocks if needed
+        if "```json" in response_text:
+            response_text = response_text.replace("```json", "").replace("```", "")
         
-        except Exception as e:
-            logger.error(f"Quiz generation failed: {e}")
-            return []
+        # Use the parser to extract JSON from the response
+        parsed_result = self.parser.parse(response_text)
+        
+        # Handle potential wrapping keys
+        if isinstance(parsed_result, dict) and 'quiz' in parsed_result:
+            return parsed_result['quiz']
+        return parsed_result
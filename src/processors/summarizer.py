@@ -1,7 +1,16 @@
+import time
+import uuid
 import logging
 from langchain_google_genai import ChatGoogleGenerativeAI
-from typing import Any
+from typing import Any, List
 from langchain_core.messages import HumanMessage
+from src.utils.concurrency import run_in_stage, stage_limit
+from src.utils.metrics import metrics_manager
+from src.utils.context_budget import ContextBudgeter
+from src.utils.response_cache import response_cache
+from .mode_queries import SUMMARY_QUERIES, DEFAULT_SUMMARY_QUERY, query_facets
+from config.config import Config
+from src.callbacks.performance import PerformanceCallback
 
 logger = logging.getLogger(__name__)
 
@@ -10,20 +19,124 @@ class SummarizerProcessor:
         """
         Initialize the Summarizer Processor.
         """
-        self.llm = ChatGoogleGenerativeAI(model=model_name, temperature=0.3)
+        self.model_name = model_name
+        self.temperature = 0.3
+        self.llm = ChatGoogleGenerativeAI(model=model_name, temperature=self.temperature)
+        # Context budget usage of the last prompt built, for response metadata
+        self.last_context_usage = None
+        # Whether the last response came from the response cache
+        self.last_cache_hit = False
 
-    def summarize(self, rag_processor: Any, summary_type: str = "concise"):
+    def summarize(self, rag_processor: Any, summary_type: str = "concise", use_cache: bool = True, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
         """
         Generates a summary by retrieving context from the provided MultiModalRAGProcessor.
         
         Args:
             rag_processor: An instance of MultiModalRAGProcessor that has already ingested data.
             summary_type: The type of summary to generate (e.g., 'concise', 'detailed', 'visual').
+            use_cache: Reuse a cached response for an identical prompt instead of calling the LLM.
+            multi_query: Retrieve with every facet of the mode query and fuse the results
+                (defaults to Config.MULTI_QUERY_RETRIEVAL).
+            retrieval: "dense" or "hybrid" (CLIP + BM25); defaults to Config.RETRIEVAL_MODE.
+            sources: Only use context from these source ids (documents of a collection).
+        """
+        messages = self._build_messages(rag_processor, summary_type, multi_query, retrieval, sources)
+        if isinstance(messages, str):
+            return messages
+
+        cache_key, cached = self._cache_lookup(messages, use_cache)
+        if cached is not None:
+            return cached
+
+        # 5. Invoke LLM
+        try:
+            response = self.llm.invoke(messages)
+            self._cache_store(cache_key, response.content)
+            return response.content
+        except Exception as e:
+            logger.error(f"Summarization processing failed: {e}")
+            return f"Error generating summary: {str(e)}"
+
+    async def asummarize(self, rag_processor: Any, summary_type: str = "concise", use_cache: bool = True, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        """
+        Async variant of summarize for the API: retrieval runs on the embed pool
+        and the LLM call uses ainvoke, so the event loop is never blocked.
+        """
+        messages = await run_in_stage("embed", self._build_messages, rag_processor, summary_type, multi_query, retrieval, sources)
+        if isinstance(messages, str):
+            return messages
+
+        cache_key, cached = await run_in_stage("ingest", self._cache_lookup, messages, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            async with stage_limit("llm"):
+                response = await self.llm.ainvoke(messages)
+            await run_in_stage("ingest", self._cache_store, cache_key, response.content)
+            return response.content
+        except Exception as e:
+            logger.error(f"Summarization processing failed: {e}")
+            return f"Error generating summary: {str(e)}"
+
+    async def astream_summary(self, rag_processor: Any, summary_type: str = "concise", trace_id: str = None, use_cache: bool = True, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        """
+        Streams the summary as text chunks while the LLM generates it.
+        Retrieval time, TTFT and tokens/sec are recorded in MetricsManager under trace_id.
+        A cached summary is sent as a single chunk.
+        """
+        trace_id = trace_id or uuid.uuid4().hex
+        metrics_manager.start_trace(trace_id, f"summarize:{summary_type}")
+        try:
+            start = time.perf_counter()
+            messages = await run_in_stage("embed", self._build_messages, rag_processor, summary_type, multi_query, retrieval, sources)
+            metrics_manager.log_retrieval(time.perf_counter() - start, trace_id=trace_id)
+            metrics_manager.log_context(self.last_context_usage, trace_id=trace_id)
+            if isinstance(messages, str):
+                yield messages
+                return
+
+            cache_key, cached = await run_in_stage("ingest", self._cache_lookup, messages, use_cache)
+            if cached is not None:
+                yield cached
+                return
+
+            try:
+                parts = []
+                async with stage_limit("llm"):
+                    async for chunk in self.llm.astream(messages, config={"callbacks": [PerformanceCallback(trace_id)]}):
+                        if chunk.text:
+                            parts.append(chunk.text)
+                            yield chunk.text
+                await run_in_stage("ingest", self._cache_store, cache_key, "".join(parts))
+            except Exception as e:
+                logger.error(f"Summarization streaming failed: {e}")
+                yield f"Error generating summary: {str(e)}"
+        finally:
+            metrics_manager.end_trace(trace_id)
+
+    def _cache_lookup(self, messages, use_cache: bool):
+        """Returns (cache_key, cached_response). The key is None when caching is off for this call."""
+        self.last_cache_hit = False
+        if not (use_cache and Config.RESPONSE_CACHE_ENABLED):
+            return None, None
+        cache_key, cached = response_cache.lookup(self.model_name, self.temperature, messages)
+        self.last_cache_hit = cached is not None
+        return cache_key, cached
+
+    def _cache_store(self, cache_key, response):
+        if cache_key and response:
+            response_cache.put(cache_key, self.model_name, response)
+
+    def _build_messages(self, rag_processor: Any, summary_type: str, multi_query: bool = None, retrieval: str = None, sources: List[str] = None):
+        """
+        Retrieves context and builds the multimodal prompt.
+        Returns the message list, or an error string if retrieval is not possible.
         """
         logger.info(f"Generating {summary_type} summary using RAG backend...")
 
         # 1. Validation: Ensure we have a vector store to query
-        if not rag_processor.vector_store:
+        if not rag_processor.has_index:
             return "Error: No content ingested. Please ingest a file or link first."
 
         # 2. Retrieve Context
@@ -43,23 +156,15 @@ class SummarizerProcessor:
         
         # Dynamic Query Selection (Level 2 Optimization)
         # Tailor the retrieval query to what matters for the summary type
-        query_map = {
-            "concise": "overview of the main content and core message",
-            "executive": "key outcomes, risks, benefits, and strategic implications",
-            "bullet_points": "list of key takeaways, main topics, and important facts",
-            "educational": "definitions, step-by-step explanations, and fundamental concepts",
-            "detailed": "comprehensive details, nuance, examples, and specifics",
-            "technical_deep_dive": "technical specifications, implementation details, methodologies, and data",
-            "exam_ready": "definitions, formulas, dates, and testable facts"
-        }
-        query = query_map.get(summary_type, "comprehensive overview of the main content, key topics, and visual details")
+        query = SUMMARY_QUERIES.get(summary_type, DEFAULT_SUMMARY_QUERY)
+        if multi_query is None:
+            multi_query = Config.MULTI_QUERY_RETRIEVAL
+        queries = query_facets(query) if multi_query else [query]
         
         try:
-            # Embed the tailored query using the RAG processor's embedding method
-            query_emb = rag_processor.embed_text(query)
-            
-            # Fetch top k chunks
-            results = rag_processor.vector_store.similarity_search_by_vector(query_emb, k=k_val)
+            # Fetch top k chunks (fused across the query facets in multi-query mode).
+            # Mode queries are fixed, so their embeddings come from the precomputed table
+            results = rag_processor.retrieve(queries, k=k_val, query_text=query, retrieval=retrieval, precomputed=True, sources=sources)
         except Exception as e:
             logger.error(f"Retrieval failed: {e}")
             return f"Error retrieving context: {str(e)}"
@@ -130,9 +235,16 @@ RULES:
         content.append({"type": "text", "text": intro_prompt})
 
         # Append Text and Images from Retrieval
-        # Level 5 Optimization: Token Budgeting via Image Capping
+        # Level 5 Optimization: Token Budgeting. Chunks are packed in retrieval order
+        # into the summary type's budget; images are downscaled to fit it
         MAX_IMAGES = 2 
-        image_count = 0
+        outro_prompt = "\n\nBased on the above retrieved context, generate the final summary now."
+        budget = ContextBudgeter(
+            max_tokens=Config.SUMMARY_TOKEN_BUDGETS.get(summary_type, Config.CONTEXT_TOKEN_BUDGET),
+            max_images=MAX_IMAGES
+        )
+        budget.reserve(intro_prompt)
+        budget.reserve(outro_prompt)
         
         current_text_block = ""
         
@@ -141,11 +253,19 @@ RULES:
             page = doc.metadata.get("page", "?")
             
             if doc_type == "text":
-                current_text_block += f"\n[Text Page {page}]: {doc.page_content}\n"
+                text_block = f"\n[Text Page {page}]: {doc.page_content}\n"
+                if budget.fit_text(text_block):
+                    current_text_block += text_block
             
             elif doc_type == "image":
-                # Only include image if budget allows
-                if image_count >= MAX_IMAGES:
+                img_id = doc.metadata.get("image_id")
+                # Ensure the image data exists in the RAG store
+                if not (img_id and hasattr(rag_processor, 'image_data_store') and rag_processor.image_data_store and img_id in rag_processor.image_data_store):
+                    continue
+                # Only include image if budget allows, label included
+                image_label = f"\n[Image from Page {page}]:\n"
+                image_url = budget.fit_image(rag_processor.image_data_store, img_id, label=image_label)
+                if image_url is None:
                     continue
                     
                 # Flush pending text first so order is preserved relative to images
@@ -154,28 +274,19 @@ RULES:
                     current_text_block = ""
                 
                 # Add Image
-                img_id = doc.metadata.get("image_id")
-                # Ensure the image data exists in the RAG store
-                if img_id and hasattr(rag_processor, 'image_data_store') and rag_processor.image_data_store and img_id in rag_processor.image_data_store:
-                    b64_str = rag_processor.image_data_store[img_id]
-                    content.append({"type": "text", "text": f"\n[Image from Page {page}]:\n"})
-                    content.append({
-                        "type": "image_url", 
-                        "image_url": {"url": f"data:image/png;base64,{b64_str}"}
-                    })
-                    image_count += 1
+                content.append({"type": "text", "text": image_label})
+                content.append({
+                    "type": "image_url", 
+                    "image_url": {"url": image_url}
+                })
 
         # Flush any remaining text after the loop
         if current_text_block:
             content.append({"type": "text", "text": current_text_block})
 
-        content.append({"type": "text", "text": "\n\nBased on the above retrieved context, generate the final summary now."})
+        content.append({"type": "text", "text": outro_prompt})
 
-        # 5. Invoke LLM
-        try:
-            msg = HumanMessage(content=content)
-            response = self.llm.invoke([msg])
-            return response.content
-        except Exception as e:
-            logger.error(f"Summarization processing failed: {e}")
-            return f"Error generating summary: {str(e)}"
+        self.last_context_usage = budget.usage()
+        logger.info(f"Context budget for {summary_type}: {self.last_context_usage}")
+
+        return [HumanMessage(content=content)]
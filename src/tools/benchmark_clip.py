@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from config.config import Config
+from src.processors.model_registry import model_registry
+from src.processors.clip_runtime import CLIP_RUNTIMES
+
+logging.basicConfig(level=logging.WARNING)
+
+def load_samples(pdf_path, num_images, num_chunks):
+    """Images and text chunks from a PDF, or synthetic ones when no PDF is given."""
+    images, chunks = [], []
+    if pdf_path:
+        import fitz
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                chunks.extend(part for part in page.get_text().split("\n\n") if part.strip())
+                for img in page.get_images(full=True):
+                    pix = fitz.Pixmap(doc, img[0])
+                    if pix.n - pix.alpha >= 4:
+                        pix = fitz.Pixmap(fitz.csRGB, pix)
+                    images.append(Image.frombytes("RGB" if pix.n < 4 else "RGBA", (pix.width, pix.height), pix.samples).convert("RGB"))
+    rng = np.random.default_rng(0)
+    while len(images) < num_images:
+        images.append(Image.fromarray(rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)))
+    words = "the cell membrane energy light water diagram chart figure data model system process result".split()
+    while len(chunks) < num_chunks:
+        chunks.append(" ".join(rng.choice(words, 40)))
+    return images[:num_images], chunks[:num_chunks]
+
+def embed(encoders, processor, images, chunks, batch_size):
+    start = time.perf_counter()
+    image_vecs = np.concatenate([encoders.image_features(processor(images=images[i:i + batch_size], return_tensors="pt"))
+                                 for i in range(0, len(images), batch_size)])
+    image_sec = time.perf_counter() - start
+    start = time.perf_counter()
+    text_vecs = np.concatenate([encoders.text_features(processor(text=chunks[i:i + batch_size], return_tensors="pt",
+                                                                 padding=True, truncation=True, max_length=77))
+                                for i in range(0, len(chunks), batch_size)])
+    text_sec = time.perf_counter() - start
+    return image_vecs, text_vecs, image_sec, text_sec
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and fp32 agreement of the CLIP runtimes")
+    parser.add_argument("--model", default=Config.CLIP_MODEL_ID)
+    parser.add_argument("--runtimes", default=",".join(CLIP_RUNTIMES))
+    parser.add_argument("--pdf", help="take images and text chunks from this PDF")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=Config.EMBED_BATCH_SIZE)
+    args = parser.parse_args()
+
+    images, chunks = load_samples(args.pdf, args.images, args.chunks)
+    _, processor = model_registry.get_clip(args.model)
+    # The accuracy gate would silently swap a diverging runtime for fp32: measure it instead
+    Config.CLIP_MIN_COSINE = -1.0
+
+    reference_encoders = model_registry.get_clip_encoders(args.model, "torch")
+    reference = embed(reference_encoders, processor, images, chunks, args.batch_size)[:2]
+    rows = []
+    for runtime in args.runtimes.split(","):
+        encoders = model_registry.get_clip_encoders(args.model, runtime)
+        if encoders.runtime != runtime:
+            print(f"{runtime}: unavailable, skipped", file=sys.stderr)
+            continue
+        # Untimed pass so one-off costs (allocator, session init) don't skew the timings
+        embed(encoders, processor, images[:2], chunks[:2], args.batch_size)
+        image_vecs, text_vecs, image_sec, text_sec = embed(encoders, processor, images, chunks, args.batch_size)
+        image_cos = (reference[0] * image_vecs).sum(axis=1)
+        text_cos = (reference[1] * text_vecs).sum(axis=1)
+        row = {
+            "runtime": runtime,
+            "images_per_sec": round(len(images) / image_sec, 1),
+            "chunks_per_sec": round(len(chunks) / text_sec, 1),
+            "image_min_cosine": round(float(image_cos.min()), 5),
+            "image_mean_cosine": round(float(image_cos.mean()), 5),
+            "text_min_cosine": round(float(text_cos.min()), 5),
+            "text_mean_cosine": round(float(text_cos.mean()), 5),
+        }
+        rows.append(row)
+        print(json.dumps(row))
+
+    print(json.dumps({"model": args.model, "images": len(images), "chunks": len(chunks),
+                      "batch_size": args.batch_size, "results": rows, "load": model_registry.report()}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import numpy as np
+import faiss
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.vector_index import INDEX_TYPES, base_index, build_index, estimate_bytes_per_vector, index_memory_bytes, index_vectors
+
+logging.basicConfig(level=logging.WARNING)
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def synthetic_vectors(n, dim, clusters, seed=0):
+    """Unit vectors around random topic centres, roughly how document embeddings cluster."""
+    rng = np.random.default_rng(seed)
+    centres = normalize(rng.standard_normal((clusters, dim)).astype(np.float32))
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * 0.08
+    return normalize(centres[rng.integers(0, clusters, n)] + noise).astype(np.float32)
+
+def load_vectors(index_dir):
+    """Vectors of a stored document index (index.faiss must be flat or HNSW)."""
+    return np.asarray(index_vectors(faiss.read_index(os.path.join(index_dir, "index.faiss"))), dtype=np.float32)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k, latency and memory of the FAISS index types")
+    parser.add_argument("--n", type=int, default=100000, help="synthetic vectors")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--index-dir", help="use the vectors of a stored (flat) document index instead")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default=",".join(t for t in INDEX_TYPES if t != "auto"))
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index_dir) if args.index_dir else synthetic_vectors(args.n, args.dim, args.clusters)
+    # Queries: perturbed copies of random corpus vectors
+    rng = np.random.default_rng(1)
+    picks = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = normalize(picks + rng.standard_normal(picks.shape).astype(np.float32) * 0.05).astype(np.float32)
+
+    truth = None
+    rows = []
+    for index_type in ["flat"] + [t for t in args.types.split(",") if t != "flat"]:
+        start = time.perf_counter()
+        index = build_index(vectors, index_type)
+        build_sec = time.perf_counter() - start
+        start = time.perf_counter()
+        _, ids = index.search(queries, args.k)
+        search_sec = time.perf_counter() - start
+        if truth is None:
+            truth = ids
+        recall = np.mean([len(set(found) & set(expected)) / args.k for found, expected in zip(ids, truth)])
+        row = {
+            "type": index_type,
+            "built_as": type(base_index(index)).__name__,
+            "build_sec": round(build_sec, 3),
+            "search_ms_per_query": round(search_sec * 1000 / len(queries), 4),
+            f"recall@{args.k}": round(float(recall), 4),
+            "bytes_per_vector": round(index_memory_bytes(index) / index.ntotal, 1),
+            "estimated_bytes_per_vector": estimate_bytes_per_vector(index),
+        }
+        rows.append(row)
+        print(json.dumps(row))
+
+    print(json.dumps({"vectors": len(vectors), "dim": vectors.shape[1], "queries": len(queries), "k": args.k,
+                      "results": rows}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import json
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.web_fetch import USER_AGENT, fetch_pages, page_text
+
+logging.basicConfig(level=logging.WARNING)
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves /page?delay_ms=..&kb=.. : an article of about kb KiB after delay_ms, like a slow search result."""
+
+    def do_GET(self):
+        query = parse_qs(urlsplit(self.path).query)
+        time.sleep(float(query.get("delay_ms", ["0"])[0]) / 1000)
+        paragraph = "<p>Photosynthesis converts light energy into chemical energy in the chloroplasts.</p>"
+        body = ("<html><head><script>var x = 1;</script></head><body><nav>Home | About</nav><main>"
+                + paragraph * max(1, int(float(query.get("kb", ["20"])[0]) * 1024 / len(paragraph)))
+                + "</main><footer>Footer</footer></body></html>").encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_servers(count):
+    """count stand-in servers on free ports; each port counts as a separate host."""
+    servers = []
+    for _ in range(count):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    return servers
+
+def fetch_serially(urls):
+    """The previous path: one URL at a time, each fetched twice (WebBaseLoader, then requests) on fresh connections."""
+    texts = []
+    for url in urls:
+        for _ in range(2):
+            response = httpx.get(url, headers={"User-Agent": USER_AGENT}, timeout=30)
+        texts.append(page_text(response.content))
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the concurrent web fetch layer against local stand-in servers")
+    parser.add_argument("--urls", type=int, default=8, help="result URLs to fetch")
+    parser.add_argument("--hosts", type=int, default=0, help="stand-in servers (0: one per URL, like search results)")
+    parser.add_argument("--delay-ms", type=float, default=300, help="server latency per request")
+    parser.add_argument("--kb", type=float, default=200, help="page size")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    servers = start_servers(args.hosts or args.urls)
+    urls = [f"http://127.0.0.1:{servers[i % len(servers)].server_address[1]}/page?delay_ms={args.delay_ms:g}&kb={args.kb:g}&n={i}"
+            for i in range(args.urls)]
+
+    rows = []
+    for name, run in (("serial", fetch_serially), ("concurrent", fetch_pages)):
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            results = run(urls)
+            timings.append(time.perf_counter() - start)
+        chars = sum(len(r["text"] if isinstance(r, dict) else r) for r in results)
+        row = {"mode": name, "best_sec": round(min(timings), 3), "mean_sec": round(sum(timings) / len(timings), 3),
+               "text_chars": chars}
+        rows.append(row)
+        print(json.dumps(row))
+
+    for server in servers:
+        server.shutdown()
+    print(json.dumps({"urls": args.urls, "hosts": len(servers), "delay_ms": args.delay_ms, "kb": args.kb,
+                      "speedup": round(rows[0]["best_sec"] / rows[1]["best_sec"], 2), "results": rows}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import re
+import sys
+import math
+import time
+from array import array
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 over text chunks, built incrementally as chunks are ingested.
+    Documents are identified by the caller's integer id (here: the chunk's id in
+    the FAISS index). Postings are compact typed arrays per term.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> (doc positions, term frequencies)
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._doc_len = array("I")
+        self._total_len = 0
+        self._num_docs = 0
+        self.build_ms = 0.0
+
+    def add(self, doc_id: int, text: str):
+        start = time.perf_counter()
+        tokens = tokenize(text)
+        counts: Dict[str, int] = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, tf in counts.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array("I"), array("I"))
+            postings[0].append(doc_id)
+            postings[1].append(tf)
+        # Ids of non-indexed documents (e.g. images) keep a zero length
+        while len(self._doc_len) <= doc_id:
+            self._doc_len.append(0)
+        self._doc_len[doc_id] = len(tokens)
+        self._total_len += len(tokens)
+        self._num_docs += 1
+        self.build_ms += (time.perf_counter() - start) * 1000
+
+    def remove(self, doc_ids):
+        """Drops previously added documents from every posting list (a pass over all postings)."""
+        removed = np.unique(np.asarray(doc_ids, dtype=np.int64))
+        removed = removed[removed < len(self._doc_len)]
+        if not len(removed):
+            return
+        start = time.perf_counter()
+        self._total_len -= int(np.frombuffer(self._doc_len, dtype=np.uint32)[removed].sum())
+        self._num_docs -= len(removed)
+        for token in list(self._postings):
+            docs, tfs = self._postings[token]
+            keep = ~np.isin(np.frombuffer(docs, dtype=np.uint32), removed)
+            if keep.all():
+                continue
+            if not keep.any():
+                del self._postings[token]
+                continue
+            self._postings[token] = (array("I", np.frombuffer(docs, dtype=np.uint32)[keep].tobytes()),
+                                     array("I", np.frombuffer(tfs, dtype=np.uint32)[keep].tobytes()))
+        for doc_id in removed:
+            self._doc_len[int(doc_id)] = 0
+        self.build_ms += (time.perf_counter() - start) * 1000
+
+    def search(self, query: str, k: int, allowed=None) -> List[Tuple[int, float]]:
+        """
+        Top-k (doc id, score) pairs, best first; documents sharing no term are left out.
+        allowed, if given, restricts the results to those doc ids.
+        """
+        if not self._num_docs:
+            return []
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+        norm = self.k1 * (1 - self.b + self.b * doc_len / (self._total_len / self._num_docs))
+        scores = np.zeros(len(doc_len), dtype=np.float32)
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            docs = np.frombuffer(postings[0], dtype=np.uint32)
+            tf = np.frombuffer(postings[1], dtype=np.uint32).astype(np.float32)
+            idf = math.log(1 + (self._num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + norm[docs])
+        if allowed is not None:
+            mask = np.zeros(len(scores), dtype=bool)
+            allowed = np.asarray(allowed, dtype=np.int64)
+            mask[allowed[allowed < len(scores)]] = True
+            scores[~mask] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates])]
+        return [(int(pos), float(scores[pos])) for pos in ranked]
+
+    def memory_bytes(self) -> int:
+        """Approximate size of the postings, term dictionary and length table."""
+        total = sys.getsizeof(self._postings) + sys.getsizeof(self._doc_len)
+        for term, (docs, tfs) in self._postings.items():
+            total += sys.getsizeof(term) + sys.getsizeof(docs) + sys.getsizeof(tfs)
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "docs": self._num_docs,
+            "terms": len(self._postings),
+            "postings": sum(len(docs) for docs, _ in self._postings.values()),
+            "build_ms": round(self.build_ms, 2),
+            "memory_mb": round(self.memory_bytes() / (1024 * 1024), 3),
+        }
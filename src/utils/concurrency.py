@@ -0,0 +1,111 @@
+import queue
+import asyncio
+import functools
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Blocking work is split into stages, each with its own bounded pool, so a burst of
+# PDF parsing can't starve CLIP inference (or the event loop) and vice versa.
+#   ingest - file parsing, OCR, web/YouTube fetching, index store I/O, ingest loops
+#   embed  - CLIP inference (one batch at a time, see call_in_stage) and FAISS search
+#   llm    - concurrent LLM requests (async, not a thread pool)
+STAGE_LIMITS: Dict[str, int] = {
+    "ingest": Config.INGEST_CONCURRENCY,
+    "embed": Config.EMBED_CONCURRENCY,
+    "llm": Config.LLM_CONCURRENCY,
+}
+
+_executors: Dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+def get_executor(stage: str) -> ThreadPoolExecutor:
+    with _executors_lock:
+        executor = _executors.get(stage)
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, STAGE_LIMITS[stage]),
+                thread_name_prefix=f"brainbolt-{stage}"
+            )
+            _executors[stage] = executor
+        return executor
+
+async def run_in_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    """Runs a blocking callable on the stage's bounded thread pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(stage), functools.partial(fn, *args, **kwargs))
+
+def call_in_stage(stage: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Blocking counterpart of run_in_stage for code already on a worker thread:
+    runs fn on the stage's pool and waits, so a stage slot is held only for fn
+    (e.g. one embedding batch, not a whole ingest). On a thread of that stage's
+    pool fn runs inline instead of waiting on its own pool.
+    """
+    if threading.current_thread().name.startswith(f"brainbolt-{stage}_"):
+        return fn(*args, **kwargs)
+    return get_executor(stage).submit(fn, *args, **kwargs).result()
+
+def stage_limit(stage: str) -> asyncio.Semaphore:
+    """Semaphore bounding concurrent async work (e.g. LLM calls) for a stage."""
+    semaphore = _semaphores.get(stage)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(max(1, STAGE_LIMITS[stage]))
+        _semaphores[stage] = semaphore
+    return semaphore
+
+def iter_in_background(iterable, max_buffered: int = 64):
+    """
+    Runs iterable on its own thread and yields its items through a bounded
+    queue, so producing (e.g. PDF parsing) overlaps with consuming (embedding).
+    Exceptions from the producer are re-raised in the consumer.
+
+    Not a stage pool thread: the consumer usually holds an ingest slot already,
+    which bounds the producers too, and a producer queued behind its own
+    consumer on the same pool would never start.
+    """
+    handoff = queue.Queue(maxsize=max(1, max_buffered))
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                handoff.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(("item", item)):
+                    return
+            put(("end", None))
+        except BaseException as e:
+            put(("error", e))
+
+    threading.Thread(target=produce, name="brainbolt-producer", daemon=True).start()
+    try:
+        while True:
+            kind, value = handoff.get()
+            if kind == "item":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+    finally:
+        # Lets the producer exit if the consumer stops early
+        stop.set()
+
+def shutdown_executors():
+    with _executors_lock:
+        for executor in _executors.values():
+            executor.shutdown(wait=False, cancel_futures=True)
+        _executors.clear()
@@ -0,0 +1,113 @@
+import math
+import logging
+from typing import Any, Dict, Optional, Tuple
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# ~4 characters per token for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+# Gemini counts an image as 258 tokens per 768x768 tile; images no larger than
+# 384px on both sides are a single tile
+IMAGE_TILE_TOKENS = 258
+IMAGE_TILE_SIZE = 768
+IMAGE_SMALL_SIZE = 384
+
+def estimate_text_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    if width <= IMAGE_SMALL_SIZE and height <= IMAGE_SMALL_SIZE:
+        return IMAGE_TILE_TOKENS
+    return IMAGE_TILE_TOKENS * math.ceil(width / IMAGE_TILE_SIZE) * math.ceil(height / IMAGE_TILE_SIZE)
+
+def fit_dimensions(width: int, height: int, max_dim: int) -> Tuple[int, int]:
+    """Size after downscaling so the longest side is at most max_dim (never upscales)."""
+    scale = min(1.0, max_dim / max(width, height, 1))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+class ContextBudgeter:
+    """
+    Packs retrieved text chunks and images into a prompt without exceeding an
+    estimated token budget or a request byte budget. Chunks are offered in
+    retrieval order; whatever does not fit is dropped. Images are downscaled to
+    image_max_dim, and further down to a single tile if that is what fits.
+    """
+
+    def __init__(self, max_tokens: int, max_bytes: int = None, max_images: int = None, image_max_dim: int = None):
+        self.max_tokens = max_tokens
+        self.max_bytes = Config.CONTEXT_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_images = max_images
+        self.image_max_dim = image_max_dim or Config.PROMPT_IMAGE_MAX_DIM
+        self.tokens_used = 0
+        self.bytes_used = 0
+        self.text_chunks = 0
+        self.images = 0
+        self.dropped_chunks = 0
+        self.dropped_images = 0
+
+    def _fits(self, tokens: int, size: int) -> bool:
+        return self.tokens_used + tokens <= self.max_tokens and self.bytes_used + size <= self.max_bytes
+
+    def _charge(self, tokens: int, size: int):
+        self.tokens_used += tokens
+        self.bytes_used += size
+
+    def reserve(self, text: str):
+        """Accounts for fixed prompt text (instructions, labels) that is always sent."""
+        self._charge(estimate_text_tokens(text), len(text.encode("utf-8")))
+
+    def fit_text(self, text: str) -> bool:
+        """Accounts for a retrieved chunk; False if it does not fit the remaining budget."""
+        tokens, size = estimate_text_tokens(text), len(text.encode("utf-8"))
+        if not self._fits(tokens, size):
+            self.dropped_chunks += 1
+            return False
+        self._charge(tokens, size)
+        self.text_chunks += 1
+        return True
+
+    def fit_image(self, image_store: Any, image_id: str, label: str = "") -> Optional[str]:
+        """
+        Returns a data URL for the image, downscaled to fit the remaining budget,
+        or None (image dropped) if even a single-tile version does not fit.
+        label is the text sent just before the image; it is charged with the
+        image, so an image that only fits without its label is dropped.
+        """
+        if self.max_images is not None and self.images >= self.max_images:
+            self.dropped_images += 1
+            return None
+
+        try:
+            width, height = image_store.get_size(image_id)
+        except Exception as e:
+            logger.warning(f"Could not read image {image_id}: {e}")
+            self.dropped_images += 1
+            return None
+
+        label_tokens, label_size = estimate_text_tokens(label), len(label.encode("utf-8"))
+        for max_dim in sorted({self.image_max_dim, min(self.image_max_dim, IMAGE_SMALL_SIZE)}, reverse=True):
+            tokens = label_tokens + estimate_image_tokens(*fit_dimensions(width, height, max_dim))
+            if not self._fits(tokens, label_size):
+                continue
+            url = image_store.data_url(image_id, max_dim)
+            if not self._fits(tokens, label_size + len(url)):
+                continue
+            self._charge(tokens, label_size + len(url))
+            self.images += 1
+            return url
+
+        self.dropped_images += 1
+        return None
+
+    def usage(self) -> Dict[str, Any]:
+        return {
+            "tokens_used": self.tokens_used,
+            "max_tokens": self.max_tokens,
+            "bytes_used": self.bytes_used,
+            "max_bytes": self.max_bytes,
+            "text_chunks": self.text_chunks,
+            "images": self.images,
+            "dropped_chunks": self.dropped_chunks,
+            "dropped_images": self.dropped_images,
+        }
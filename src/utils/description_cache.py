@@ -0,0 +1,151 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from config.config import Config
+from src.utils.image_hash import hamming_many
+
+logger = logging.getLogger(__name__)
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+class DescriptionCache:
+    """
+    Image descriptions in a SQLite file, keyed by a digest of the decoded pixels.
+
+    Exact copies are found by digest. A resized or re-encoded copy is found by
+    perceptual hash (within max_distance bits), but only accepted when its CLIP
+    vector also agrees with the stored one (cosine of at least min_cosine):
+    charts and slides built from one template hash alike while showing different
+    content. The hashes are kept in memory for the near-match scan.
+    Beyond max_entries the least recently used descriptions are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int, max_distance: int, min_cosine: float):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        self.min_cosine = min_cosine
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.near_rejected = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        self._digests: List[str] = []
+        self._hashes = np.zeros(0, dtype=np.uint64)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS image_descriptions ("
+                "digest TEXT PRIMARY KEY, phash INTEGER, vector BLOB, label TEXT, description TEXT, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS image_descriptions_last_access ON image_descriptions(last_access)")
+            self._conn = conn
+            self._load_hashes()
+        return self._conn
+
+    def _load_hashes(self):
+        rows = self._conn.execute("SELECT digest, phash FROM image_descriptions").fetchall()
+        self._digests = [row[0] for row in rows]
+        self._hashes = np.array([row[1] for row in rows], dtype=np.int64).view(np.uint64)
+
+    def _hit(self, conn: sqlite3.Connection, digest: str, label: str, description: str) -> Tuple[str, str]:
+        conn.execute("UPDATE image_descriptions SET last_access = ? WHERE digest = ?", (time.time(), digest))
+        conn.commit()
+        return label, description
+
+    def get_exact(self, digest: str) -> Optional[Tuple[str, str]]:
+        """(label, description) of an image with exactly these pixels, or None."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT label, description FROM image_descriptions WHERE digest = ?", (digest,)).fetchone()
+            if row is None:
+                return None
+            self.exact_hits += 1
+            return self._hit(conn, digest, row[0], row[1])
+
+    def get_near(self, image_hash: int, vector: Optional[np.ndarray]) -> Optional[Tuple[str, str]]:
+        """
+        (label, description) of the closest stored image within max_distance bits
+        whose CLIP vector is at least min_cosine from vector, or None. Without a
+        vector there is nothing to confirm a near match with, so it is a miss.
+        """
+        with self._lock:
+            conn = self._connect()
+            if vector is None or not len(self._hashes):
+                self.misses += 1
+                return None
+            distances = hamming_many(self._hashes, image_hash)
+            candidates = [i for i in np.argsort(distances, kind="stable") if distances[i] <= self.max_distance]
+            for i in candidates:
+                digest = self._digests[i]
+                row = conn.execute("SELECT vector, label, description FROM image_descriptions WHERE digest = ?",
+                                   (digest,)).fetchone()
+                if row is None or row[0] is None:
+                    continue
+                if float(np.dot(np.frombuffer(row[0], dtype=np.float32), vector)) >= self.min_cosine:
+                    self.near_hits += 1
+                    return self._hit(conn, digest, row[1], row[2])
+                self.near_rejected += 1
+            self.misses += 1
+            return None
+
+    def put(self, digest: str, image_hash: int, vector: Optional[np.ndarray], label: str, description: str):
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        with self._lock:
+            conn = self._connect()
+            existed = conn.execute("SELECT 1 FROM image_descriptions WHERE digest = ?", (digest,)).fetchone() is not None
+            conn.execute(
+                "INSERT OR REPLACE INTO image_descriptions (digest, phash, vector, label, description, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, _signed(image_hash), blob, label, description, time.time())
+            )
+            count = conn.execute("SELECT COUNT(*) FROM image_descriptions").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM image_descriptions WHERE digest IN "
+                    "(SELECT digest FROM image_descriptions ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                logger.info(f"Evicted {count - self.max_entries} cached image descriptions")
+                self._load_hashes()
+            elif not existed:
+                self._digests.append(digest)
+                self._hashes = np.append(self._hashes, np.uint64(image_hash))
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._connect()
+            entries = len(self._digests)
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "min_cosine": self.min_cosine,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "near_rejected": self.near_rejected,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Global Instance
+description_cache = DescriptionCache(
+    path=Config.IMAGE_DESCRIPTION_CACHE_PATH,
+    max_entries=Config.IMAGE_DESCRIPTION_CACHE_MAX_ENTRIES,
+    max_distance=Config.IMAGE_HASH_MAX_DISTANCE,
+    min_cosine=Config.IMAGE_CACHE_MIN_COSINE,
+)
@@ -0,0 +1,225 @@
+import os
+import re
+import sqlite3
+import hashlib
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+import numpy as np
+from config.config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: SQLite still serializes the index, single-process use only
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+class EmbeddingCache:
+    """
+    Persistent content-addressed embedding cache for one embedding model.
+
+    Layout (one directory per model id):
+        vectors.f32    - memory-mapped float32 matrix, one row per cached vector
+        keys.bin       - memory-mapped sha256 digest of the content stored in each row
+        index.sqlite3  - key -> row map with a logical last-access clock
+        lock           - flock'd around memmap writes, so several workers can share the directory
+
+    The index is written row by row as vectors are added, so there is nothing
+    to rewrite on flush. Once every row is used, the least recently used row
+    is overwritten.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, dim: int, max_entries: int):
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._keys_path = os.path.join(cache_dir, "keys.bin")
+        self._index_path = os.path.join(cache_dir, "index.sqlite3")
+        self._lock_path = os.path.join(cache_dir, "lock")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock_file = open(self._lock_path, "a+b")
+        self._open()
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _open(self):
+        conn = sqlite3.connect(self._index_path, check_same_thread=False, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("CREATE TABLE IF NOT EXISTS rows (key TEXT PRIMARY KEY, row INTEGER UNIQUE, last_access INTEGER)")
+        conn.execute("CREATE INDEX IF NOT EXISTS rows_last_access ON rows(last_access)")
+        self._conn = conn
+
+        shape = {"model_id": self.model_id, "dim": str(self.dim), "max_entries": str(self.max_entries)}
+        with self._file_lock(exclusive=True):
+            stored = dict(conn.execute("SELECT name, value FROM meta").fetchall())
+            # Reuse the files only if they were written for the same shape
+            reuse = (
+                stored == shape
+                and os.path.exists(self._vectors_path)
+                and os.path.exists(self._keys_path)
+            )
+            mode = "r+" if reuse else "w+"
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode=mode, shape=(self.max_entries, self.dim))
+            self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode=mode, shape=(self.max_entries, 32))
+            if not reuse:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("DELETE FROM rows")
+                conn.execute("DELETE FROM meta")
+                conn.executemany("INSERT INTO meta (name, value) VALUES (?, ?)", shape.items())
+                conn.execute("COMMIT")
+
+        legacy_index = os.path.join(self.cache_dir, "index.json")
+        if os.path.exists(legacy_index):
+            os.remove(legacy_index)
+
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def bytes_key(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, int]:
+        rows = {}
+        unique = list(dict.fromkeys(keys))
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(unique), 500):
+            chunk = unique[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows.update(self._conn.execute(f"SELECT key, row FROM rows WHERE key IN ({placeholders})", chunk).fetchall())
+        return rows
+
+    def _allocate_row(self) -> int:
+        conn = self._conn
+        count, top = conn.execute("SELECT COUNT(*), MAX(row) FROM rows").fetchone()
+        if count < self.max_entries:
+            if top is None or top + 1 < self.max_entries:
+                return 0 if top is None else top + 1
+            # A hole left by a row dropped for a digest mismatch
+            return conn.execute(
+                "SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM rows WHERE row = 0) "
+                "UNION ALL SELECT r.row + 1 FROM rows r WHERE r.row + 1 < ? "
+                "AND NOT EXISTS (SELECT 1 FROM rows n WHERE n.row = r.row + 1) LIMIT 1",
+                (self.max_entries,)
+            ).fetchone()[0]
+        key, row = conn.execute("SELECT key, row FROM rows ORDER BY last_access LIMIT 1").fetchone()
+        conn.execute("DELETE FROM rows WHERE key = ?", (key,))
+        self.evictions += 1
+        return row
+
+    def _next_tick(self) -> int:
+        return (self._conn.execute("SELECT MAX(last_access) FROM rows").fetchone()[0] or 0) + 1
+
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Returns the cached vector for each key, or None on a miss."""
+        results = []
+        hit_keys, stale_keys = [], []
+        with self._lock:
+            rows = self._lookup(keys)
+            with self._file_lock(exclusive=False):
+                for key in keys:
+                    row = rows.get(key)
+                    # The digest column guards against an index that disagrees with the memmaps
+                    if row is not None and self._keys[row].tobytes() == bytes.fromhex(key):
+                        results.append(np.array(self._vectors[row]))
+                        hit_keys.append(key)
+                        self.hits += 1
+                    else:
+                        if row is not None:
+                            stale_keys.append(key)
+                        results.append(None)
+                        self.misses += 1
+
+            if hit_keys or stale_keys:
+                self._conn.execute("BEGIN IMMEDIATE")
+                tick = self._next_tick()
+                self._conn.executemany("UPDATE rows SET last_access = ? WHERE key = ?",
+                                       [(tick + i, key) for i, key in enumerate(hit_keys)])
+                self._conn.executemany("DELETE FROM rows WHERE key = ?", [(key,) for key in stale_keys])
+                self._conn.execute("COMMIT")
+        return results
+
+    def put_many(self, keys: List[str], vectors: List[np.ndarray]):
+        with self._lock, self._file_lock(exclusive=True):
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                tick = self._next_tick()
+                for key, vector in zip(keys, vectors):
+                    found = conn.execute("SELECT row FROM rows WHERE key = ?", (key,)).fetchone()
+                    row = found[0] if found else self._allocate_row()
+                    self._vectors[row] = np.asarray(vector, dtype=np.float32)
+                    self._keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                    conn.execute("INSERT OR REPLACE INTO rows (key, row, last_access) VALUES (?, ?, ?)",
+                                 (key, row, tick))
+                    tick += 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def flush(self):
+        """Writes the memory-mapped rows to disk; the index is already persisted by put_many."""
+        with self._lock, self._file_lock(exclusive=True):
+            self._vectors.flush()
+            self._keys.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+def get_embedding_cache(model_id: str, dim: int) -> Optional[EmbeddingCache]:
+    """
+    Returns the process-wide cache for model_id, or None if caching is disabled.
+    The row budget is derived from EMBED_CACHE_MAX_MB.
+    """
+    if not Config.EMBED_CACHE_ENABLED:
+        return None
+
+    with _caches_lock:
+        cache = _caches.get(model_id)
+        if cache is None:
+            safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id)
+            max_entries = (Config.EMBED_CACHE_MAX_MB * 1024 * 1024) // (dim * 4 + 32)
+            try:
+                cache = EmbeddingCache(os.path.join(Config.EMBED_CACHE_DIR, safe_name), model_id, dim, max_entries)
+            except Exception as e:
+                logger.error(f"Failed to open embedding cache for {model_id}: {e}")
+                return None
+            _caches[model_id] = cache
+        return cache
+
+def embedding_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {model_id: cache.stats() for model_id, cache in _caches.items()}
@@ -0,0 +1,40 @@
+import numpy as np
+from PIL import Image
+
+HASH_SIZE = 8
+_DCT_SIZE = 32
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis, so the 2-D transform is M @ X @ M.T."""
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix
+
+_DCT = _dct_matrix(_DCT_SIZE)
+
+def phash(image: Image.Image) -> int:
+    """
+    64-bit perceptual hash: the signs of the lowest 8x8 DCT frequencies of a 32x32
+    grayscale thumbnail relative to their median. Resized, re-encoded or slightly
+    retouched copies of an image land within a few bits of each other.
+    """
+    pixels = np.asarray(image.convert("L").resize((_DCT_SIZE, _DCT_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIZE, :HASH_SIZE].flatten()
+    # The DC term is the mean brightness; leaving it out of the median keeps the bits about structure
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits).view(">u8")[0])
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def hamming_many(hashes: np.ndarray, target: int) -> np.ndarray:
+    """Hamming distance from target to each hash in a uint64 array."""
+    xor = np.ascontiguousarray(hashes, dtype=np.uint64) ^ np.uint64(target)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+def image_entropy(image: Image.Image) -> float:
+    """Shannon entropy (bits) of the grayscale histogram: ~0 for flat fills, up to 8 for noise."""
+    histogram = np.asarray(image.convert("L").histogram(), dtype=np.float64)
+    p = histogram[histogram > 0] / histogram.sum()
+    return float(-(p * np.log2(p)).sum())
@@ -0,0 +1,193 @@
+import io
+import os
+import json
+import mmap
+import base64
+import tempfile
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import Image
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class _BlobFile:
+    """Append-only byte file read back through mmap."""
+
+    def __init__(self, fileobj, writable: bool):
+        self.fileobj = fileobj
+        self.writable = writable
+        self.size = os.fstat(fileobj.fileno()).st_size
+        self._mmap = None
+
+    def append(self, data: bytes) -> int:
+        offset = self.size
+        self.fileobj.seek(offset)
+        self.fileobj.write(data)
+        self.fileobj.flush()
+        self.size += len(data)
+        return offset
+
+    def read(self, offset: int, length: int) -> bytes:
+        # Remap lazily once the file has grown past the current mapping
+        if self._mmap is None or len(self._mmap) < offset + length:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self.fileobj.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset:offset + length]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+        self.fileobj.close()
+
+class ImageStore:
+    """
+    image_id -> original compressed image bytes (as extracted from the PDF or
+    uploaded), instead of re-encoded base64 PNG strings.
+
+    Bytes stay in memory up to memory_limit_bytes; beyond that they are spilled
+    to an mmap-backed temp file. Prompt payloads are produced lazily by data_url()
+    as a downscaled JPEG, only for the images actually sent to the LLM, with a
+    small LRU of encoded results.
+    """
+
+    def __init__(self, memory_limit_bytes: int = None, url_cache_size: int = None):
+        self.memory_limit_bytes = Config.IMAGE_STORE_MEMORY_MB * 1024 * 1024 if memory_limit_bytes is None else memory_limit_bytes
+        self.url_cache_size = Config.IMAGE_URL_CACHE_SIZE if url_cache_size is None else url_cache_size
+        # id -> ("mem", bytes, mime) | ("blob", blob_index, offset, length, mime)
+        self._entries: Dict[str, Tuple] = {}
+        self._memory_bytes = 0
+        self._blobs = []
+        self._spill: Optional[_BlobFile] = None
+        self._urls: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, image_id: str) -> bool:
+        return image_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def add(self, image_id: str, data: bytes, mime: str = None):
+        """Stores the original encoded bytes of an image."""
+        mime = mime or _sniff_mime(data)
+        with self._lock:
+            self._drop(image_id)
+            if self._memory_bytes + len(data) <= self.memory_limit_bytes:
+                self._entries[image_id] = ("mem", data, mime)
+                self._memory_bytes += len(data)
+            else:
+                if self._spill is None:
+                    self._spill = _BlobFile(tempfile.TemporaryFile(prefix="brainbolt-images-"), writable=True)
+                    self._blobs.append(self._spill)
+                offset = self._spill.append(data)
+                self._entries[image_id] = ("blob", self._blobs.index(self._spill), offset, len(data), mime)
+
+    def add_pil(self, image_id: str, image: Image.Image):
+        """Fallback for ingestors that only hand over decoded images: encode once, losslessly."""
+        buffered = io.BytesIO()
+        image.save(buffered, format="PNG")
+        self.add(image_id, buffered.getvalue(), "image/png")
+
+    def remove(self, image_id: str):
+        with self._lock:
+            self._drop(image_id)
+
+    def _drop(self, image_id: str):
+        entry = self._entries.pop(image_id, None)
+        if entry and entry[0] == "mem":
+            self._memory_bytes -= len(entry[1])
+        for key in [key for key in self._urls if key[0] == image_id]:
+            del self._urls[key]
+
+    def get_bytes(self, image_id: str) -> bytes:
+        entry = self._entries[image_id]
+        if entry[0] == "mem":
+            return entry[1]
+        _, blob_index, offset, length, _ = entry
+        with self._lock:
+            return self._blobs[blob_index].read(offset, length)
+
+    def get_image(self, image_id: str) -> Image.Image:
+        return Image.open(io.BytesIO(self.get_bytes(image_id)))
+
+    def get_size(self, image_id: str) -> Tuple[int, int]:
+        """(width, height) of the original image; only the header is decoded."""
+        return self.get_image(image_id).size
+
+    def data_url(self, image_id: str, max_dim: int = None) -> str:
+        """Base64 data URL of the image, downscaled so its longest side is at most max_dim."""
+        max_dim = max_dim or Config.PROMPT_IMAGE_MAX_DIM
+        key = (image_id, max_dim)
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self._urls.move_to_end(key)
+                return url
+
+        image = self.get_image(image_id)
+        image.thumbnail((max_dim, max_dim))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=Config.PROMPT_IMAGE_QUALITY)
+        url = f"data:image/jpeg;base64,{base64.b64encode(buffered.getvalue()).decode()}"
+
+        with self._lock:
+            self._urls[key] = url
+            while len(self._urls) > self.url_cache_size:
+                self._urls.popitem(last=False)
+        return url
+
+    def save(self, path: str):
+        """Writes all images to images.bin plus an images.json offset index."""
+        index = {}
+        with open(os.path.join(path, "images.bin"), "wb") as f:
+            offset = 0
+            for image_id in list(self._entries):
+                data = self.get_bytes(image_id)
+                f.write(data)
+                index[image_id] = [offset, len(data), self._entries[image_id][-1]]
+                offset += len(data)
+        with open(os.path.join(path, "images.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f)
+
+    @classmethod
+    def load(cls, path: str) -> "ImageStore":
+        """Opens a saved store; image bytes are memory-mapped rather than read in."""
+        store = cls()
+        with open(os.path.join(path, "images.json"), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index:
+            store._blobs.append(_BlobFile(open(os.path.join(path, "images.bin"), "rb"), writable=False))
+            for image_id, (offset, length, mime) in index.items():
+                store._entries[image_id] = ("blob", 0, offset, length, mime)
+        return store
+
+    def close(self):
+        for blob in self._blobs:
+            blob.close()
+        self._blobs = []
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "images": len(self._entries),
+            "memory_mb": round(self._memory_bytes / (1024 * 1024), 2),
+            "spilled_mb": round(sum(blob.size for blob in self._blobs) / (1024 * 1024), 2),
+            "cached_urls": len(self._urls),
+        }
+
+def _sniff_mime(data: bytes) -> str:
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
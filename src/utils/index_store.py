@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, Optional
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk layout or chunking changes so stale indexes are not reused
+INDEX_FORMAT_VERSION = "5"
+
+class DocumentIndexStore:
+    """
+    Disk store of ingested documents (FAISS index + docstore + images), keyed by
+    source fingerprint, so a repeat request for the same source skips ingestion.
+    Entries expire after a TTL, and the least recently used entries are evicted
+    once the store grows past its size budget.
+    """
+
+    def __init__(self, root_dir: str, ttl_sec: float, max_bytes: int):
+        self.root_dir = root_dir
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(source: str, model_key: str) -> str:
+        """
+        Local files are keyed by content, URLs and search queries by the string itself.
+        model_key identifies the embedding models (MultiModalRAGProcessor.index_key).
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{INDEX_FORMAT_VERSION}|{model_key}|".encode("utf-8"))
+        if os.path.isfile(source):
+            with open(source, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+        else:
+            digest.update(source.strip().encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_dir(self, fingerprint: str) -> str:
+        return os.path.join(self.root_dir, fingerprint)
+
+    def _read_meta(self, entry_dir: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(entry_dir, "meta.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_meta(self, entry_dir: str, meta: Dict[str, Any]):
+        tmp_path = os.path.join(entry_dir, "meta.json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(entry_dir, "meta.json"))
+
+    def load(self, fingerprint: str, rag_processor: Any) -> bool:
+        """Restores a stored index into rag_processor. Returns False on a miss."""
+        entry_dir = self._entry_dir(fingerprint)
+        with self._lock:
+            meta = self._read_meta(entry_dir)
+            if meta is None:
+                return False
+            if time.time() - meta.get("created", 0) > self.ttl_sec:
+                logger.info(f"Stored index {fingerprint[:12]} expired")
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return False
+            meta["last_access"] = time.time()
+            self._write_meta(entry_dir, meta)
+
+        try:
+            rag_processor.load_index(entry_dir)
+        except Exception as e:
+            logger.warning(f"Failed to load stored index {fingerprint[:12]}, re-ingesting: {e}")
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            return False
+
+        logger.info(f"Reusing stored index {fingerprint[:12]} ({meta.get('source')})")
+        return True
+
+    def save(self, fingerprint: str, rag_processor: Any, source: str = ""):
+        if not rag_processor.has_index:
+            return
+
+        entry_dir = self._entry_dir(fingerprint)
+        # Write into a scratch dir first so readers never see a half-written entry
+        tmp_dir = f"{entry_dir}.tmp{threading.get_ident()}"
+        try:
+            # Created here rather than at import, so importing the module touches no disk
+            os.makedirs(self.root_dir, exist_ok=True)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            rag_processor.save_index(tmp_dir)
+            now = time.time()
+            meta = {
+                "source": source,
+                "created": now,
+                "last_access": now,
+                "size_bytes": _dir_size(tmp_dir),
+            }
+            self._write_meta(tmp_dir, meta)
+            with self._lock:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to store index for {source}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _evict(self):
+        """Drops expired entries, then least recently used ones until under max_bytes."""
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.root_dir):
+            entry_dir = os.path.join(self.root_dir, name)
+            if not os.path.isdir(entry_dir) or ".tmp" in name:
+                continue
+            meta = self._read_meta(entry_dir)
+            if meta is None or now - meta.get("created", 0) > self.ttl_sec:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+            entries.append((meta.get("last_access", 0), meta.get("size_bytes", 0), entry_dir))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Evicting stored index {os.path.basename(entry_dir)[:12]}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        entries = [name for name in os.listdir(self.root_dir) if ".tmp" not in name] if os.path.isdir(self.root_dir) else []
+        return {
+            "entries": len(entries),
+            "size_mb": round(_dir_size(self.root_dir) / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+        }
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
+
+# Global Instance
+index_store = DocumentIndexStore(
+    root_dir=Config.INDEX_STORE_DIR,
+    ttl_sec=Config.INDEX_STORE_TTL_HOURS * 3600,
+    max_bytes=Config.INDEX_STORE_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,183 @@
+import time
+import uuid
+import asyncio
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job's pipeline when the job was cancelled.
+    Derives from BaseException (like asyncio.CancelledError) so the broad
+    `except Exception` blocks in ingestors don't swallow it.
+    """
+
+class JobQueueFull(Exception):
+    pass
+
+class Job:
+    """A background processing request and its per-stage progress."""
+
+    def __init__(self, request: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.request = request
+        self.status = "queued"  # queued | running | completed | failed | cancelled
+        self.stage: Optional[str] = None
+        self.progress: Dict[str, Dict[str, Any]] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        # Bumped on every change so pollers / SSE streams can tell when to push
+        self.version = 0
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed", "cancelled")
+
+    def update(self, stage: str, **counters):
+        """Records progress for a stage. Safe to call from worker threads; raises JobCancelled once cancelled."""
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.stage = stage
+            self.progress.setdefault(stage, {}).update(counters)
+            self.version += 1
+
+    def reporter(self, stage: str):
+        """A progress_callback(**counters) bound to one stage."""
+        return lambda **counters: self.update(stage, **counters)
+
+    def _set_status(self, status: str, result: Any = None, error: Optional[str] = None):
+        with self._lock:
+            self.status = status
+            if status == "running":
+                self.started = time.time()
+            if status in ("completed", "failed", "cancelled"):
+                self.finished = time.time()
+            self.result = result
+            self.error = error
+            self.version += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": {stage: dict(counters) for stage, counters in self.progress.items()},
+                "result": self.result,
+                "error": self.error,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "version": self.version,
+            }
+
+class JobManager:
+    """
+    In-process job queue: a bounded asyncio queue drained by a fixed number of
+    worker tasks on the API's event loop. No external broker is needed; jobs do
+    not survive a restart.
+    """
+
+    def __init__(self, max_queue: int, workers: int, retention_sec: float):
+        self.max_queue = max(1, max_queue)
+        self.num_workers = max(1, workers)
+        self.retention_sec = retention_sec
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._runner: Optional[Callable[[Job], Awaitable[Any]]] = None
+
+    async def start(self, runner: Callable[[Job], Awaitable[Any]]):
+        """Starts the workers. runner(job) performs the work and returns the job result."""
+        self._runner = runner
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+        logger.info(f"Job manager started with {self.num_workers} workers (queue size {self.max_queue})")
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, request: Dict[str, Any]) -> Job:
+        """Queues a job. Raises JobQueueFull when the queue is at capacity (backpressure)."""
+        if self._queue is None:
+            raise RuntimeError("Job manager is not running")
+        self._prune()
+        job = Job(request)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFull(f"Job queue is full ({self.max_queue} pending)")
+        self._jobs[job.job_id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return job
+        job._cancelled.set()
+        if job.status == "queued":
+            # Workers skip it when it reaches the front of the queue
+            job._set_status("cancelled")
+        elif job._task is not None:
+            # Interrupts awaits; blocking stage work stops at its next progress report
+            job._task.cancel()
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": self.num_workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "jobs": counts,
+        }
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job._cancelled.is_set():
+                    continue
+                job._set_status("running")
+                job._task = asyncio.create_task(self._runner(job))
+                try:
+                    result = await job._task
+                    job._set_status("completed", result=result)
+                except (asyncio.CancelledError, JobCancelled):
+                    if not job._cancelled.is_set():
+                        # The worker itself is being shut down
+                        job._set_status("cancelled")
+                        raise
+                    job._set_status("cancelled")
+                except Exception as e:
+                    logger.error(f"Job {job.job_id} failed: {e}")
+                    detail = getattr(e, "detail", None) or str(e)
+                    job._set_status("failed", error=detail)
+                finally:
+                    job._task = None
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        """Forgets finished jobs older than the retention window."""
+        cutoff = time.time() - self.retention_sec
+        for job_id in [jid for jid, job in self._jobs.items() if job.done and (job.finished or 0) < cutoff]:
+            del self._jobs[job_id]
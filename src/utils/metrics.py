@@ -19,7 +19,14 @@ class MetricsManager:
         # Store last 50 requests
         self.history: deque = deque(maxlen=50)
         self.current_trace: Dict[str, Any] = {}
+        # Traces in flight, by id, so concurrent (streaming) requests don't overwrite each other
+        self.active_traces: Dict[str, Dict[str, Any]] = {}
     
+    def _trace(self, trace_id: str = None) -> Dict[str, Any]:
+        if trace_id is not None:
+            return self.active_traces.get(trace_id, {})
+        return self.current_trace
+
     def start_trace(self, trace_id: str, task: str):
         self.current_trace = {
             "id": trace_id,
@@ -32,45 +39,72 @@ class MetricsManager:
             "output_tokens": 0,
             "throughput": 0
         }
+        self.active_traces[trace_id] = self.current_trace
         
-    def log_retrieval(self, duration_sec: float):
-        if self.current_trace:
-            self.current_trace["retrieval_ms"] = round(duration_sec * 1000, 2)
+    def log_retrieval(self, duration_sec: float, trace_id: str = None):
+        trace = self._trace(trace_id)
+        if trace:
+            trace["retrieval_ms"] = round(duration_sec * 1000, 2)
             
-    def log_llm_metrics(self, ttft_sec: float, gen_sec: float, tokens: int):
-        if self.current_trace:
-            self.current_trace["ttft_ms"] = round(ttft_sec * 1000, 2)
-            self.current_trace["generation_ms"] = round(gen_sec * 1000, 2)
-            self.current_trace["output_tokens"] = tokens
+    def log_context(self, usage: Dict[str, Any], trace_id: str = None):
+        """Records the prompt's context budget usage (see src/utils/context_budget.py)."""
+        trace = self._trace(trace_id)
+        if trace and usage:
+            trace["context"] = usage
+
+    def log_cache_hit(self, cached: bool, trace_id: str = None):
+        """Records whether the answer was served from a cache instead of the LLM."""
+        trace = self._trace(trace_id)
+        if trace:
+            trace["cached"] = cached
+
+    def log_llm_metrics(self, ttft_sec: float, gen_sec: float, tokens: int, trace_id: str = None):
+        trace = self._trace(trace_id)
+        if trace:
+            trace["ttft_ms"] = round(ttft_sec * 1000, 2)
+            trace["generation_ms"] = round(gen_sec * 1000, 2)
+            trace["output_tokens"] = tokens
             if gen_sec > 0:
-                self.current_trace["throughput"] = round(tokens / gen_sec, 2)
+                trace["throughput"] = round(tokens / gen_sec, 2)
                 
-    def end_trace(self):
-        if self.current_trace:
+    def end_trace(self, trace_id: str = None) -> Dict:
+        trace = self._trace(trace_id)
+        if trace:
             end_time = time.perf_counter()
-            start_time = self.current_trace.get("start_time", end_time)
-            self.current_trace["total_ms"] = round((end_time - start_time) * 1000, 2)
+            start_time = trace.get("start_time", end_time)
+            trace["total_ms"] = round((end_time - start_time) * 1000, 2)
             
             # Add to history
-            self.history.append(self.current_trace.copy())
+            completed = trace.copy()
+            self.history.append(completed)
             
             # LOG TO TERMINAL FOR ADMIN VISIBILITY
             log_msg = (
-                 f"\n[PERFROMANCE METRICS] Task: {self.current_trace.get('task')}\n"
-                 f"  - Latency   : {self.current_trace.get('total_ms')} ms\n"
-                 f"  - TTFT      : {self.current_trace.get('ttft_ms')} ms\n"
-                 f"  - Retrieval : {self.current_trace.get('retrieval_ms')} ms\n"
-                 f"  - Throughput: {self.current_trace.get('throughput')} T/s\n"
+                 f"\n[PERFROMANCE METRICS] Task: {trace.get('task')}\n"
+                 f"  - Latency   : {trace.get('total_ms')} ms\n"
+                 f"  - TTFT      : {trace.get('ttft_ms')} ms\n"
+                 f"  - Retrieval : {trace.get('retrieval_ms')} ms\n"
+                 f"  - Throughput: {trace.get('throughput')} T/s\n"
             )
             print(log_msg) # Print to stdout
-            logger.info(f"Trace completed: {self.current_trace}")
-            self.current_trace = {} # Reset
+            logger.info(f"Trace completed: {trace}")
+            self.active_traces.pop(trace.get("id"), None)
+            if trace is self.current_trace:
+                self.current_trace = {} # Reset
+            return completed
+        return {}
             
     def get_latest_metrics(self) -> Dict:
         if len(self.history) > 0:
             return self.history[-1]
         return {}
         
+    def get_trace(self, trace_id: str) -> Dict:
+        for trace in reversed(self.history):
+            if trace.get("id") == trace_id:
+                return trace
+        return {}
+
     def get_history(self) -> List[Dict]:
         return list(self.history)
 
@@ -0,0 +1,92 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Any, Dict
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class OCRCache:
+    """
+    OCR text of scanned PDF pages in a SQLite file, keyed by (file hash, page, DPI),
+    so re-ingesting the same scan skips both rasterizing and OCR. Beyond max_entries
+    the least recently used pages are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "file_hash TEXT, page INTEGER, dpi INTEGER, text TEXT, last_access REAL, "
+                "PRIMARY KEY (file_hash, page, dpi))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def get_pages(self, file_hash: str, dpi: int) -> Dict[int, str]:
+        """page -> OCR text for every cached page of one file at one DPI."""
+        with self._lock:
+            conn = self._connect()
+            rows = conn.execute("SELECT page, text FROM pages WHERE file_hash = ? AND dpi = ?", (file_hash, dpi)).fetchall()
+            if rows:
+                conn.execute("UPDATE pages SET last_access = ? WHERE file_hash = ? AND dpi = ?", (time.time(), file_hash, dpi))
+                conn.commit()
+        return {page: text for page, text in rows}
+
+    def record(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def put(self, file_hash: str, page: int, dpi: int, text: str):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages (file_hash, page, dpi, text, last_access) VALUES (?, ?, ?, ?, ?)",
+                (file_hash, page, dpi, text, time.time())
+            )
+            count = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM pages WHERE rowid IN (SELECT rowid FROM pages ORDER BY last_access LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+                logger.info(f"Evicted {count - self.max_entries} cached OCR pages")
+            conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._connect().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Global Instance
+ocr_cache = OCRCache(path=Config.OCR_CACHE_PATH, max_entries=Config.OCR_CACHE_MAX_ENTRIES)
@@ -0,0 +1,335 @@
+import io
+import os
+import time
+import atexit
+import threading
+import logging
+import multiprocessing
+from multiprocessing.connection import wait
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# A worker that dies this many times in a row before loading its model is not restarted again
+MAX_START_FAILURES = 3
+
+class OCRError(RuntimeError):
+    """OCR failed for an image, or the pool cannot run OCR at all."""
+
+class OCRTimeout(OCRError, TimeoutError):
+    """An image took longer than the per-image timeout; its worker was restarted."""
+
+class _Worker:
+    def __init__(self, slot: int, process: Any, tasks: Any, results: Any):
+        self.slot = slot
+        self.process = process
+        self.tasks = tasks
+        # Read end of this worker's own result pipe; None once the worker has closed it
+        self.results = results
+        self.ready = False
+        # (task_id, future, dispatch time) of the image being processed
+        self.task: Optional[Tuple[int, Future, float]] = None
+        self.start_failures = 0
+
+class OCRWorkerPool:
+    """
+    Long-lived PaddleOCR worker processes, each holding one warmed model, fed
+    images through a per-worker queue; each worker answers on its own pipe. The
+    pool starts on first use.
+
+    Images are dispatched to idle workers one at a time, so a worker that times
+    out or crashes only takes its current image with it: it is killed, that
+    image's future fails, and a fresh worker takes its slot. A worker killed in
+    the middle of writing a result can only leave its own pipe half-written,
+    and that pipe is discarded with it. Running PaddleOCR
+    out of process also keeps its dependencies away from LangChain's.
+    """
+
+    def __init__(self, workers: int, timeout_sec: float, lang: str = "en", use_angle_cls: bool = False,
+                 threads_per_worker: int = 0):
+        self.num_workers = max(1, workers)
+        self.timeout_sec = timeout_sec
+        self.lang = lang
+        self.use_angle_cls = use_angle_cls
+        # Without a cap every worker's inference would try to use every core
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        # spawn, not fork: the parent process has torch and thread pools running
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._pending: Deque[Tuple[int, Any, Future]] = deque()
+        self._monitor = None
+        self._closed = False
+        self._broken: Optional[str] = None
+        self._next_task = 0
+        self._counts = {"completed": 0, "failed": 0, "timeouts": 0, "restarts": 0}
+        self._ocr_ms = 0.0
+
+    def start(self):
+        """Spawns the workers now instead of on the first image (e.g. at API startup)."""
+        with self._lock:
+            self._check_usable()
+            self._ensure_started()
+
+    def submit(self, image: Union[str, bytes, Any]) -> Future:
+        """
+        Queues one image (file path, encoded bytes or PIL image). The future
+        resolves to the recognised text, or raises OCRError / OCRTimeout.
+        """
+        payload = _payload(image)
+        future = Future()
+        with self._lock:
+            self._check_usable()
+            self._ensure_started()
+            self._pending.append((self._next_task, payload, future))
+            self._next_task += 1
+            self._dispatch()
+        return future
+
+    def submit_batch(self, images: List[Any]) -> List[Future]:
+        return [self.submit(image) for image in images]
+
+    def ocr(self, image: Union[str, bytes, Any]) -> str:
+        """Blocking OCR of one image."""
+        return self.submit(image).result()
+
+    def ocr_batch(self, images: List[Any]) -> List[Optional[str]]:
+        """Blocking OCR of several images in parallel; None where an image failed or timed out."""
+        texts = []
+        for future in self.submit_batch(images):
+            try:
+                texts.append(future.result())
+            except OCRError as e:
+                logger.warning(f"OCR failed for one image of the batch: {e}")
+                texts.append(None)
+        return texts
+
+    def _check_usable(self):
+        if self._closed:
+            raise OCRError("OCR pool is closed")
+        if self._broken:
+            raise OCRError(f"OCR is unavailable: {self._broken}")
+
+    def _ensure_started(self):
+        if self._workers:
+            return
+        self._workers = [self._spawn(slot) for slot in range(self.num_workers)]
+        self._monitor = threading.Thread(target=self._run_monitor, name="brainbolt-ocr-monitor", daemon=True)
+        self._monitor.start()
+        logger.info(f"Started {self.num_workers} OCR worker(s), {self.threads_per_worker} thread(s) each")
+
+    def _spawn(self, slot: int) -> _Worker:
+        tasks = self._ctx.Queue()
+        results, results_writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(slot, tasks, results_writer, self.lang, self.use_angle_cls, self.threads_per_worker),
+            name=f"brainbolt-ocr-{slot}",
+            daemon=True,
+        )
+        process.start()
+        # Only the worker holds the write end, so its exit shows up as EOF on the read end
+        results_writer.close()
+        return _Worker(slot, process, tasks, results)
+
+    def _dispatch(self):
+        """Hands pending images to idle workers (called with the lock held)."""
+        for worker in self._workers:
+            while worker.ready and worker.task is None and self._pending:
+                task_id, payload, future = self._pending.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                worker.task = (task_id, future, time.monotonic())
+                worker.tasks.put((task_id, payload))
+
+    def _run_monitor(self):
+        """Collects results, enforces timeouts and replaces dead workers."""
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                # Pipes are only closed on this thread, so they can be waited on outside the lock
+                pipes = {worker.results: worker for worker in self._workers if worker.results is not None}
+            try:
+                readable = wait(list(pipes), timeout=0.2)
+            except OSError:
+                readable = []
+            with self._lock:
+                if self._closed:
+                    return
+                for pipe in readable:
+                    self._receive(pipes[pipe])
+                self._check_workers()
+                self._dispatch()
+
+    def _receive(self, worker: _Worker):
+        if self._workers[worker.slot] is not worker:
+            return
+        try:
+            while worker.results.poll():
+                self._handle(worker, worker.results.recv())
+        except (EOFError, OSError):
+            # The worker exited (or was killed mid-write); _check_workers replaces it
+            worker.results.close()
+            worker.results = None
+
+    def _handle(self, worker: _Worker, message: Tuple):
+        kind = message[0]
+        if kind == "ready":
+            if message[2] != worker.process.pid:
+                return
+            worker.ready = True
+            worker.start_failures = 0
+        elif kind == "init_error":
+            self._fail_all(f"PaddleOCR could not be loaded: {message[2]}")
+        elif worker.task is not None and worker.task[0] == message[2]:
+            _, future, _ = worker.task
+            worker.task = None
+            if kind == "done":
+                self._counts["completed"] += 1
+                self._ocr_ms += message[4]
+                future.set_result(message[3])
+            else:
+                self._counts["failed"] += 1
+                future.set_exception(OCRError(message[3]))
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self._workers:
+            if self._broken:
+                return
+            if worker.task is not None and now - worker.task[2] > self.timeout_sec:
+                worker.process.kill()
+                self._counts["timeouts"] += 1
+                self._restart(worker, OCRTimeout(f"OCR took longer than {self.timeout_sec:g}s"))
+            elif not worker.process.is_alive():
+                self._restart(worker, OCRError(f"OCR worker exited with code {worker.process.exitcode}"))
+
+    def _restart(self, worker: _Worker, error: Exception):
+        if worker.task is not None:
+            self._counts["failed"] += 1
+            worker.task[1].set_exception(error)
+            worker.task = None
+        if not worker.ready:
+            worker.start_failures += 1
+            if worker.start_failures >= MAX_START_FAILURES:
+                self._fail_all(f"OCR worker failed to start {MAX_START_FAILURES} times: {error}")
+                return
+        logger.warning(f"Restarting OCR worker {worker.slot}: {error}")
+        worker.process.join(timeout=1)
+        worker.tasks.close()
+        if worker.results is not None:
+            worker.results.close()
+        replacement = self._spawn(worker.slot)
+        replacement.start_failures = worker.start_failures
+        self._workers[worker.slot] = replacement
+        self._counts["restarts"] += 1
+
+    def _fail_all(self, reason: str):
+        """Marks the pool unusable (e.g. PaddleOCR is not installed) and fails every queued image."""
+        if self._broken:
+            return
+        logger.error(reason)
+        self._broken = reason
+        for worker in self._workers:
+            if worker.task is not None:
+                worker.task[1].set_exception(OCRError(reason))
+                worker.task = None
+        while self._pending:
+            _, _, future = self._pending.popleft()
+            if future.set_running_or_notify_cancel():
+                future.set_exception(OCRError(reason))
+
+    def close(self):
+        """Stops the workers; queued images fail with OCRError."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers, self._workers = self._workers, []
+            pending, self._pending = self._pending, deque()
+        for worker in workers:
+            if worker.task is not None:
+                worker.task[1].set_exception(OCRError("OCR pool is closed"))
+            try:
+                worker.tasks.put(None)
+            except (ValueError, OSError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+        for _, _, future in pending:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(OCRError("OCR pool is closed"))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._counts["completed"]
+            return {
+                "workers": len(self._workers),
+                "ready": sum(worker.ready for worker in self._workers),
+                "busy": sum(worker.task is not None for worker in self._workers),
+                "queued": len(self._pending),
+                **self._counts,
+                "avg_ocr_ms": round(self._ocr_ms / completed, 2) if completed else 0.0,
+                "unavailable": self._broken,
+            }
+
+def _payload(image: Any) -> Union[str, bytes]:
+    """Paths and encoded bytes are sent as is; PIL images are encoded losslessly."""
+    if isinstance(image, (str, bytes)):
+        return image
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def _decode(payload: Union[str, bytes]):
+    """BGR uint8 array, the layout PaddleOCR expects for in-memory images."""
+    import numpy as np
+    from PIL import Image
+
+    image = Image.open(payload if isinstance(payload, str) else io.BytesIO(payload)).convert("RGB")
+    return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+def _worker_main(slot: int, tasks: Any, results: Any, lang: str, use_angle_cls: bool, threads: int):
+    """Worker process: loads PaddleOCR once, then runs OCR for each task until it receives None."""
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    logging.getLogger("ppocr").setLevel(logging.ERROR)
+    try:
+        import numpy as np
+        from paddleocr import PaddleOCR
+
+        ocr = PaddleOCR(use_angle_cls=use_angle_cls, lang=lang, show_log=False)
+        # The first inference initialises the predictors; do it before taking real work
+        ocr.ocr(np.full((32, 128, 3), 255, dtype=np.uint8), cls=use_angle_cls)
+    except Exception as e:
+        results.send(("init_error", slot, f"{type(e).__name__}: {e}"))
+        return
+    results.send(("ready", slot, os.getpid()))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, payload = task
+        start = time.perf_counter()
+        try:
+            result = ocr.ocr(_decode(payload), cls=use_angle_cls)
+            lines = [line[1][0] for line in result[0]] if result and result[0] else []
+            results.send(("done", slot, task_id, " ".join(lines), (time.perf_counter() - start) * 1000))
+        except Exception as e:
+            results.send(("error", slot, task_id, f"{type(e).__name__}: {e}"))
+
+# Global Instance
+ocr_pool = OCRWorkerPool(
+    workers=Config.OCR_WORKERS,
+    timeout_sec=Config.OCR_TIMEOUT_SEC,
+    lang=Config.OCR_LANG,
+    threads_per_worker=Config.OCR_THREADS_PER_WORKER,
+)
+atexit.register(ocr_pool.close)
@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+from typing import Any, Dict, List, Optional
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+def response_key(model_name: str, temperature: float, messages: List[Any]) -> str:
+    """
+    Cache key for an LLM call: model, temperature and the full prompt. Image parts
+    are represented by a hash of their payload, so the same retrieved images give
+    the same key without the key material holding megabytes of base64.
+    """
+    parts = []
+    for message in messages:
+        content = message.content if isinstance(message.content, list) else [message.content]
+        for part in content:
+            if isinstance(part, dict) and part.get("type") == "image_url":
+                url = part["image_url"]["url"] if isinstance(part["image_url"], dict) else part["image_url"]
+                parts.append(["image", hashlib.sha256(url.encode("utf-8")).hexdigest()])
+            elif isinstance(part, dict):
+                parts.append([part.get("type", "text"), part.get("text", "")])
+            else:
+                parts.append(["text", str(part)])
+    payload = json.dumps([model_name, temperature, parts], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Exact-match cache of LLM responses in a SQLite file. Entries expire after
+    ttl_sec; beyond max_entries or max_bytes the least recently used are evicted.
+    """
+
+    def __init__(self, path: str, ttl_sec: float, max_entries: int, max_bytes: int):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER, "
+                "created REAL, last_access REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+            self._conn = conn
+        return self._conn
+
+    def lookup(self, model_name: str, temperature: float, messages: List[Any]):
+        """Returns (key, cached response or None) for an LLM call."""
+        key = response_key(model_name, temperature, messages)
+        return key, self.get(key)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_sec:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.commit()
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, model_name: str, response: Any):
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model_name, data, len(data.encode("utf-8")), now, now)
+            )
+            self._evict(conn, now)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drops expired entries, then least recently used ones until within limits."""
+        conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_sec,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+        logger.info(f"Evicted {evicted} cached responses")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": count,
+            "size_mb": round(total / (1024 * 1024), 2),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+# Global Instance
+response_cache = ResponseCache(
+    path=Config.RESPONSE_CACHE_PATH,
+    ttl_sec=Config.RESPONSE_CACHE_TTL_HOURS * 3600,
+    max_entries=Config.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=Config.RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+)
@@ -0,0 +1,105 @@
+import re
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+import numpy as np
+import faiss
+
+logger = logging.getLogger(__name__)
+
+# Words that flip or narrow a question's meaning while barely moving its embedding
+_NEGATIONS = {"no", "not", "never", "none", "nor", "neither", "without", "cannot"}
+_NUMBER_WORDS = {"zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+                 "first", "second", "third", "last", "before", "after", "more", "less", "most", "least"}
+
+def guard_terms(question: str) -> frozenset:
+    """
+    The numbers, negations and ordering words of a question. Two questions are
+    only considered the same when these match exactly: "what causes X" and
+    "what does not cause X", or "step 3" and "step 4", embed almost identically.
+    """
+    words = re.findall(r"[a-z]+(?:'[a-z]+)?|\d+(?:[.,]\d+)*", question.lower())
+    terms = set()
+    for word in words:
+        if word[0].isdigit() or word in _NUMBER_WORDS:
+            terms.add(word)
+        elif word in _NEGATIONS or word.endswith("n't"):
+            terms.add("not")
+    return frozenset(terms)
+
+class SemanticQueryCache:
+    """
+    Per-document cache of answered questions. A new question reuses an earlier
+    answer when its query embedding has cosine similarity >= threshold with the
+    earlier question's, both have the same guard_terms (numbers, negations), AND
+    retrieval returned the same set of chunks, so the answer was produced from
+    identical context.
+
+    Query vectors live in a small flat inner-product FAISS index (embeddings are
+    L2-normalised, so inner product is cosine). The least recently used entry
+    is evicted beyond max_entries.
+    """
+
+    # Neighbours checked per lookup; a near match with different context may shadow a good one
+    SEARCH_K = 4
+
+    def __init__(self, dim: int, threshold: float, max_entries: int):
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        # entry id -> (doc id set, guard terms, answer), in least-recently-used order
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self._next_id = 0
+
+    def lookup(self, query_emb: np.ndarray, doc_ids: Iterable[str], question: str) -> Optional[str]:
+        doc_ids = frozenset(doc_ids)
+        terms = guard_terms(question)
+        query = np.asarray(query_emb, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            if self._entries:
+                scores, ids = self._index.search(query, min(self.SEARCH_K, len(self._entries)))
+                for score, entry_id in zip(scores[0], ids[0]):
+                    if entry_id < 0 or score < self.threshold:
+                        break
+                    cached_ids, cached_terms, answer = self._entries[int(entry_id)]
+                    if cached_ids == doc_ids and cached_terms == terms:
+                        self._entries.move_to_end(int(entry_id))
+                        self.hits += 1
+                        return answer
+            self.misses += 1
+            return None
+
+    def add(self, query_emb: np.ndarray, doc_ids: Iterable[str], question: str, answer: str):
+        query = np.asarray(query_emb, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(query, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (frozenset(doc_ids), guard_terms(question), answer)
+            while len(self._entries) > self.max_entries:
+                evicted_id, _ = self._entries.popitem(last=False)
+                self._index.remove_ids(np.array([evicted_id], dtype=np.int64))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._index.reset()
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
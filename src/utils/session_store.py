@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import shutil
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class DocumentSession:
+    """An ingested document held in memory, ready for repeated summaries, quizzes and questions."""
+
+    def __init__(self, document_id: str, source_path: str, model_name: str, rag_processor: Any):
+        self.document_id = document_id
+        self.source_path = source_path
+        self.model_name = model_name
+        self.rag_processor = rag_processor
+        self.created = time.time()
+        self.last_access = self.created
+
+    @property
+    def key(self) -> str:
+        return self.document_id
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "document_id": self.document_id,
+            "source_path": self.source_path,
+            "model_name": self.model_name,
+            "chunks": sum(1 for doc in self.rag_processor.all_docs if doc.metadata.get("type") == "text"),
+            "images": len(self.rag_processor.image_data_store or {}),
+            "vector_index": self.rag_processor.index_stats() if hasattr(self.rag_processor, "index_stats") else None,
+            "lexical_index": self.rag_processor.lexical_index.stats() if getattr(self.rag_processor, "lexical_index", None) else None,
+            "query_cache": self.rag_processor.query_cache.stats() if getattr(self.rag_processor, "query_cache", None) else None,
+            "created": self.created,
+            "last_access": self.last_access,
+        }
+
+class CollectionSession:
+    """
+    Several sources (PDFs, videos, web pages) indexed into one processor, so
+    summaries, quizzes and questions can span all of them or a chosen subset.
+    sources maps each source id to the path or URL it was ingested from.
+    """
+
+    def __init__(self, collection_id: str, name: str, model_name: str, rag_processor: Any, sources: Dict[str, str] = None):
+        self.collection_id = collection_id
+        self.name = name
+        self.model_name = model_name
+        self.rag_processor = rag_processor
+        self.sources = dict(sources or {})
+        self.created = time.time()
+        self.last_access = self.created
+        # Serializes saves of this collection
+        self.lock = threading.Lock()
+
+    @property
+    def key(self) -> str:
+        return self.collection_id
+
+    def describe(self) -> Dict[str, Any]:
+        counts = self.rag_processor.sources()
+        return {
+            "collection_id": self.collection_id,
+            "name": self.name,
+            "model_name": self.model_name,
+            "sources": [{"source_id": source_id, "source_path": path, **counts.get(source_id, {"chunks": 0, "images": 0})}
+                        for source_id, path in self.sources.items()],
+            "vector_index": self.rag_processor.index_stats(),
+            "lexical_index": self.rag_processor.lexical_index.stats(),
+            "created": self.created,
+            "last_access": self.last_access,
+        }
+
+    def save(self, root_dir: str):
+        """Writes the indexes and collection.json to root_dir/<collection_id>, replacing the previous copy."""
+        entry_dir = os.path.join(root_dir, self.collection_id)
+        tmp_dir = f"{entry_dir}.tmp"
+        with self.lock:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir)
+            if self.rag_processor.has_index:
+                self.rag_processor.save_index(tmp_dir)
+            meta = {"name": self.name, "model_name": self.model_name, "sources": dict(self.sources), "created": self.created}
+            with open(os.path.join(tmp_dir, "collection.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+
+    @staticmethod
+    def read_meta(root_dir: str, collection_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(root_dir, collection_id, "collection.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    @classmethod
+    def load(cls, root_dir: str, collection_id: str, meta: Dict[str, Any], rag_processor: Any) -> "CollectionSession":
+        """Restores a saved collection into rag_processor (built with meta["model_name"])."""
+        if meta["sources"]:
+            rag_processor.load_index(os.path.join(root_dir, collection_id))
+        session = cls(collection_id, meta["name"], meta["model_name"], rag_processor, meta["sources"])
+        session.created = meta.get("created", session.created)
+        return session
+
+class SessionStore:
+    """
+    Bounded LRU table of DocumentSessions (or CollectionSessions). Adding a session
+    beyond max_sessions drops the least recently used one (its index may still be on disk).
+    """
+
+    def __init__(self, max_sessions: int):
+        self.max_sessions = max(1, max_sessions)
+        self._sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document_id: str) -> Optional[Any]:
+        with self._lock:
+            session = self._sessions.get(document_id)
+            if session is not None:
+                self._sessions.move_to_end(document_id)
+                session.last_access = time.time()
+            return session
+
+    def put(self, session: Any):
+        with self._lock:
+            self._sessions[session.key] = session
+            self._sessions.move_to_end(session.key)
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                logger.info(f"Evicting session {evicted_id[:12]}")
+
+    def remove(self, document_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(document_id, None) is not None
+
+    def list(self):
+        with self._lock:
+            return [session.describe() for session in reversed(self._sessions.values())]
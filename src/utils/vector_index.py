@@ -0,0 +1,177 @@
+import math
+import logging
+from typing import Any, Dict, Tuple
+import numpy as np
+import faiss
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# "auto" picks by vector count: flat, then hnsw, ivf_flat and ivf_pq as the index grows
+INDEX_TYPES = ("auto", "flat", "hnsw", "ivf_flat", "ivf_pq")
+
+# FAISS wants at least ~39 training points per centroid (IVF lists, and the 256 codes of each PQ codebook)
+MIN_POINTS_PER_LIST = 39
+PQ_TRAINING_POINTS = 256 * MIN_POINTS_PER_LIST
+
+def choose_index_type(num_vectors: int) -> str:
+    if num_vectors < Config.FAISS_FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors < Config.FAISS_HNSW_MAX_VECTORS:
+        return "hnsw"
+    if num_vectors < Config.FAISS_IVF_FLAT_MAX_VECTORS:
+        return "ivf_flat"
+    return "ivf_pq"
+
+def _nlist(num_vectors: int) -> int:
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // MIN_POINTS_PER_LIST))
+
+def _pq_subquantizers(dim: int) -> int:
+    """Largest divisor of dim that is at most dim / 8 (one byte per 8 dimensions)."""
+    return max(m for m in range(1, max(1, dim // 8) + 1) if dim % m == 0)
+
+def base_index(index: Any) -> Any:
+    """The index under an id map (flat and HNSW are wrapped in IndexIDMap2; IVF keeps its own ids)."""
+    if isinstance(index, faiss.IndexIDMap):
+        return faiss.downcast_index(index.index)
+    return index
+
+def configure_search(index: Any) -> Any:
+    """Applies the search-time knobs (nprobe, efSearch); they are not all kept by write_index."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        base.nprobe = min(Config.FAISS_IVF_NPROBE, base.nlist)
+    elif isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = Config.FAISS_HNSW_EF_SEARCH
+    return index
+
+def index_type_of(index: Any) -> str:
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    return "flat"
+
+def new_flat_index(dim: int) -> Any:
+    """Empty exact index that vectors can be added to and removed from by id."""
+    return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+def build_index(vectors: np.ndarray, index_type: str = "auto", ids: np.ndarray = None) -> Any:
+    """
+    Inner-product index over L2-normalised vectors (so scores are cosine), trained
+    on the vectors themselves where the type needs it. Types that cannot be trained
+    on this few vectors fall back to flat.
+
+    Vectors are stored under ids (default: 0..n-1), which search returns instead
+    of positions.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    ids = np.arange(num_vectors, dtype=np.int64) if ids is None else np.ascontiguousarray(ids, dtype=np.int64)
+    if index_type == "auto":
+        index_type = choose_index_type(num_vectors)
+
+    nlist = _nlist(num_vectors)
+    if (index_type.startswith("ivf") and num_vectors < nlist * MIN_POINTS_PER_LIST) or \
+            (index_type == "ivf_pq" and num_vectors < PQ_TRAINING_POINTS):
+        logger.warning(f"{num_vectors} vectors are too few to train {index_type}, using flat")
+        index_type = "flat"
+
+    # IVF keeps ids in its inverted lists; the graph and flat types need an id map
+    if index_type == "flat":
+        index = new_flat_index(dim)
+    elif index_type == "hnsw":
+        index = faiss.IndexIDMap2(faiss.IndexHNSWFlat(dim, Config.FAISS_HNSW_M, faiss.METRIC_INNER_PRODUCT))
+    elif index_type == "ivf_flat":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dim), dim, nlist, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dim), dim, nlist, _pq_subquantizers(dim), 8,
+                                 faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, ids)
+    return configure_search(index)
+
+def index_contents(index: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """(ids, vectors) of a flat or HNSW index; both store the vectors exactly."""
+    if not isinstance(index, faiss.IndexIDMap):
+        raise ValueError(f"Cannot read the vectors back from a {index_type_of(index)} index")
+    return faiss.vector_to_array(index.id_map).astype(np.int64), base_index(index).reconstruct_n(0, index.ntotal)
+
+def index_vectors(index: Any) -> np.ndarray:
+    """All vectors of a flat or HNSW index, in insertion order."""
+    return index_contents(index)[1]
+
+def remove_ids(index: Any, ids: np.ndarray) -> Any:
+    """
+    Removes vectors by id and returns the index. HNSW graphs do not support
+    removal, so an HNSW index is rebuilt from the remaining vectors.
+    """
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    if isinstance(base_index(index), faiss.IndexHNSW):
+        all_ids, vectors = index_contents(index)
+        keep = ~np.isin(all_ids, ids)
+        return build_index(vectors[keep], "hnsw", all_ids[keep])
+    index.remove_ids(faiss.IDSelectorBatch(ids))
+    return index
+
+def writable_index(index: Any) -> Any:
+    """
+    Makes a memory-mapped index safe to add to and remove from. Flat and HNSW
+    storage is copied on write by FAISS; read-only on-disk IVF lists are copied
+    into memory here.
+    """
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF) and isinstance(faiss.downcast_InvertedLists(base.invlists), faiss.OnDiskInvertedLists):
+        on_disk = base.invlists
+        lists = faiss.ArrayInvertedLists(base.nlist, base.code_size)
+        for list_no in range(base.nlist):
+            size = on_disk.list_size(list_no)
+            if size:
+                lists.add_entries(list_no, size, on_disk.get_ids(list_no), on_disk.get_codes(list_no))
+        base.replace_invlists(lists, True)
+        lists.this.disown()
+    return index
+
+def search_params(index: Any, allowed_ids: np.ndarray) -> Any:
+    """Search parameters restricting results to allowed_ids, keeping the index's nprobe / efSearch."""
+    selector = faiss.IDSelectorBatch(np.ascontiguousarray(allowed_ids, dtype=np.int64))
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=base.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+def index_memory_bytes(index: Any) -> int:
+    """Exact serialized size (copies the whole index; meant for benchmarks)."""
+    return int(faiss.serialize_index(index).nbytes)
+
+def estimate_bytes_per_vector(index: Any) -> float:
+    """Approximate resident bytes per vector, without serializing the index."""
+    # The id map adds a 64-bit id per vector (plus a reverse hash map entry)
+    id_map_bytes = 8.0 if isinstance(index, faiss.IndexIDMap) else 0.0
+    index = base_index(index)
+    if isinstance(index, faiss.IndexIVFPQ):
+        # PQ code plus the 64-bit id kept in the inverted list
+        return float(index.pq.code_size + 8)
+    if isinstance(index, faiss.IndexIVF):
+        return float(index.d * 4 + 8)
+    if isinstance(index, faiss.IndexHNSW):
+        # Vector plus level-0 links (upper levels add a few percent)
+        return float(index.d * 4 + index.hnsw.nb_neighbors(0) * 4) + id_map_bytes
+    return float(index.d * 4) + id_map_bytes
+
+def describe_index(index: Any) -> Dict[str, Any]:
+    per_vector = estimate_bytes_per_vector(index)
+    return {
+        "type": index_type_of(index),
+        "vectors": index.ntotal,
+        "bytes_per_vector": per_vector,
+        "memory_mb": round(per_vector * index.ntotal / (1024 * 1024), 3),
+    }
@@ -0,0 +1,138 @@
+import time
+import asyncio
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+import httpx
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+              "Chrome/91.0.4472.124 Safari/537.36")
+
+# Responses of other types (PDFs, images, ...) are not parsed as pages
+PAGE_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+
+_parse_executor = None
+_parse_executor_lock = threading.Lock()
+
+def _get_parse_executor() -> ThreadPoolExecutor:
+    # Not the ingest stage pool: fetches usually run on it already, and waiting on it from there could deadlock
+    global _parse_executor
+    with _parse_executor_lock:
+        if _parse_executor is None:
+            _parse_executor = ThreadPoolExecutor(max_workers=max(1, Config.WEB_PARSE_WORKERS),
+                                                 thread_name_prefix="brainbolt-html")
+        return _parse_executor
+
+def page_text(content: bytes, content_type: str = "text/html", encoding: Optional[str] = None) -> str:
+    """Main text of a page, with navigation, scripts and other clutter removed."""
+    if content_type == "text/plain":
+        return content.decode(encoding or "utf-8", errors="replace").strip()
+
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, "html.parser", from_encoding=encoding)
+    for tag in soup(["nav", "header", "footer", "aside", "script", "style", "noscript", "form", "iframe"]):
+        tag.decompose()
+    # Focus on the main content (heuristic)
+    main_content = soup.find("main") or soup.find("article") or soup.find(id="content") or soup.find(class_="content") or soup.body
+    return (main_content or soup).get_text(separator="\n", strip=True)
+
+async def _fetch(client: httpx.AsyncClient, url: str, host_limits: Dict[str, asyncio.Semaphore], per_host: int,
+                 max_bytes: int) -> Dict[str, Any]:
+    result = {"url": url, "status": None, "text": "", "bytes": 0, "truncated": False, "error": None,
+              "fetch_ms": 0.0, "parse_ms": 0.0}
+    host = urlsplit(url).netloc.lower()
+    start = time.perf_counter()
+    try:
+        async with host_limits.setdefault(host, asyncio.Semaphore(max(1, per_host))):
+            async with client.stream("GET", url) as response:
+                result["status"] = response.status_code
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+                if content_type not in PAGE_CONTENT_TYPES:
+                    raise ValueError(f"unsupported content type {content_type}")
+                # Stream so an oversized page is cut off instead of read whole
+                chunks, size = [], 0
+                async for chunk in response.aiter_bytes():
+                    chunks.append(chunk)
+                    size += len(chunk)
+                    if size > max_bytes:
+                        result["truncated"] = True
+                        break
+                body = b"".join(chunks)[:max_bytes]
+                encoding = response.charset_encoding
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+    finally:
+        result["fetch_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    result["bytes"] = len(body)
+
+    parse_start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        result["text"] = await loop.run_in_executor(_get_parse_executor(), page_text, body, content_type, encoding)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["parse_ms"] = round((time.perf_counter() - parse_start) * 1000, 2)
+    return result
+
+async def afetch_pages(urls: List[str], on_result: Callable[[Dict[str, Any]], None] = None,
+                       timeout_sec: float = None, deadline_sec: float = None, per_host: int = None,
+                       max_connections: int = None, max_bytes: int = None) -> List[Dict[str, Any]]:
+    """
+    Fetches and parses each distinct URL once, all concurrently on one pooled
+    client, and returns one result per URL in first-seen order:
+    {url, status, text, bytes, truncated, error, fetch_ms, parse_ms}.
+
+    Pages still outstanding when the deadline passes are cancelled and come back
+    with an error. on_result is called as each page finishes.
+    """
+    timeout_sec = Config.WEB_FETCH_TIMEOUT_SEC if timeout_sec is None else timeout_sec
+    deadline_sec = Config.WEB_FETCH_DEADLINE_SEC if deadline_sec is None else deadline_sec
+    per_host = Config.WEB_FETCH_PER_HOST if per_host is None else per_host
+    max_connections = Config.WEB_FETCH_MAX_CONNECTIONS if max_connections is None else max_connections
+    max_bytes = int(Config.WEB_FETCH_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+
+    urls = list(dict.fromkeys(urls))
+    results: Dict[str, Dict[str, Any]] = {}
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + deadline_sec
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(timeout_sec), follow_redirects=True,
+                                 headers={"User-Agent": USER_AGENT}) as client:
+        pending = {asyncio.create_task(_fetch(client, url, host_limits, per_host, max_bytes)) for url in urls}
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                result = task.result()
+                results[result["url"]] = result
+                if on_result:
+                    on_result(result)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"{len(pending)} page(s) not fetched within {deadline_sec:g}s")
+
+    return [results.get(url) or {"url": url, "status": None, "text": "", "bytes": 0, "truncated": False,
+                                 "error": f"deadline of {deadline_sec:g}s exceeded", "fetch_ms": 0.0, "parse_ms": 0.0}
+            for url in urls]
+
+def fetch_pages(urls: List[str], on_result: Callable[[Dict[str, Any]], None] = None, **options) -> List[Dict[str, Any]]:
+    """Blocking afetch_pages, for the synchronous ingestors."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(afetch_pages(urls, on_result, **options))
+    # Called on a thread that is running an event loop: use a private loop on another thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, afetch_pages(urls, on_result, **options)).result()
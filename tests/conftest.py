@@ -0,0 +1,83 @@
+import io
+import os
+import tempfile
+import numpy as np
+import pytest
+
+# Caches and stores write under a throwaway directory, never the repo's data/
+_DATA_DIR = tempfile.mkdtemp(prefix="brainbolt-tests-")
+for _var, _name in (("EMBED_CACHE_DIR", "embedding_cache"), ("INDEX_STORE_DIR", "indexes"),
+                    ("QUERY_EMBED_DIR", "query_embeddings"), ("ONNX_CACHE_DIR", "onnx"),
+                    ("COLLECTIONS_DIR", "collections"), ("RESPONSE_CACHE_PATH", "response_cache.sqlite3"),
+                    ("OCR_CACHE_PATH", "ocr_cache.sqlite3"),
+                    ("IMAGE_DESCRIPTION_CACHE_PATH", "image_descriptions.sqlite3")):
+    os.environ.setdefault(_var, os.path.join(_DATA_DIR, _name))
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+class FakeClipProcessor:
+    """Stands in for CLIPProcessor: hashed word ids for text, 32x32 pixels for images."""
+
+    def __call__(self, text=None, images=None, return_tensors="pt", padding=True, truncation=True, max_length=77):
+        import torch
+        from PIL import Image
+
+        if text is not None:
+            texts = [text] if isinstance(text, str) else list(text)
+            ids = [[1] + [sum(map(ord, word)) % 990 + 3 for word in t.split()][:max_length - 2] + [2] for t in texts]
+            width = max(len(row) for row in ids)
+            return {"input_ids": torch.tensor([row + [0] * (width - len(row)) for row in ids]),
+                    "attention_mask": torch.tensor([[1] * len(row) + [0] * (width - len(row)) for row in ids])}
+        images = [images] if isinstance(images, Image.Image) else list(images)
+        pixels = np.stack([np.asarray(image.convert("RGB").resize((32, 32)), dtype=np.float32) / 255 for image in images])
+        return {"pixel_values": torch.tensor(pixels).permute(0, 3, 1, 2)}
+
+@pytest.fixture(scope="session")
+def fake_clip():
+    """A tiny randomly initialised CLIP registered under the configured model id (no weights downloaded)."""
+    import torch
+    from transformers import CLIPConfig, CLIPModel
+    from config.config import Config
+    from src.processors.model_registry import model_registry
+
+    torch.manual_seed(0)
+    config = CLIPConfig(
+        text_config=dict(vocab_size=1000, hidden_size=32, intermediate_size=64, num_hidden_layers=1,
+                         num_attention_heads=2, max_position_embeddings=77, bos_token_id=1, eos_token_id=2),
+        vision_config=dict(hidden_size=32, intermediate_size=64, num_hidden_layers=1, num_attention_heads=2,
+                           image_size=32, patch_size=8),
+        projection_dim=16,
+    )
+    model_registry._clip[Config.CLIP_MODEL_ID] = (CLIPModel(config).eval(), FakeClipProcessor())
+    return Config.CLIP_MODEL_ID
+
+def random_image(seed: int, size=(64, 48)):
+    from PIL import Image
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8))
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Builds a PDF of text pages; pages in scanned are a single full-page image instead."""
+    import fitz
+    from PIL import Image, ImageDraw
+
+    def make(name="doc.pdf", pages=8, scanned=(), images=()):
+        doc = fitz.open()
+        for i in range(pages):
+            page = doc.new_page()
+            if i in scanned:
+                scan = Image.new("RGB", (595, 842), "white")
+                ImageDraw.Draw(scan).text((10, 10), f"Scanned page {i}", fill="black")
+                buffer = io.BytesIO()
+                scan.save(buffer, "PNG")
+                page.insert_image(page.rect, stream=buffer.getvalue())
+                continue
+            page.insert_text((72, 72), f"Page {i}: chlorophyll absorbs light in the chloroplasts.", fontsize=9)
+            for image in images:
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG")
+                page.insert_image(fitz.Rect(72, 200, 72 + image.width, 200 + image.height), stream=buffer.getvalue())
+        path = str(tmp_path / name)
+        doc.save(path)
+        return path
+
+    return make
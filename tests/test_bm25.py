@@ -0,0 +1,51 @@
+import pytest
+from src.utils.bm25 import BM25Index, tokenize
+from src.processors.multimodal_rag import MultiModalRAGProcessor, _rrf, RRF_K
+
+DOCS = [
+    "Photosynthesis turns light into chemical energy.",
+    "The mitochondria is the powerhouse of the cell.",
+    "Light reactions of photosynthesis happen in the thylakoid, light first.",
+]
+
+@pytest.fixture
+def index():
+    index = BM25Index()
+    for doc_id, text in enumerate(DOCS):
+        index.add(doc_id, text)
+    return index
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("The cell's DNA is a helix") == ["cell", "dna", "helix"]
+
+def test_search_ranks_by_term_weight_and_skips_non_matches(index):
+    assert [doc_id for doc_id, _ in index.search("light photosynthesis", k=5)] == [2, 0]
+    assert index.search("ribosome", k=5) == []
+
+def test_search_respects_k_and_allowed(index):
+    assert len(index.search("light", k=1)) == 1
+    assert [doc_id for doc_id, _ in index.search("light", k=5, allowed=[0, 1])] == [0]
+
+def test_removed_documents_are_no_longer_found(index):
+    index.remove([2])
+
+    assert [doc_id for doc_id, _ in index.search("light", k=5)] == [0]
+    assert index.stats()["docs"] == 2
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = _rrf([[1, 2, 3], [3, 4]], k=3)
+
+    assert [doc_id for doc_id, _ in fused] == [3, 1, 2]
+    assert fused[0][1] == pytest.approx(1 / (RRF_K + 3) + 1 / (RRF_K + 1))
+
+def test_hybrid_retrieval_surfaces_the_keyword_match(fake_clip):
+    # Random CLIP weights give an arbitrary dense order
+    rag = MultiModalRAGProcessor(embed_batch_size=4, index_type="flat")
+    pages = ["Cells divide by mitosis.", "Enzymes speed up reactions.", "Xylem carries water upward.",
+             "Ribosomes build proteins."]
+    rag.add_stream(iter([{"type": "text", "text": text, "page": page} for page, text in enumerate(pages)]), "doc")
+
+    hybrid = rag.retrieve(["xylem water"], k=2, query_text="xylem water", retrieval="hybrid")
+
+    # A BM25-only hit ties with the top dense hit, so it is guaranteed a place in the top two
+    assert 2 in [doc.metadata["page"] for doc in hybrid]
@@ -0,0 +1,56 @@
+import pytest
+from fastapi.testclient import TestClient
+import api
+from config.config import Config
+from src.utils.session_store import SessionStore
+
+@pytest.fixture
+def client(fake_clip, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "COLLECTIONS_DIR", str(tmp_path / "collections"))
+    monkeypatch.setattr(api, "collections", SessionStore(max_sessions=2))
+    return TestClient(api.app)
+
+def add_source(client, collection_id, path):
+    response = client.post(f"/api/collections/{collection_id}/sources", json={"source_path": path})
+    assert response.status_code == 200, response.text
+    return response.json()["source_id"]
+
+def counts(client, collection_id):
+    described = client.get(f"/api/collections/{collection_id}").json()
+    return {source["source_id"]: source["chunks"] for source in described["sources"]}
+
+def test_sources_are_added_removed_and_filtered(client, make_pdf):
+    collection_id = client.post("/api/collections", json={"name": "biology"}).json()["collection_id"]
+    first = add_source(client, collection_id, make_pdf("first.pdf", pages=3))
+    second = add_source(client, collection_id, make_pdf("second.pdf", pages=5))
+
+    assert set(counts(client, collection_id)) == {first, second}
+    rag = api.collections.get(collection_id).rag_processor
+    hits = rag.retrieve(["chlorophyll"], k=10, sources=[second])
+    assert hits and {doc.metadata["source_id"] for doc in hits} == {second}
+
+    assert client.delete(f"/api/collections/{collection_id}/sources/{first}").status_code == 200
+    assert set(counts(client, collection_id)) == {second}
+    assert client.delete(f"/api/collections/{collection_id}/sources/{first}").status_code == 404
+
+def test_readding_a_source_replaces_it(client, make_pdf):
+    collection_id = client.post("/api/collections", json={}).json()["collection_id"]
+    path = make_pdf("doc.pdf", pages=3)
+    source_id = add_source(client, collection_id, path)
+    before = counts(client, collection_id)
+
+    assert add_source(client, collection_id, path) == source_id
+    assert counts(client, collection_id) == before
+
+def test_collection_is_restored_from_disk(client, make_pdf):
+    collection_id = client.post("/api/collections", json={"name": "biology"}).json()["collection_id"]
+    source_id = add_source(client, collection_id, make_pdf("doc.pdf", pages=3))
+    before = counts(client, collection_id)
+
+    api.collections.remove(collection_id)
+
+    assert counts(client, collection_id) == before
+    restored = api.collections.get(collection_id)
+    assert restored.sources and restored.rag_processor.sources()[source_id]["chunks"] == before[source_id]
+    listed = client.get("/api/collections").json()["collections"]
+    assert [(c["collection_id"], c["sources"], c["loaded"]) for c in listed] == [(collection_id, 1, True)]
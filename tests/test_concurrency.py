@@ -0,0 +1,45 @@
+import time
+import threading
+import pytest
+import src.utils.concurrency as concurrency
+from src.utils.concurrency import call_in_stage, get_executor, iter_in_background
+
+@pytest.fixture(autouse=True)
+def single_thread_stages(monkeypatch):
+    monkeypatch.setitem(concurrency.STAGE_LIMITS, "ingest", 1)
+    monkeypatch.setitem(concurrency.STAGE_LIMITS, "embed", 1)
+    concurrency.shutdown_executors()
+    yield
+    concurrency.shutdown_executors()
+
+def test_call_in_stage_runs_on_the_stage_pool_and_inline_from_it():
+    assert call_in_stage("embed", lambda: threading.current_thread().name).startswith("brainbolt-embed_")
+    nested = get_executor("embed").submit(call_in_stage, "embed", lambda: threading.current_thread().name)
+    assert nested.result(timeout=5).startswith("brainbolt-embed_")
+
+def test_ingest_loop_and_its_producer_share_one_ingest_slot():
+    def produce():
+        for i in range(5):
+            time.sleep(0.01)
+            yield i
+
+    consume = lambda: [call_in_stage("embed", lambda x=x: x * 2) for x in iter_in_background(produce(), max_buffered=2)]
+    assert get_executor("ingest").submit(consume).result(timeout=5) == [0, 2, 4, 6, 8]
+
+def test_embed_slot_is_free_while_an_ingest_waits_for_parsing():
+    parsing = threading.Event()
+    release = threading.Event()
+
+    def produce():
+        yield 1
+        parsing.set()
+        release.wait(5)
+        yield 2
+
+    ingest = get_executor("ingest").submit(
+        lambda: [call_in_stage("embed", lambda x=x: x) for x in iter_in_background(produce())])
+    assert parsing.wait(5)
+    # A query on the embed stage is not stuck behind the slow parse
+    assert get_executor("embed").submit(lambda: "query").result(timeout=1) == "query"
+    release.set()
+    assert ingest.result(timeout=5) == [1, 2]
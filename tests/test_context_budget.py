@@ -0,0 +1,61 @@
+from src.utils.context_budget import (ContextBudgeter, IMAGE_TILE_TOKENS, estimate_image_tokens,
+                                      estimate_text_tokens, fit_dimensions)
+
+class FakeImageStore:
+    """Fixed-size images whose data URL is url_bytes long at any size."""
+
+    def __init__(self, size=(2000, 1000), url_bytes=100):
+        self.size = size
+        self.url_bytes = url_bytes
+        self.requested = []
+
+    def get_size(self, image_id):
+        return self.size
+
+    def data_url(self, image_id, max_dim):
+        self.requested.append(max_dim)
+        return "x" * self.url_bytes
+
+LABEL = "\n[Image from Page 3]:\n"
+
+def test_image_token_estimates():
+    assert estimate_image_tokens(300, 200) == IMAGE_TILE_TOKENS
+    assert estimate_image_tokens(1000, 700) == 2 * IMAGE_TILE_TOKENS
+    assert fit_dimensions(2000, 1000, 1024) == (1024, 512)
+    assert fit_dimensions(100, 50, 1024) == (100, 50)
+
+def test_chunks_are_packed_in_order_until_the_budget_is_spent():
+    budget = ContextBudgeter(max_tokens=10, max_bytes=10**6)
+    budget.reserve("a" * 8)
+
+    assert budget.fit_text("b" * 24)
+    assert not budget.fit_text("c" * 12)
+    assert budget.fit_text("")
+    assert budget.usage()["dropped_chunks"] == 1
+    assert budget.tokens_used == 8
+
+def test_image_is_downscaled_to_a_single_tile_when_that_is_what_fits():
+    store = FakeImageStore()
+    budget = ContextBudgeter(max_tokens=IMAGE_TILE_TOKENS + estimate_text_tokens(LABEL), max_bytes=10**6,
+                             image_max_dim=1024)
+
+    assert budget.fit_image(store, "img", label=LABEL) is not None
+    assert store.requested == [384]
+    assert budget.tokens_used == budget.max_tokens
+
+def test_label_is_charged_with_the_image():
+    # The image alone fills the budget exactly; with its label it must not go in
+    budget = ContextBudgeter(max_tokens=IMAGE_TILE_TOKENS, max_bytes=10**6, image_max_dim=384)
+
+    assert budget.fit_image(FakeImageStore(), "img", label=LABEL) is None
+    assert budget.usage()["dropped_images"] == 1
+    assert budget.tokens_used == 0
+
+def test_byte_budget_and_image_count_are_enforced():
+    store = FakeImageStore(url_bytes=1000)
+    assert ContextBudgeter(max_tokens=10**6, max_bytes=999).fit_image(store, "img") is None
+
+    budget = ContextBudgeter(max_tokens=10**6, max_bytes=10**6, max_images=1)
+    assert budget.fit_image(store, "a", label=LABEL) is not None
+    assert budget.fit_image(store, "b", label=LABEL) is None
+    assert budget.bytes_used == 1000 + len(LABEL)
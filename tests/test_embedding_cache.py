@@ -0,0 +1,84 @@
+import sqlite3
+import numpy as np
+import pytest
+from src.utils.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+def vector(seed):
+    return np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+def test_hits_and_misses(cache_dir):
+    cache = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    a, b = EmbeddingCache.text_key("a"), EmbeddingCache.text_key("b")
+    cache.put_many([a], [vector(0)])
+
+    hit, miss = cache.get_many([a, b])
+
+    np.testing.assert_array_equal(hit, vector(0))
+    assert miss is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_least_recently_used_row_is_reused(cache_dir):
+    cache = EmbeddingCache(cache_dir, "model", DIM, max_entries=3)
+    keys = [EmbeddingCache.text_key(str(i)) for i in range(4)]
+    cache.put_many(keys[:3], [vector(i) for i in range(3)])
+    cache.get_many([keys[0]])
+
+    cache.put_many([keys[3]], [vector(3)])
+
+    results = cache.get_many(keys)
+    assert [r is not None for r in results] == [True, False, True, True]
+    np.testing.assert_array_equal(results[3], vector(3))
+    assert cache.evictions == 1
+    assert cache.stats()["entries"] == 3
+
+def test_index_is_persisted_without_flush(cache_dir):
+    cache = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    key = EmbeddingCache.text_key("a")
+    cache.put_many([key], [vector(0)])
+
+    with sqlite3.connect(f"{cache_dir}/index.sqlite3") as conn:
+        assert conn.execute("SELECT key FROM rows").fetchall() == [(key,)]
+
+def test_reopened_cache_keeps_rows(cache_dir):
+    key = EmbeddingCache.text_key("a")
+    cache = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    cache.put_many([key], [vector(0)])
+    cache.flush()
+
+    (reloaded,) = EmbeddingCache(cache_dir, "model", DIM, max_entries=4).get_many([key])
+
+    np.testing.assert_array_equal(reloaded, vector(0))
+
+def test_shape_change_starts_empty(cache_dir):
+    key = EmbeddingCache.text_key("a")
+    cache = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    cache.put_many([key], [vector(0)])
+    cache.flush()
+
+    resized = EmbeddingCache(cache_dir, "model", DIM, max_entries=8)
+
+    assert resized.get_many([key]) == [None]
+    assert resized.stats()["entries"] == 0
+
+def test_two_instances_share_one_directory(cache_dir):
+    # Stands in for two server workers: rows written by one are seen by the other,
+    # and evictions by either never hand out a row the other still maps.
+    first = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    second = EmbeddingCache(cache_dir, "model", DIM, max_entries=4)
+    keys = [EmbeddingCache.text_key(str(i)) for i in range(6)]
+
+    first.put_many(keys[:3], [vector(i) for i in range(3)])
+    second.put_many(keys[3:], [vector(i) for i in range(3, 6)])
+
+    for cache in (first, second):
+        results = cache.get_many(keys)
+        present = [i for i, r in enumerate(results) if r is not None]
+        assert len(present) == 4
+        for i in present:
+            np.testing.assert_array_equal(results[i], vector(i))
@@ -0,0 +1,112 @@
+from concurrent.futures import Future
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from PIL import Image
+from conftest import random_image
+import src.processors.image_analyzer as analyzer_module
+from src.processors.image_analyzer import ImageAnalyzer, _Image
+from src.utils.description_cache import DescriptionCache
+
+def digest(image):
+    return _Image(image).digest
+
+def unit_vector(seed):
+    vector = np.random.default_rng(seed).standard_normal(16).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+class FakeLLM:
+    """Answers each vision request with a fixed description, or fails them all."""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.requests = 0
+
+    def batch(self, messages, config=None, return_exceptions=False):
+        self.requests += len(messages)
+        if self.fail:
+            return [RuntimeError("quota exceeded")] * len(messages)
+        return [SimpleNamespace(content="A described figure.") for _ in messages]
+
+@pytest.fixture
+def world(monkeypatch, tmp_path):
+    """Labels, vectors and OCR text per image digest, standing in for CLIP and the OCR pool."""
+    world = SimpleNamespace(labels={}, vectors={}, ocr={})
+
+    def classify(self, items):
+        for item in items:
+            item.label = world.labels[item.digest]
+            item.vector = world.vectors[item.digest]
+
+    class FakePool:
+        def submit(self, image):
+            future = Future()
+            future.set_result(world.ocr.get(digest(image), ""))
+            return future
+
+    monkeypatch.setattr(ImageAnalyzer, "_classify", classify)
+    monkeypatch.setattr(analyzer_module, "ocr_pool", FakePool())
+    monkeypatch.setattr(analyzer_module, "description_cache",
+                        DescriptionCache(str(tmp_path / "descriptions.sqlite3"), max_entries=100, max_distance=6,
+                                         min_cosine=0.95))
+    return world
+
+def add(world, image, label, ocr="", seed=0):
+    world.labels[digest(image)] = label
+    world.vectors[digest(image)] = unit_vector(seed)
+    world.ocr[digest(image)] = ocr
+    return image
+
+def analyzer():
+    return ImageAnalyzer(escalate_classes=["chart", "diagram"], min_ocr_chars=10)
+
+def test_each_image_takes_the_cheapest_tier_that_can_describe_it(world):
+    blank = Image.new("RGB", (64, 48), "white")
+    images = [
+        blank,
+        add(world, random_image(1), "photo", ocr="cell", seed=1),
+        add(world, random_image(2), "text-heavy", ocr="Mitosis has four phases.", seed=2),
+        add(world, random_image(3), "text-heavy", seed=3),
+        add(world, random_image(4), "chart", ocr="Yield by year 2020 2021", seed=4),
+    ]
+    llm = FakeLLM()
+    image_analyzer = analyzer()
+
+    texts = image_analyzer.describe_batch(images, llm)
+
+    assert texts == ["", "Photo. cell", "Mitosis has four phases.", "A described figure.", "A described figure."]
+    assert llm.requests == 2
+    assert image_analyzer.stats()["tiers"] == {"cache": 0, "blank": 1, "ocr": 1, "local": 1, "vision": 2,
+                                               "vision_failed": 0}
+
+def test_described_images_come_from_the_cache_next_time(world):
+    images = [add(world, random_image(1), "chart", seed=1), add(world, random_image(2), "photo", seed=2)]
+    image_analyzer = analyzer()
+    first = image_analyzer.describe_batch(images, FakeLLM())
+
+    llm = FakeLLM()
+    assert image_analyzer.describe_batch(images, llm) == first
+    assert llm.requests == 0
+    assert image_analyzer.stats()["tiers"]["cache"] == 2
+
+def test_failed_vision_calls_are_not_cached(world):
+    chart = add(world, random_image(1), "chart", seed=1)
+    image_analyzer = analyzer()
+
+    assert image_analyzer.describe(chart, FakeLLM(fail=True)) == ""
+    assert image_analyzer.describe(chart, FakeLLM()) == "A described figure."
+
+def test_near_copy_needs_clip_agreement(world):
+    original = add(world, random_image(1, size=(128, 96)), "chart", seed=1)
+    analyzer().describe(original, FakeLLM())
+    # A resized copy hashes alike; only the one whose CLIP vector agrees reuses the description
+    agreeing = add(world, original.resize((64, 48)), "chart", seed=1)
+    disagreeing = add(world, original.resize((96, 72)), "chart", seed=2)
+
+    llm = FakeLLM()
+    image_analyzer = analyzer()
+    image_analyzer.describe_batch([agreeing, disagreeing], llm)
+
+    assert llm.requests == 1
+    assert image_analyzer.stats()["tiers"]["cache"] == 1
+    assert analyzer_module.description_cache.near_rejected >= 1
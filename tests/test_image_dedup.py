@@ -0,0 +1,61 @@
+from conftest import random_image
+from config.config import Config
+from src.ingestors.file import FileIngestor, _ImageDedup
+from src.processors.multimodal_rag import MultiModalRAGProcessor
+
+def image_item(page, xref, digest, phash, image_id=None):
+    return {"type": "image", "page": page, "xref": xref, "digest": digest, "phash": phash,
+            "id": image_id or f"page{page}_img0"}
+
+def test_repeats_fold_into_the_first_copy():
+    dedup = _ImageDedup()
+    first = image_item(0, xref=10, digest="a", phash=0b1111)
+    items = [
+        first,
+        {"type": "image_ref", "page": 1, "xref": 10},
+        image_item(2, xref=11, digest="a", phash=0b1111),
+        image_item(3, xref=12, digest="b", phash=0b1110),
+        image_item(4, xref=13, digest="c", phash=(1 << 63) | 0xFFFF_0000),
+    ]
+
+    out = list(dedup.feed(items))
+
+    assert [item["type"] for item in out] == ["image", "image_pages", "image_pages", "image_pages", "image"]
+    assert [item["pages"] for item in out[1:4]] == [[0, 1], [0, 1, 2], [0, 1, 2, 3]]
+    # Items already handed on are not changed afterwards
+    assert first["pages"] == [0]
+    assert (dedup.stats["unique"], dedup.stats["exact_duplicates"], dedup.stats["near_duplicates"]) == (2, 2, 1)
+
+def test_a_repeat_on_a_page_already_listed_adds_nothing():
+    dedup = _ImageDedup()
+    items = [image_item(0, xref=10, digest="a", phash=0), image_item(0, xref=11, digest="a", phash=0, image_id="x")]
+
+    assert [item["type"] for item in dedup.feed(items)] == ["image"]
+
+def test_skipped_images_stay_skipped_on_later_pages():
+    dedup = _ImageDedup()
+    items = [{"type": "image_skip", "reason": "small", "page": 0, "xref": 10},
+             {"type": "image_ref", "page": 1, "xref": 10},
+             {"type": "text", "text": "kept", "page": 1}]
+
+    assert list(dedup.feed(items)) == [items[2]]
+    assert dedup.stats["skipped_small"] == 2
+
+def test_every_copy_is_kept_with_dedup_off(monkeypatch):
+    monkeypatch.setattr(Config, "PDF_IMAGE_DEDUP", False)
+    dedup = _ImageDedup()
+    items = [image_item(0, xref=10, digest="a", phash=0), image_item(1, xref=11, digest="a", phash=0)]
+
+    assert [item["type"] for item in dedup.feed(items)] == ["image", "image"]
+
+def test_an_image_on_every_page_is_indexed_once_with_all_its_pages(fake_clip, make_pdf):
+    path = make_pdf(pages=3, images=[random_image(1, size=(120, 90))])
+    items = list(FileIngestor().iter_multimodal(path))
+    assert [item["type"] for item in items if item["type"] != "text"] == ["image", "image_pages", "image_pages"]
+
+    rag = MultiModalRAGProcessor(embed_batch_size=2, index_type="flat")
+    rag.add_stream(iter(items), "doc")
+
+    (image_doc,) = [doc for doc in rag.all_docs if doc.metadata["type"] == "image"]
+    assert image_doc.metadata["pages"] == [0, 1, 2]
+    assert rag.image_vector_store.index.ntotal == 1
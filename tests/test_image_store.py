@@ -0,0 +1,63 @@
+import io
+from PIL import Image
+from conftest import random_image
+from src.utils.image_store import ImageStore
+
+def encoded(seed, size=(64, 48), format="PNG"):
+    buffered = io.BytesIO()
+    random_image(seed, size).save(buffered, format=format)
+    return buffered.getvalue()
+
+def test_images_past_the_memory_limit_are_spilled():
+    first, second = encoded(0), encoded(1)
+    store = ImageStore(memory_limit_bytes=len(first), url_cache_size=4)
+    store.add("a", first)
+    store.add("b", second)
+
+    assert store._entries["a"][0] == "mem"
+    assert store._entries["b"][0] == "blob"
+    assert store.get_bytes("a") == first
+    assert store.get_bytes("b") == second
+    assert store.stats()["spilled_mb"] > 0
+    store.close()
+
+def test_removing_an_image_frees_its_memory():
+    data = encoded(0)
+    store = ImageStore(memory_limit_bytes=len(data), url_cache_size=4)
+    store.add("a", data)
+    store.remove("a")
+    store.add("b", data)
+
+    assert "a" not in store
+    assert store._entries["b"][0] == "mem"
+
+def test_data_urls_are_downscaled_jpeg_in_a_bounded_lru():
+    store = ImageStore(memory_limit_bytes=10**6, url_cache_size=2)
+    for image_id in "abc":
+        store.add(image_id, encoded(ord(image_id), size=(400, 200)))
+
+    url = store.data_url("a", max_dim=100)
+    store.data_url("b", max_dim=100)
+    assert store.data_url("a", max_dim=100) is url
+    store.data_url("c", max_dim=100)
+
+    assert url.startswith("data:image/jpeg;base64,")
+    assert list(store._urls) == [("a", 100), ("c", 100)]
+
+def test_original_bytes_and_mime_survive_save_and_load(tmp_path):
+    png, jpeg = encoded(0), encoded(1, format="JPEG")
+    store = ImageStore(memory_limit_bytes=len(png), url_cache_size=4)
+    store.add("png", png)
+    store.add("jpeg", jpeg)
+    store.save(str(tmp_path))
+
+    loaded = ImageStore.load(str(tmp_path))
+
+    assert list(loaded) == ["png", "jpeg"]
+    assert loaded.get_bytes("png") == png
+    assert loaded.get_bytes("jpeg") == jpeg
+    assert [loaded._entries[i][-1] for i in loaded] == ["image/png", "image/jpeg"]
+    assert loaded.get_size("png") == (64, 48)
+    assert isinstance(loaded.get_image("jpeg"), Image.Image)
+    loaded.close()
+    store.close()
@@ -0,0 +1,68 @@
+import os
+import time
+from src.utils.index_store import DocumentIndexStore
+
+class FakeRag:
+    """Stands in for MultiModalRAGProcessor: save_index writes size bytes, load_index records the dir."""
+
+    has_index = True
+
+    def __init__(self, size=1000):
+        self.size = size
+        self.loaded_from = None
+
+    def save_index(self, path):
+        os.makedirs(path)
+        with open(os.path.join(path, "index.faiss"), "wb") as f:
+            f.write(b"\0" * self.size)
+
+    def load_index(self, path):
+        self.loaded_from = path
+
+def test_saved_index_is_reused(tmp_path):
+    store = DocumentIndexStore(str(tmp_path / "indexes"), ttl_sec=60, max_bytes=10**6)
+    store.save("abc", FakeRag(), source="doc.pdf")
+
+    rag = FakeRag()
+    assert store.load("abc", rag)
+    assert rag.loaded_from == str(tmp_path / "indexes" / "abc")
+    assert not store.load("missing", FakeRag())
+
+def test_root_dir_is_created_on_first_save(tmp_path):
+    root = tmp_path / "indexes"
+    store = DocumentIndexStore(str(root), ttl_sec=60, max_bytes=10**6)
+
+    assert not root.exists()
+    assert store.stats()["entries"] == 0
+    store.save("abc", FakeRag())
+    assert root.is_dir()
+
+def test_expired_entry_is_dropped(tmp_path, monkeypatch):
+    store = DocumentIndexStore(str(tmp_path), ttl_sec=60, max_bytes=10**6)
+    store.save("abc", FakeRag())
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert not store.load("abc", FakeRag())
+    assert not (tmp_path / "abc").exists()
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes(tmp_path):
+    store = DocumentIndexStore(str(tmp_path), ttl_sec=60, max_bytes=2500)
+    store.save("first", FakeRag())
+    store.save("second", FakeRag())
+    assert store.load("first", FakeRag())
+
+    store.save("third", FakeRag())
+
+    assert sorted(os.listdir(tmp_path)) == ["first", "third"]
+
+def test_fingerprint_depends_on_model_and_file_content(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("one")
+    first = DocumentIndexStore.fingerprint(str(path), "clip")
+    path.write_text("two")
+
+    assert DocumentIndexStore.fingerprint(str(path), "clip") != first
+    assert DocumentIndexStore.fingerprint(str(path), "other") != DocumentIndexStore.fingerprint(str(path), "clip")
+    assert DocumentIndexStore.fingerprint(" query ", "clip") == DocumentIndexStore.fingerprint("query", "clip")
@@ -0,0 +1,33 @@
+import pytest
+from conftest import random_image
+from src.processors.multimodal_rag import MultiModalRAGProcessor
+
+TEXT = "Chlorophyll absorbs red and blue light. " * 20
+
+@pytest.fixture
+def rag(fake_clip):
+    return MultiModalRAGProcessor(embed_batch_size=2, index_type="flat")
+
+def test_batches_are_indexed_while_the_stream_is_still_producing(rag):
+    seen = []
+
+    def items():
+        for page in range(6):
+            yield {"type": "text", "text": TEXT, "page": page}
+            # What is already searchable when the next page is produced
+            seen.append(rag.vector_store.index.ntotal if rag.vector_store else 0)
+        yield {"type": "image", "image": random_image(1), "page": 6, "id": "page6_img0"}
+
+    assert rag.add_stream(items(), "doc").startswith("Successfully ingested")
+    assert seen[0] > 0 and seen == sorted(seen)
+    assert rag.image_vector_store.index.ntotal == 1
+
+def test_remove_source_drops_only_that_source(rag):
+    rag.add_stream(iter([{"type": "text", "text": TEXT, "page": 0}]), "a")
+    rag.add_stream(iter([{"type": "text", "text": TEXT, "page": 0},
+                         {"type": "image", "image": random_image(2), "page": 0, "id": "img"}]), "b")
+
+    assert rag.remove_source("a")
+    assert {doc.metadata["source_id"] for doc in rag.all_docs} == {"b"}
+    assert rag.vector_store.index.ntotal == sum(doc.metadata["type"] == "text" for doc in rag.all_docs)
+    assert not hasattr(rag, "embeddings")
@@ -0,0 +1,101 @@
+import time
+import asyncio
+import threading
+import pytest
+from fastapi.testclient import TestClient
+import api
+from src.utils.jobs import JobManager, JobQueueFull
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, timeout=10))
+
+async def wait_for_status(job, *statuses):
+    while job.status not in statuses:
+        await asyncio.sleep(0.01)
+
+def test_submit_beyond_the_queue_raises_job_queue_full():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def runner(job):
+            await release.wait()
+            return job.request["n"]
+
+        manager = JobManager(max_queue=1, workers=1, retention_sec=60)
+        await manager.start(runner)
+        running = manager.submit({"n": 1})
+        await wait_for_status(running, "running")
+        queued = manager.submit({"n": 2})
+        with pytest.raises(JobQueueFull):
+            manager.submit({"n": 3})
+
+        release.set()
+        await wait_for_status(queued, "completed")
+        await manager.stop()
+        return running, queued
+
+    running, queued = run(scenario())
+    assert (running.result, queued.result) == (1, 2)
+
+def test_cancel_queued_and_running_jobs():
+    async def scenario():
+        ran = []
+
+        async def runner(job):
+            ran.append(job.request["n"])
+            await asyncio.sleep(60)
+
+        manager = JobManager(max_queue=2, workers=1, retention_sec=60)
+        await manager.start(runner)
+        running = manager.submit({"n": 1})
+        await wait_for_status(running, "running")
+        queued = manager.submit({"n": 2})
+
+        manager.cancel(queued.job_id)
+        manager.cancel(running.job_id)
+        await wait_for_status(running, "cancelled")
+        await asyncio.sleep(0.05)
+        await manager.stop()
+        return ran, running, queued
+
+    ran, running, queued = run(scenario())
+    assert ran == [1]
+    assert running.status == queued.status == "cancelled"
+
+def test_blocking_stage_work_stops_at_its_next_progress_report():
+    async def scenario():
+        stopped = threading.Event()
+
+        def work(job):
+            try:
+                while True:
+                    job.update("ingest", pages=1)
+                    time.sleep(0.01)
+            finally:
+                stopped.set()
+
+        async def runner(job):
+            await asyncio.shield(asyncio.to_thread(work, job))
+
+        manager = JobManager(max_queue=1, workers=1, retention_sec=60)
+        await manager.start(runner)
+        job = manager.submit({})
+        await wait_for_status(job, "running")
+        manager.cancel(job.job_id)
+        await wait_for_status(job, "cancelled")
+        await asyncio.to_thread(stopped.wait, 5)
+        await manager.stop()
+        return stopped.is_set()
+
+    assert run(scenario())
+
+def test_full_queue_is_rejected_with_429(monkeypatch):
+    manager = JobManager(max_queue=1, workers=1, retention_sec=60)
+    manager._queue = asyncio.Queue(maxsize=1)
+    manager._queue.put_nowait(object())
+    monkeypatch.setattr(api, "jobs", manager)
+
+    response = TestClient(api.app).post("/api/jobs", json={"source_path": "doc.pdf", "mode": "quiz"})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
@@ -0,0 +1,52 @@
+import numpy as np
+from src.processors.mode_queries import ModeQueryTable, all_mode_queries, query_facets
+
+class CountingEmbedder:
+    """Small deterministic vectors per text, recording every batch it is asked for."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.stack([np.random.default_rng(sum(map(ord, text))).standard_normal(8) for text in texts])
+
+def test_query_facets():
+    assert query_facets("risks, benefits, and implications") == [
+        "risks, benefits, and implications", "risks", "benefits", "implications"]
+    assert query_facets("overview") == ["overview"]
+
+def test_mode_queries_are_unique():
+    queries = all_mode_queries()
+    assert len(queries) == len(set(queries))
+    assert "definitions" in queries
+
+def test_missing_queries_are_embedded_in_one_call(tmp_path):
+    table = ModeQueryTable(str(tmp_path))
+    embed = CountingEmbedder()
+
+    first = table.get("clip/model", ["a", "b", "a"], embed)
+    second = table.get("clip/model", ["b", "c"], embed)
+
+    assert embed.calls == [["a", "b"], ["c"]]
+    assert first.shape == (3, 8)
+    np.testing.assert_array_equal(first[1], second[0])
+
+def test_table_is_persisted_per_model(tmp_path):
+    ModeQueryTable(str(tmp_path)).get("clip/model", ["a"], CountingEmbedder())
+    embed = CountingEmbedder()
+
+    reloaded = ModeQueryTable(str(tmp_path))
+    reloaded.get("clip/model", ["a"], embed)
+    reloaded.get("other", ["a"], embed)
+
+    assert embed.calls == [["a"]]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["clip_model.npz", "other.npz"]
+
+def test_warmup_covers_every_mode_query(tmp_path):
+    table = ModeQueryTable(str(tmp_path))
+    embed = CountingEmbedder()
+
+    assert table.warmup("clip", embed) == len(all_mode_queries())
+    table.warmup("clip", embed)
+    assert len(embed.calls) == 1
@@ -0,0 +1,82 @@
+import textwrap
+import pytest
+from PIL import Image
+from src.utils.ocr_pool import OCRError, OCRTimeout, OCRWorkerPool
+
+# Stand-in for paddleocr in the spawned workers. The red channel of the first
+# pixel picks the behaviour: 1 hangs, 2 kills the worker, 3 raises.
+FAKE_PADDLEOCR = """
+import os
+import time
+
+class PaddleOCR:
+    def __init__(self, **kwargs):
+        pass
+
+    def ocr(self, image, cls=False):
+        b, g, r = image[0, 0]
+        if r == 1:
+            time.sleep(30)
+        if r == 2:
+            os._exit(3)
+        if r == 3:
+            raise ValueError("bad image")
+        return [[[None, (f"text{g}", 0.9)], [None, (f"pid{os.getpid()}", 0.9)]]]
+"""
+
+def image(red, green=0):
+    return Image.new("RGB", (16, 16), (red, green, 0))
+
+def install_fake_paddleocr(tmp_path, monkeypatch, source):
+    (tmp_path / "paddleocr.py").write_text(textwrap.dedent(source))
+    # Spawned workers start from the parent's sys.path
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    install_fake_paddleocr(tmp_path, monkeypatch, FAKE_PADDLEOCR)
+    pool = OCRWorkerPool(workers=2, timeout_sec=1.0, threads_per_worker=1)
+    yield pool
+    pool.close()
+
+def test_batch_results_keep_the_image_order(pool):
+    texts = pool.ocr_batch([image(0, green) for green in range(6)])
+
+    assert [text.split()[0] for text in texts] == [f"text{green}" for green in range(6)]
+    stats = pool.stats()
+    assert (stats["workers"], stats["completed"]) == (2, 6)
+
+def test_a_slow_image_times_out_and_its_worker_is_replaced(pool):
+    slow = pool.submit(image(1))
+    fast = [pool.submit(image(0, green)) for green in range(3)]
+
+    with pytest.raises(OCRTimeout):
+        slow.result(timeout=30)
+    assert [future.result(timeout=30).split()[0] for future in fast] == ["text0", "text1", "text2"]
+    assert pool.ocr(image(0, 9)).startswith("text9")
+    stats = pool.stats()
+    assert (stats["timeouts"], stats["restarts"]) == (1, 1)
+
+def test_a_crashed_worker_fails_only_its_image(pool):
+    with pytest.raises(OCRError, match="exited"):
+        pool.ocr(image(2))
+    with pytest.raises(OCRError, match="bad image"):
+        pool.ocr(image(3))
+
+    assert pool.ocr(image(0, 5)).startswith("text5")
+    assert pool.stats()["restarts"] == 1
+
+def test_a_model_that_cannot_load_makes_the_pool_unavailable(tmp_path, monkeypatch):
+    install_fake_paddleocr(tmp_path, monkeypatch, """
+        class PaddleOCR:
+            def __init__(self, **kwargs):
+                raise ImportError("libpaddle.so not found")
+    """)
+    pool = OCRWorkerPool(workers=1, timeout_sec=1.0, threads_per_worker=1)
+    try:
+        with pytest.raises(OCRError, match="could not be loaded"):
+            pool.ocr(image(0))
+        with pytest.raises(OCRError, match="unavailable"):
+            pool.submit(image(0))
+    finally:
+        pool.close()
@@ -0,0 +1,63 @@
+from concurrent.futures import Future
+import pytest
+import src.ingestors.file as file_module
+from config.config import Config
+from src.ingestors.file import FileIngestor, _plan_shards
+from src.utils.ocr_cache import OCRCache, file_digest
+
+class InlineExecutor:
+    """Runs each shard on submit, recording its arguments."""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append(args)
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+@pytest.fixture
+def executor(monkeypatch):
+    executor = InlineExecutor()
+    monkeypatch.setattr(file_module, "_get_pdf_executor", lambda: executor)
+    monkeypatch.setattr(Config, "PDF_WORKERS", 2)
+    monkeypatch.setattr(Config, "PDF_PARALLEL_MIN_PAGES", 1)
+    monkeypatch.setattr(Config, "PDF_SHARD_PAGES", 4)
+    return executor
+
+def test_shards_are_fixed_size(monkeypatch):
+    monkeypatch.setattr(Config, "PDF_WORKERS", 4)
+    monkeypatch.setattr(Config, "PDF_PARALLEL_MIN_PAGES", 10)
+    monkeypatch.setattr(Config, "PDF_SHARD_PAGES", 8)
+
+    assert _plan_shards(9) == [(0, 9)]
+    assert _plan_shards(20) == [(0, 8), (8, 16), (16, 20)]
+
+def test_pages_stay_ordered_and_shards_are_submitted_as_consumed(executor, make_pdf):
+    path = make_pdf(pages=22)
+    pages = []
+    for item in FileIngestor().iter_multimodal(path):
+        page = item["page"]
+        pages.append(page)
+        # While shard k is consumed, at most PDF_WORKERS + 1 shards past it have been submitted
+        assert len(executor.calls) <= page // 4 + Config.PDF_WORKERS + 1
+
+    assert pages == list(range(22))
+    assert len(executor.calls) == 6
+
+def test_shards_after_the_first_scan_skip_cached_pages(executor, make_pdf, monkeypatch, tmp_path):
+    path = make_pdf(pages=20, scanned=(2, 17))
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"), max_entries=100)
+    for page in (2, 17):
+        cache.put(file_digest(path), page, Config.PDF_OCR_DPI, f"cached text of page {page}")
+    monkeypatch.setattr(file_module, "ocr_cache", cache)
+
+    ingestor = FileIngestor()
+    texts = {item["page"]: item["text"] for item in ingestor.iter_multimodal(path) if item["type"] == "text"}
+
+    assert texts[17] == "cached text of page 17"
+    assert ingestor.last_stats["ocr"]["cached"] == 2
+    skip_by_shard = {args[1]: args[3] for args in executor.calls}
+    assert 17 in skip_by_shard[16]
+    assert skip_by_shard[0] == frozenset()
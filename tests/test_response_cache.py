@@ -0,0 +1,54 @@
+import time
+from langchain_core.messages import HumanMessage
+from src.utils.response_cache import ResponseCache, response_key
+
+def prompt(text="Summarize.", image_url="data:image/jpeg;base64,AAAA"):
+    return [HumanMessage(content=[{"type": "text", "text": text},
+                                  {"type": "image_url", "image_url": {"url": image_url}}])]
+
+def test_key_covers_model_temperature_text_and_images():
+    key = response_key("gemini", 0.3, prompt())
+
+    assert response_key("gemini", 0.3, prompt()) == key
+    assert response_key("other", 0.3, prompt()) != key
+    assert response_key("gemini", 0.7, prompt()) != key
+    assert response_key("gemini", 0.3, prompt(text="Quiz me.")) != key
+    assert response_key("gemini", 0.3, prompt(image_url="data:image/jpeg;base64,BBBB")) != key
+
+def test_image_url_given_as_a_plain_string_keys_the_same():
+    as_string = [HumanMessage(content=[{"type": "text", "text": "Summarize."},
+                                       {"type": "image_url", "image_url": "data:image/jpeg;base64,AAAA"}])]
+
+    assert response_key("gemini", 0.3, as_string) == response_key("gemini", 0.3, prompt())
+
+def cache(tmp_path, **limits):
+    return ResponseCache(str(tmp_path / "responses.sqlite3"), **{"ttl_sec": 60, "max_entries": 10, "max_bytes": 10**6, **limits})
+
+def test_lookup_returns_the_stored_response(tmp_path):
+    responses = cache(tmp_path)
+    key, cached = responses.lookup("gemini", 0.3, prompt())
+    assert cached is None
+
+    responses.put(key, "gemini", {"summary": "Plants make sugar."})
+
+    assert responses.lookup("gemini", 0.3, prompt()) == (key, {"summary": "Plants make sugar."})
+    assert (responses.hits, responses.misses) == (1, 1)
+
+def test_expired_responses_are_misses(tmp_path, monkeypatch):
+    responses = cache(tmp_path)
+    responses.put("k", "gemini", "answer")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert responses.get("k") is None
+    assert responses.stats()["entries"] == 0
+
+def test_least_recently_used_responses_are_evicted(tmp_path):
+    responses = cache(tmp_path, max_entries=2)
+    responses.put("a", "gemini", "A")
+    responses.put("b", "gemini", "B")
+    responses.get("a")
+
+    responses.put("c", "gemini", "C")
+
+    assert [responses.get(key) for key in "abc"] == ["A", None, "C"]
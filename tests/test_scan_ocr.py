@@ -0,0 +1,90 @@
+from concurrent.futures import Future
+import pytest
+import src.ingestors.file as file_module
+from config.config import Config
+from src.ingestors.file import FileIngestor, _ScanOCR
+from src.utils.ocr_cache import OCRCache
+from src.utils.ocr_pool import OCRError
+
+class FakePool:
+    """Resolves each submitted PNG to "ocr <png>" right away; a PNG of b"fail" fails."""
+
+    num_workers = 1
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, png):
+        self.submitted.append(png)
+        future = Future()
+        if png == b"fail":
+            future.set_exception(OCRError("bad image"))
+        else:
+            future.set_result(f"ocr {png.decode()}")
+        return future
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(file_module, "ocr_pool", pool)
+    return pool
+
+@pytest.fixture
+def cache(monkeypatch, tmp_path):
+    cache = OCRCache(str(tmp_path / "ocr.sqlite3"), max_entries=100)
+    monkeypatch.setattr(file_module, "ocr_cache", cache)
+    return cache
+
+@pytest.fixture
+def digests(monkeypatch):
+    calls = []
+
+    def digest(path):
+        calls.append(path)
+        return "hash-" + path
+
+    monkeypatch.setattr(file_module, "file_digest", digest)
+    return calls
+
+def scan(page, png):
+    return {"type": "scan", "page": page, "png": png}
+
+def run(scan_ocr, items):
+    return list(scan_ocr.feed(items)) + list(scan_ocr.drain())
+
+def test_born_digital_documents_are_never_hashed(pool, cache, digests):
+    scan_ocr = _ScanOCR("doc.pdf")
+    items = [{"type": "text", "text": "Page text", "page": 0}]
+
+    assert run(scan_ocr, items) == items
+    assert digests == [] and pool.submitted == []
+    assert cache._conn is None
+
+def test_scans_are_ocred_cached_and_hashed_once(pool, cache, digests):
+    cache.put("hash-doc.pdf", 1, Config.PDF_OCR_DPI, "cached page one")
+    scan_ocr = _ScanOCR("doc.pdf")
+
+    texts = [(item["page"], item["text"]) for item in run(scan_ocr, [scan(1, None), scan(2, b"p2"), scan(3, b"p3")])]
+
+    assert texts == [(1, "cached page one"), (2, "ocr p2"), (3, "ocr p3")]
+    assert digests == ["doc.pdf"]
+    assert pool.submitted == [b"p2", b"p3"]
+    assert scan_ocr.skip_pages == {1}
+    assert cache.get_pages("hash-doc.pdf", Config.PDF_OCR_DPI) == {1: "cached page one", 2: "ocr p2", 3: "ocr p3"}
+
+def test_failed_pages_are_skipped(pool, cache, digests):
+    scan_ocr = _ScanOCR("doc.pdf")
+
+    items = run(scan_ocr, [scan(0, b"fail"), scan(1, b"p1")])
+
+    assert [item["page"] for item in items] == [1]
+    assert scan_ocr.stats["failed"] == 1
+    assert 0 not in cache.get_pages("hash-doc.pdf", Config.PDF_OCR_DPI)
+
+def test_born_digital_pdf_ingests_without_hashing(pool, cache, digests, make_pdf):
+    ingestor = FileIngestor()
+    pages = [item["page"] for item in ingestor.iter_multimodal(make_pdf(pages=3)) if item["type"] == "text"]
+
+    assert pages == [0, 1, 2]
+    assert digests == []
+    assert ingestor.last_stats["ocr"]["scanned_pages"] == 0
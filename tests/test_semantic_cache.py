@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from src.utils.semantic_cache import SemanticQueryCache, guard_terms
+
+def unit(seed, dim=8):
+    vector = np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+@pytest.fixture
+def cache():
+    return SemanticQueryCache(dim=8, threshold=0.98, max_entries=2)
+
+def test_same_question_and_context_hits(cache):
+    cache.add(unit(0), ["a", "b"], "What causes ocean tides?", "The moon")
+
+    assert cache.lookup(unit(0), ["b", "a"], "what causes ocean tides") == "The moon"
+    assert cache.stats()["hits"] == 1
+
+def test_different_context_or_distant_embedding_misses(cache):
+    cache.add(unit(0), ["a", "b"], "What causes ocean tides?", "The moon")
+
+    assert cache.lookup(unit(0), ["a", "c"], "What causes ocean tides?") is None
+    assert cache.lookup(unit(1), ["a", "b"], "What causes ocean tides?") is None
+
+@pytest.mark.parametrize("cached_question, question", [
+    ("What causes ocean tides?", "What does not cause ocean tides?"),
+    ("What causes ocean tides?", "What doesn't cause ocean tides?"),
+    ("What happens in step 3?", "What happens in step 4?"),
+    ("Name the first enzyme", "Name the last enzyme"),
+])
+def test_questions_differing_in_negation_or_number_never_share_an_answer(cache, cached_question, question):
+    cache.add(unit(0), ["a"], cached_question, "cached answer")
+
+    # Same vector and context: only the guard terms tell the questions apart
+    assert cache.lookup(unit(0), ["a"], question) is None
+
+def test_guard_terms():
+    assert guard_terms("Why didn't the 2 samples react?") == {"not", "2"}
+    assert guard_terms("Explain photosynthesis") == frozenset()
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for seed in range(3):
+        cache.add(unit(seed), ["a"], f"question {seed}", f"answer {seed}")
+
+    assert cache.lookup(unit(0), ["a"], "question 0") is None
+    assert cache.lookup(unit(2), ["a"], "question 2") == "answer 2"
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,75 @@
+import os
+import uuid
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+import api
+from config.config import Config
+from src.utils.session_store import SessionStore, DocumentSession, CollectionSession
+
+class FakeRag:
+    """Just enough of MultiModalRAGProcessor for describe and save/load."""
+
+    def __init__(self, kinds=()):
+        self.all_docs = [SimpleNamespace(metadata={"type": kind}) for kind in kinds]
+        self.image_data_store = {f"img{i}": None for i, kind in enumerate(kinds) if kind == "image"}
+        self.has_index = bool(kinds)
+        self.loaded_from = None
+
+    def save_index(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def load_index(self, path):
+        self.loaded_from = path
+
+def session(document_id, kinds=()):
+    return DocumentSession(document_id, f"/tmp/{document_id}.pdf", "gemini", FakeRag(kinds))
+
+def test_least_recently_used_session_is_dropped():
+    store = SessionStore(max_sessions=2)
+    store.put(session("a"))
+    store.put(session("b"))
+    assert store.get("a") is not None
+
+    store.put(session("c"))
+
+    assert store.get("b") is None
+    assert [s["document_id"] for s in store.list()] == ["c", "a"]
+
+def test_remove_reports_whether_the_session_was_held():
+    store = SessionStore(max_sessions=2)
+    store.put(session("a"))
+
+    assert store.remove("a")
+    assert not store.remove("a")
+
+def test_describe_counts_text_chunks_only():
+    described = session("a", kinds=["text", "text", "image"]).describe()
+
+    assert described["chunks"] == 2
+    assert described["images"] == 1
+
+def test_collection_round_trips_through_disk(tmp_path):
+    original = CollectionSession("c1", "notes", "gemini", FakeRag(["text"]), {"src1": "a.pdf"})
+    original.save(str(tmp_path))
+
+    meta = CollectionSession.read_meta(str(tmp_path), "c1")
+    rag = FakeRag()
+    restored = CollectionSession.load(str(tmp_path), "c1", meta, rag)
+
+    assert (restored.name, restored.sources, restored.created) == ("notes", {"src1": "a.pdf"}, original.created)
+    assert rag.loaded_from == str(tmp_path / "c1")
+    assert CollectionSession.read_meta(str(tmp_path), "missing") is None
+
+def test_delete_collection_does_not_restore_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "COLLECTIONS_DIR", str(tmp_path))
+    collection_id = uuid.uuid4().hex
+    CollectionSession(collection_id, "notes", "gemini", FakeRag(["text"]), {"src1": "a.pdf"}).save(str(tmp_path))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("collection was loaded")
+    monkeypatch.setattr(CollectionSession, "load", fail)
+    client = TestClient(api.app)
+
+    assert client.delete(f"/api/collections/{collection_id}").json() == {"status": "deleted"}
+    assert not (tmp_path / collection_id).exists()
+    assert client.delete(f"/api/collections/{collection_id}").status_code == 404
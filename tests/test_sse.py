@@ -0,0 +1,64 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+import api
+from src.utils.jobs import Job
+from src.utils.session_store import DocumentSession, SessionStore
+
+class StreamingRag:
+    """Yields fixed tokens from astream_query, optionally failing after them."""
+
+    def __init__(self, tokens, error=None):
+        self.tokens = tokens
+        self.error = error
+
+    async def astream_query(self, question, **kwargs):
+        for token in self.tokens:
+            yield token
+        if self.error:
+            raise self.error
+
+def parse_events(body):
+    events = []
+    for block in body.split("\n\n"):
+        if block:
+            event, data = block.split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+@pytest.fixture
+def stream_query(monkeypatch):
+    def stream(rag):
+        monkeypatch.setattr(api, "sessions", SessionStore(max_sessions=1))
+        api.sessions.put(DocumentSession("doc", "doc.pdf", "gemini", rag))
+        with TestClient(api.app).stream("POST", "/api/documents/doc/query/stream", json={"question": "why?"}) as response:
+            return response, parse_events(response.read().decode("utf-8"))
+    return stream
+
+def test_sse_event_framing():
+    assert api._sse_event("token", {"text": "a\nb"}) == 'event: token\ndata: {"text": "a\\nb"}\n\n'
+
+def test_tokens_are_streamed_then_done(stream_query):
+    response, events = stream_query(StreamingRag(["Photo", "synthesis"]))
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["x-accel-buffering"] == "no"
+    assert events[:2] == [("token", {"text": "Photo"}), ("token", {"text": "synthesis"})]
+    assert [event for event, _ in events] == ["token", "token", "done"]
+    assert "metrics" in events[2][1]
+
+def test_failure_mid_stream_ends_with_an_error_event(stream_query):
+    _, events = stream_query(StreamingRag(["Photo"], error=RuntimeError("model overloaded")))
+
+    assert events == [("token", {"text": "Photo"}), ("error", {"detail": "model overloaded"})]
+
+def test_finished_job_streams_a_single_done_event(monkeypatch):
+    job = Job({"mode": "quiz"})
+    job._set_status("completed", result={"ok": True})
+    monkeypatch.setattr(api.jobs, "get", lambda job_id: job if job_id == job.job_id else None)
+
+    with TestClient(api.app).stream("GET", f"/api/jobs/{job.job_id}/events") as response:
+        events = parse_events(response.read().decode("utf-8"))
+
+    assert [event for event, _ in events] == ["done"]
+    assert events[0][1]["result"] == {"ok": True}
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from config.config import Config
+from src.utils.vector_index import (PQ_TRAINING_POINTS, build_index, choose_index_type, index_type_of,
+                                    remove_ids, search_params)
+
+def unit_vectors(n, dim=16, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+@pytest.fixture
+def small_thresholds(monkeypatch):
+    monkeypatch.setattr(Config, "FAISS_FLAT_MAX_VECTORS", 100)
+    monkeypatch.setattr(Config, "FAISS_HNSW_MAX_VECTORS", 1000)
+    monkeypatch.setattr(Config, "FAISS_IVF_FLAT_MAX_VECTORS", PQ_TRAINING_POINTS)
+
+def test_auto_type_grows_with_the_vector_count(small_thresholds):
+    assert [choose_index_type(n) for n in (99, 100, 999, 1000, PQ_TRAINING_POINTS)] == \
+        ["flat", "hnsw", "hnsw", "ivf_flat", "ivf_pq"]
+
+@pytest.mark.parametrize("num_vectors,expected", [
+    (50, "flat"), (500, "hnsw"), (5000, "ivf_flat"), (PQ_TRAINING_POINTS, "ivf_pq"),
+])
+def test_auto_build_picks_the_type_and_finds_each_vector(small_thresholds, num_vectors, expected):
+    vectors = unit_vectors(num_vectors)
+    index = build_index(vectors, "auto")
+
+    assert index_type_of(index) == expected
+    assert index.ntotal == num_vectors
+    _, ids = index.search(vectors[:10], 1)
+    # PQ codes are approximate; the others should find every vector itself
+    hits = (ids[:, 0] == np.arange(10)).mean()
+    assert hits >= (0.8 if expected == "ivf_pq" else 1.0)
+
+def test_types_that_cannot_be_trained_fall_back_to_flat():
+    assert index_type_of(build_index(unit_vectors(200), "ivf_pq")) == "flat"
+    assert index_type_of(build_index(unit_vectors(10), "ivf_flat")) == "flat"
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_removed_ids_are_no_longer_returned(index_type):
+    vectors = unit_vectors(50)
+    index = build_index(vectors, index_type, ids=np.arange(100, 150))
+
+    index = remove_ids(index, np.array([100, 101]))
+
+    _, ids = index.search(vectors[:3], 1)
+    assert index.ntotal == 48
+    assert ids[0, 0] not in (100, 101) and ids[2, 0] == 102
+
+def test_search_can_be_restricted_to_allowed_ids():
+    vectors = unit_vectors(50)
+    index = build_index(vectors, "flat")
+
+    _, ids = index.search(vectors[:1], 3, params=search_params(index, np.array([7, 8, 9])))
+
+    assert sorted(ids[0]) == [7, 8, 9]
+
+def test_unknown_type_is_rejected():
+    with pytest.raises(ValueError):
+        build_index(unit_vectors(5), "lsh")
@@ -0,0 +1,69 @@
+import time
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer
+import pytest
+from src.tools.benchmark_web_fetch import StandInHandler
+from src.utils.web_fetch import fetch_pages
+
+class CountingHandler(StandInHandler):
+    """The benchmark stand-in, also counting requests per path and the peak number in flight."""
+
+    lock = threading.Lock()
+    requests = Counter()
+    active = 0
+    peak = 0
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.requests[self.path] += 1
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            super().do_GET()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+@pytest.fixture
+def server():
+    CountingHandler.requests = Counter()
+    CountingHandler.active = CountingHandler.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+def test_duplicate_urls_are_fetched_once(server):
+    urls = [f"{server}/page?kb=1&n={i % 3}" for i in range(9)]
+    results = fetch_pages(urls)
+
+    assert [r["url"] for r in results] == list(dict.fromkeys(urls))
+    assert all(r["error"] is None and "Photosynthesis" in r["text"] for r in results)
+    assert sorted(CountingHandler.requests.values()) == [1, 1, 1]
+
+def test_per_host_concurrency_is_capped(server):
+    urls = [f"{server}/page?delay_ms=200&kb=1&n={i}" for i in range(6)]
+    results = fetch_pages(urls, per_host=2, max_connections=10)
+
+    assert all(r["error"] is None for r in results)
+    assert CountingHandler.peak == 2
+
+def test_pages_past_the_deadline_are_cancelled(server):
+    urls = [f"{server}/page?kb=1&n=fast", f"{server}/page?delay_ms=3000&kb=1&n=slow"]
+    start = time.perf_counter()
+    fast, slow = fetch_pages(urls, deadline_sec=0.5)
+
+    assert time.perf_counter() - start < 2
+    assert fast["error"] is None and fast["text"]
+    assert "deadline" in slow["error"] and slow["text"] == ""
+
+def test_oversized_responses_are_truncated(server):
+    (result,) = fetch_pages([f"{server}/page?kb=200"], max_bytes=10_000)
+
+    assert result["truncated"]
+    assert result["bytes"] == 10_000
+    assert "Photosynthesis" in result["text"]